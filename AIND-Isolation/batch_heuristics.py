@@ -0,0 +1,170 @@
+"""
+This file contains NumPy versions of the heuristics of sample_players.py
+and game_agent.py that score a whole batch of positions at once.
+
+A batch is a `Positions` tuple of stacked arrays:
+
+    blocked     (positions, cells + 1) booleans, the blocked cells of each
+                board in row-major order, followed by an extra cell that is
+                always blocked
+    locations   (positions, 2) ints, the cells of player 1 and player 2, or
+                the extra cell for a player that has not moved yet
+    turns       (positions,) ints, the player to move (0 for player 1, 1 for
+                player 2)
+    width       the number of columns of the boards
+
+Every batch heuristic takes a batch and the player to score for (0 or 1, or
+an array with one player per position) and returns an array of scores equal
+to those of the matching scalar heuristic, which are listed in
+`BATCH_HEURISTICS`. The proximity heuristics need both players on the board.
+
+Example:
+
+    positions = encode([game.forecast_move(m) for m in game.get_legal_moves()])
+    scores = improved_score_batch(positions, 0)
+"""
+
+from collections import namedtuple
+from functools import partial
+
+import numpy as np
+
+from isolation import neighbour_table
+from sample_players import improved_score, open_move_score
+import game_agent
+
+Positions = namedtuple("Positions", ["blocked", "locations", "turns", "width"])
+
+_NEIGHBOURS = {}  # neighbour arrays by board size
+
+
+def neighbour_array(width, height):
+    """Return the (cells + 1, 8) array of the cells reachable from each cell,
+    padded with the extra always-blocked cell (whose own row is all padding)."""
+    if (width, height) not in _NEIGHBOURS:
+        cells = width * height
+        neighbours = np.full((cells + 1, 8), cells, dtype=np.int64)
+        for idx, cell_neighbours in enumerate(neighbour_table(width, height)):
+            for jdx, (r, c) in enumerate(cell_neighbours):
+                neighbours[idx, jdx] = r * width + c
+        _NEIGHBOURS[(width, height)] = neighbours
+    return _NEIGHBOURS[(width, height)]
+
+
+def encode_board(board):
+    """Return the (blocked cells, locations, player to move) rows of a board."""
+    width = board.width
+    cells = width * board.height
+    blocked = np.ones(cells + 1, dtype=bool)
+    for r, c in board.get_blank_spaces():
+        blocked[r * width + c] = False
+    locations = []
+    for player in (board.__player_1__, board.__player_2__):
+        location = board.get_player_location(player)
+        locations.append(cells if location is None else location[0] * width + location[1])
+    return blocked, locations, 0 if board.active_player is board.__player_1__ else 1
+
+
+def encode(boards):
+    """Stack a list of boards of the same size into a Positions batch."""
+    rows = [encode_board(board) for board in boards]
+    return Positions(np.array([row[0] for row in rows]), np.array([row[1] for row in rows]),
+                     np.array([row[2] for row in rows]), boards[0].width)
+
+
+def blank_count(positions):
+    """Return the number of blank cells of each position."""
+    return (~positions.blocked).sum(axis=1)
+
+
+def mobility(positions):
+    """Return the (positions, 2) number of legal moves of each player, where
+    a player that has not moved yet may move to any blank cell."""
+    cells = positions.blocked.shape[1] - 1
+    height = cells // positions.width
+    neighbours = neighbour_array(positions.width, height)[positions.locations]
+    rows = np.arange(len(positions.blocked))[:, None, None]
+    moves = (~positions.blocked[rows, neighbours]).sum(axis=2)
+    return np.where(positions.locations == cells, blank_count(positions)[:, None], moves)
+
+
+def terminal(positions, player, moves, scores):
+    """Replace the scores of finished games with +inf or -inf: the player to
+    move has lost when it has no legal moves."""
+    active = np.take_along_axis(moves, positions.turns[:, None], axis=1)[:, 0]
+    lost = np.where(player == positions.turns, -np.inf, np.inf)
+    return np.where(active == 0, lost, scores)
+
+
+def player_moves(moves, player):
+    """Return the legal moves of player and of its opponent in each position."""
+    player = np.broadcast_to(player, moves.shape[:1])
+    rows = np.arange(len(moves))
+    return moves[rows, player], moves[rows, 1 - player]
+
+
+def open_move_score_batch(positions, player):
+    """The number of legal moves of the player (see `open_move_score`)."""
+    moves = mobility(positions)
+    own, _ = player_moves(moves, player)
+    return terminal(positions, player, moves, own.astype(float))
+
+
+def improved_score_batch(positions, player):
+    """The difference between the legal moves of the player and of its
+    opponent (see `improved_score`)."""
+    return mobility_score(positions, player)
+
+
+def mobility_score(positions, player, opp_weight=1, weighting=None):
+    """The legal moves of the player minus opp_weight times those of its
+    opponent, divided by the number of blank cells plus one if weighting is
+    "weighted" or multiplied by it if weighting is "inverse"."""
+    moves = mobility(positions)
+    own, opp = player_moves(moves, player)
+    scores = own.astype(float) - opp_weight * opp.astype(float)
+    if weighting == "weighted":
+        scores = scores / (blank_count(positions) + 1.)
+    elif weighting == "inverse":
+        scores = scores * (blank_count(positions) + 1.)
+    return terminal(positions, player, moves, scores)
+
+
+def proximity_score(positions, player, maximize=True, weighting=None):
+    """The Euclidean distance between the players (maximize) or its inverse,
+    with the same weighting as `mobility_score()` (see
+    `game_agent.heuristics_proximity_max` and the related heuristics)."""
+    rows, cols = np.divmod(positions.locations, positions.width)
+    dist = np.sqrt((rows[:, 1] - rows[:, 0]) ** 2. + (cols[:, 1] - cols[:, 0]) ** 2.)
+    empty = blank_count(positions) + 1.
+    if maximize:
+        scores = {"weighted": dist / empty, "inverse": dist * empty}.get(weighting, dist)
+    else:
+        scores = {"weighted": 1. / (dist * empty), "inverse": empty / dist}.get(weighting, 1. / dist)
+    return terminal(positions, player, mobility(positions), scores)
+
+
+# batch version of each scalar heuristic
+BATCH_HEURISTICS = {
+    open_move_score: open_move_score_batch,
+    improved_score: improved_score_batch,
+    game_agent.heuristic_simple_weighted: partial(mobility_score, weighting="weighted"),
+    game_agent.heuristic_simple_weighted_inv: partial(mobility_score, weighting="inverse"),
+    game_agent.heuristics_offensive: partial(mobility_score, opp_weight=2),
+    game_agent.heuristics_offensive_weighted: partial(mobility_score, opp_weight=2, weighting="weighted"),
+    game_agent.heuristics_offensive_weighted_inv: partial(mobility_score, opp_weight=2, weighting="inverse"),
+    game_agent.heuristics_proximity_min: partial(proximity_score, maximize=False),
+    game_agent.heuristics_proximity_min_weighted: partial(proximity_score, maximize=False, weighting="weighted"),
+    game_agent.heuristics_proximity_min_weighted_inv: partial(proximity_score, maximize=False, weighting="inverse"),
+    game_agent.heuristics_proximity_max: proximity_score,
+    game_agent.heuristics_proximity_max_weighted: partial(proximity_score, weighting="weighted"),
+    game_agent.heuristics_proximity_max_weighted_inv: partial(proximity_score, weighting="inverse"),
+}
+
+
+def score_boards(score_fn, boards, player):
+    """Score a list of boards of the same size for one of their players with
+    the batch version of score_fn, and return the list of scores."""
+    positions = encode(boards)
+    index = 0 if player is boards[0].__player_1__ else 1
+    return BATCH_HEURISTICS[score_fn](positions, index).tolist()
@@ -0,0 +1,343 @@
+"""
+Measure the search performance of CustomPlayer configurations on a fixed
+set of random positions.
+
+Reports
+-------
+ordering
+    Nodes visited by each iteration of iterative deepening alpha-beta search
+    and the effective branching factor (the ratio of the nodes visited by
+    consecutive iterations), with and without move ordering.
+calibrate
+    Search speed (nodes per second) of the tournament agent with each
+    heuristic on this machine, and the node budget per turn that matches the
+    tournament time limit; use it to set `NODE_LIMIT` in tournament_new.py.
+parallel
+    Depth completed and nodes visited per turn by iterative deepening with
+    the root moves split over 1 to N worker processes, at the tournament
+    time limit.
+batch
+    Positions scored per second by each heuristic one board at a time and
+    with its NumPy batch version from batch_heuristics.py, once the boards
+    are stacked into arrays.
+timing
+    Timeouts, nodes wasted in iterations aborted by the timer, early stops
+    and depth completed per turn of the tournament agent, with and without
+    the time manager of time_manager.py, at a given time limit.
+extensions
+    Nodes visited by a fixed-depth alphabeta search with the forced move
+    and low mobility extensions, and how often the move chosen is as good
+    as the best move of a deeper reference search.
+boards
+    Move generation calls and search nodes per second on square boards of
+    7x7 to 15x15 cells, for every move rule of isolation.movetables and
+    both board engines where they apply.
+
+Example:
+
+    python benchmark.py ordering --depth 7 --positions 20
+    python benchmark.py calibrate --time-limit 150
+    python benchmark.py parallel --workers 4
+    python benchmark.py batch --positions 2000
+    python benchmark.py timing --time-limit 100
+    python benchmark.py extensions --depth 4 --reference-depth 8
+    python benchmark.py boards --sizes 7 9 11 13 15
+"""
+
+import argparse
+import random
+import timeit
+
+from isolation import Board, MOVE_RULES
+from batch_heuristics import BATCH_HEURISTICS, encode
+from sample_players import improved_score, open_move_score
+from game_agent import CustomPlayer, custom_score
+from tournament_new import CUSTOM_ARGS, HEURISTICS_STUDENT, TIME_LIMIT
+from search_stats import SearchStats, summarize
+
+CONFIGS = [("no ordering", {}),
+           ("ordering", {"move_ordering": True}),
+           ("ordering+tt", {"move_ordering": True, "tt_size": 2 ** 16}),
+           ("ordering+tt+mobility", {"move_ordering": True, "tt_size": 2 ** 16,
+                                     "mobility_ordering": True}),
+           ("ordering+tt+pvs", {"move_ordering": True, "tt_size": 2 ** 16, "pvs": True}),
+           ("ordering+tt+aspiration", {"move_ordering": True, "tt_size": 2 ** 16,
+                                       "aspiration": 1.5}),
+           ("ordering+tt+pvs+asp", {"move_ordering": True, "tt_size": 2 ** 16, "pvs": True,
+                                    "aspiration": 1.5})]
+
+
+def random_positions(num_positions, plies=6, seed=0, width=7, height=7, move_rule="knight"):
+    """Return a list of (move history) lists leading to random positions
+    where the game is not over yet."""
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < num_positions:
+        board = Board("p1", "p2", width, height, bitboard=move_rule == "knight", move_rule=move_rule)
+        moves = []
+        for _ in range(plies):
+            legal_moves = board.get_legal_moves()
+            if not legal_moves:
+                break
+            moves.append(rng.choice(legal_moves))
+            board.apply_move(moves[-1])
+        if board.get_legal_moves():
+            positions.append(moves)
+    return positions
+
+
+def setup_board(agent, moves, width=7, height=7, move_rule="knight", bitboard=True):
+    """Replay moves on a new board where the agent is player 1 if the number
+    of moves is even, and player 2 otherwise (so the agent is to move)."""
+    players = (agent, "opponent") if len(moves) % 2 == 0 else ("opponent", agent)
+    board = Board(*players, width=width, height=height, bitboard=bitboard, move_rule=move_rule)
+    for move in moves:
+        board.apply_move(move)
+    return board
+
+
+def search_to_depth(agent, board, depth):
+    """Run iterative deepening with `agent` until the iteration at `depth`
+    has completed, and return the number of nodes visited by the iterations
+    at depths 0 to `depth`."""
+    def time_left():
+        return 1e9 if len(agent.iteration_nodes) <= depth else 0.
+    agent.get_move(board, board.get_legal_moves(), time_left)
+    return agent.iteration_nodes[:depth + 1]
+
+
+def ordering_report(depth, num_positions, score_fn=improved_score):
+    """Print the nodes per iteration and effective branching factor of each
+    configuration in CONFIGS."""
+    positions = random_positions(num_positions)
+    print("{:<22}{:>6}{:>12}{:>8}".format("config", "depth", "nodes", "EBF"))
+    for name, kwargs in CONFIGS:
+        totals = [0] * (depth + 1)
+        start = timeit.default_timer()
+        for moves in positions:
+            agent = CustomPlayer(score_fn=score_fn, method="alphabeta",
+                                 make_unmake=True, **kwargs)
+            nodes = search_to_depth(agent, setup_board(agent, moves), depth)
+            for idx, count in enumerate(nodes):
+                totals[idx] += count
+        elapsed = timeit.default_timer() - start
+        for idx in range(1, depth + 1):
+            ebf = totals[idx] / totals[idx - 1] if totals[idx - 1] else float("nan")
+            print("{:<22}{:>6}{:>12}{:>8.2f}".format(name, idx, totals[idx], ebf))
+        print("{:<22}{:>6}{:>12}  {:.2f}s\n".format(name, "total", sum(totals), elapsed))
+
+
+def timed_search(agent, board, time_limit):
+    """Run the agent's search for one turn of time_limit milliseconds, and
+    return the number of nodes visited and the seconds spent."""
+    start = timeit.default_timer()
+    time_left = lambda: time_limit - 1000 * (timeit.default_timer() - start)
+    agent.get_move(board, board.get_legal_moves(), time_left)
+    return agent.nodes, timeit.default_timer() - start
+
+
+def calibration_report(time_limit, num_positions):
+    """Print the nodes per second of the tournament agent with each
+    heuristic, and the node budget equivalent to time_limit milliseconds."""
+    positions = random_positions(num_positions)
+    heuristics = [improved_score, open_move_score, custom_score] + HEURISTICS_STUDENT
+    print("{:<40}{:>12}{:>12}".format("heuristic", "nodes/s", "nodes/turn"))
+    for score_fn in heuristics:
+        total_nodes = 0
+        total_time = 0.
+        for moves in positions:
+            agent = CustomPlayer(score_fn=score_fn, **CUSTOM_ARGS)
+            nodes, elapsed = timed_search(agent, setup_board(agent, moves), time_limit)
+            total_nodes += nodes
+            total_time += elapsed
+        rate = total_nodes / total_time
+        print("{:<40}{:>12.0f}{:>12.0f}".format(score_fn.__name__, rate, rate * time_limit / 1000))
+
+
+def parallel_report(max_workers, time_limit, num_positions, score_fn=improved_score):
+    """Print the median depth completed and the nodes per turn of root
+    splitting with 1 to max_workers worker processes."""
+    positions = random_positions(num_positions)
+    print("{:<10}{:>8}{:>12}".format("workers", "depth", "nodes/turn"))
+    for workers in range(1, max_workers + 1):
+        stats = SearchStats()
+        agent = CustomPlayer(score_fn=score_fn, stats=stats, workers=workers, **CUSTOM_ARGS)
+        for moves in positions:
+            timed_search(agent, setup_board(agent, moves), time_limit)
+        agent.close()
+        summary = summarize(stats.moves)
+        print("{:<10}{:>8.1f}{:>12.0f}".format(workers, summary["median_depth"] or 0.,
+                                              sum(r["nodes"] for r in stats.moves) / len(stats.moves)))
+
+
+def batch_report(num_positions):
+    """Print the positions per second scored by each heuristic with the
+    scalar version and with the batch version, from the stacked arrays
+    (the time to stack the boards is printed once)."""
+    boards = [setup_board("p1", moves) for moves in random_positions(num_positions, plies=12)]
+    start = timeit.default_timer()
+    positions = encode(boards)
+    print("Stacked {} boards at {:.0f} boards/s\n".format(
+        len(boards), len(boards) / (timeit.default_timer() - start)))
+    print("{:<40}{:>12}{:>12}".format("heuristic", "scalar/s", "batch/s"))
+    for score_fn, batch_fn in BATCH_HEURISTICS.items():
+        start = timeit.default_timer()
+        for board in boards:
+            score_fn(board, board.active_player)
+        scalar_time = timeit.default_timer() - start
+        start = timeit.default_timer()
+        batch_fn(positions, positions.turns)
+        batch_time = timeit.default_timer() - start
+        print("{:<40}{:>12.0f}{:>12.0f}".format(score_fn.__name__, len(boards) / scalar_time,
+                                                len(boards) / batch_time))
+
+
+def timing_report(time_limit, num_positions, score_fn=improved_score):
+    """Print the timeout rate, the share of nodes wasted in aborted
+    iterations, the early stop rate, the median depth and the smallest
+    margin left with and without the time manager, over every position."""
+    positions = random_positions(num_positions)
+    print("{:<16}{:>10}{:>10}{:>12}{:>8}{:>12}{:>10}".format(
+        "config", "timeouts", "wasted", "early stops", "depth", "min margin", "forfeits"))
+    for name, managed in (("fixed", False), ("time manager", True)):
+        stats = SearchStats()
+        agent = CustomPlayer(score_fn=score_fn, stats=stats, **dict(CUSTOM_ARGS, time_manager=managed))
+        for moves in positions:
+            timed_search(agent, setup_board(agent, moves), time_limit)
+        summary = summarize(stats.moves)
+        forfeits = sum(r["timeout_margin"] < 0 for r in stats.moves)
+        print("{:<16}{:>10.0%}{:>10.0%}{:>12.0%}{:>8.1f}{:>12.1f}{:>10}".format(
+            name, summary["timeout_rate"], summary["wasted_share"], summary["early_stop_rate"],
+            summary["median_depth"] or 0., summary["min_margin"], forfeits))
+
+
+# name, CustomPlayer arguments and plies added to the search depth
+EXTENSION_CONFIGS = [("none", {}, 0),
+                     ("forced", {"forced_extension": True}, 0),
+                     ("mobility<=2", {"mobility_extension": 2}, 0),
+                     ("mobility<=3", {"mobility_extension": 3}, 0),
+                     ("forced+mobility<=2", {"forced_extension": True, "mobility_extension": 2}, 0),
+                     ("none, one ply deeper", {}, 1)]
+
+
+def extension_report(depth, reference_depth, num_positions, plies=16, score_fn=improved_score):
+    """Print the nodes, extensions and time of a depth-limited alphabeta
+    search with each configuration in EXTENSION_CONFIGS, and the share of
+    positions where it picks a move whose score at reference_depth is the
+    best score of the position. The last configuration spends its extra
+    nodes on a deeper search instead, for comparison."""
+    references = []
+    for moves in random_positions(num_positions, plies=plies):
+        agent = CustomPlayer(score_fn=score_fn, method="alphabeta", make_unmake=True,
+                             move_ordering=True, tt_size=2 ** 16)
+        agent.time_left = lambda: 1e9
+        board = setup_board(agent, moves)
+        values = {move: agent.search_child(agent.alphabeta, board, move, reference_depth - 1,
+                                           float("-inf"), float("inf"), False)[0]
+                  for move in board.get_legal_moves()}
+        references.append((moves, values, max(values.values())))
+    print("{:<22}{:>10}{:>12}{:>14}{:>10}{:>10}".format(
+        "config", "nodes", "forced/pos", "mobility/pos", "time", "accuracy"))
+    for name, kwargs, extra_depth in EXTENSION_CONFIGS:
+        nodes = forced = mobility = correct = 0
+        start = timeit.default_timer()
+        for moves, values, best in references:
+            agent = CustomPlayer(score_fn=score_fn, method="alphabeta", make_unmake=True, **kwargs)
+            agent.time_left = lambda: 1e9
+            _, move = agent.alphabeta(setup_board(agent, moves), depth + extra_depth)
+            nodes += agent.nodes
+            forced += agent.extensions["forced"]
+            mobility += agent.extensions["mobility"]
+            correct += move in values and values[move] == best
+        count = len(references)
+        print("{:<22}{:>10}{:>12.1f}{:>14.1f}{:>9.2f}s{:>10.0%}".format(
+            name, nodes, forced / count, mobility / count, timeit.default_timer() - start,
+            correct / count))
+
+
+def boards_report(sizes, time_limit, num_positions, score_fn=improved_score):
+    """Print the legal move lists generated per second and the nodes per
+    second searched in time_limit milliseconds per position, for every
+    board size, move rule and engine."""
+    print("{:<8}{:<8}{:<10}{:>12}{:>12}".format("size", "rule", "engine", "movegen/s", "nodes/s"))
+    for size in sizes:
+        for rule in MOVE_RULES:
+            positions = random_positions(num_positions, plies=2 * size, width=size, height=size,
+                                         move_rule=rule)
+            for bitboard in ((False, True) if rule == "knight" else (False,)):
+                boards = [setup_board("p1", moves, size, size, rule, bitboard) for moves in positions]
+                calls = 0
+                start = timeit.default_timer()
+                while timeit.default_timer() - start < 0.2:
+                    for board in boards:
+                        board.get_legal_moves()
+                        board.get_legal_moves(board.inactive_player)
+                    calls += 2 * len(boards)
+                movegen_rate = calls / (timeit.default_timer() - start)
+                total_nodes = 0
+                total_time = 0.
+                for moves in positions:
+                    agent = CustomPlayer(score_fn=score_fn, **CUSTOM_ARGS)
+                    board = setup_board(agent, moves, size, size, rule, bitboard)
+                    nodes, elapsed = timed_search(agent, board, time_limit)
+                    total_nodes += nodes
+                    total_time += elapsed
+                print("{:<8}{:<8}{:<10}{:>12.0f}{:>12.0f}".format(
+                    "{0}x{0}".format(size), rule, "bitboard" if bitboard else "list",
+                    movegen_rate, total_nodes / total_time))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark CustomPlayer search.")
+    subparsers = parser.add_subparsers(dest="report")
+    ordering = subparsers.add_parser("ordering", help="Compare node counts and " +
+                                     "branching factors with and without move ordering.")
+    ordering.add_argument("--depth", type=int, default=7)
+    ordering.add_argument("--positions", type=int, default=20)
+    calibrate = subparsers.add_parser("calibrate", help="Measure nodes per second for " +
+                                      "each heuristic and the equivalent node budget per turn.")
+    calibrate.add_argument("--time-limit", type=int, default=TIME_LIMIT,
+                           help="Milliseconds per turn to convert to a node budget.")
+    calibrate.add_argument("--positions", type=int, default=20)
+    parallel = subparsers.add_parser("parallel", help="Compare the depth reached by " +
+                                     "root splitting with different numbers of workers.")
+    parallel.add_argument("--workers", type=int, default=4)
+    parallel.add_argument("--time-limit", type=int, default=TIME_LIMIT)
+    parallel.add_argument("--positions", type=int, default=20)
+    batch = subparsers.add_parser("batch", help="Compare the scoring speed of the " +
+                                  "scalar and NumPy batch heuristics.")
+    batch.add_argument("--positions", type=int, default=2000)
+    timing = subparsers.add_parser("timing", help="Compare timeouts and wasted " +
+                                   "search with and without the time manager.")
+    timing.add_argument("--time-limit", type=int, default=TIME_LIMIT)
+    timing.add_argument("--positions", type=int, default=50)
+    extensions = subparsers.add_parser("extensions", help="Compare the nodes and " +
+                                       "accuracy of search extensions at a fixed depth.")
+    extensions.add_argument("--depth", type=int, default=4)
+    extensions.add_argument("--reference-depth", type=int, default=8)
+    extensions.add_argument("--positions", type=int, default=50)
+    extensions.add_argument("--plies", type=int, default=16,
+                            help="Random moves played before each position.")
+    boards = subparsers.add_parser("boards", help="Compare move generation and search " +
+                                   "speed across board sizes and move rules.")
+    boards.add_argument("--sizes", type=int, nargs="+", default=[7, 9, 11, 13, 15])
+    boards.add_argument("--time-limit", type=int, default=100)
+    boards.add_argument("--positions", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.report == "ordering":
+        ordering_report(args.depth, args.positions)
+    elif args.report == "calibrate":
+        calibration_report(args.time_limit, args.positions)
+    elif args.report == "parallel":
+        parallel_report(args.workers, args.time_limit, args.positions)
+    elif args.report == "batch":
+        batch_report(args.positions)
+    elif args.report == "timing":
+        timing_report(args.time_limit, args.positions)
+    elif args.report == "extensions":
+        extension_report(args.depth, args.reference_depth, args.positions, args.plies)
+    elif args.report == "boards":
+        boards_report(args.sizes, args.time_limit, args.positions)
+    else:
+        parser.print_help()
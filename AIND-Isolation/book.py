@@ -0,0 +1,284 @@
+"""
+This file contains the opening book and endgame tables of `CustomPlayer`,
+and the offline generators that build them.
+
+Both are `PositionTable` files: a header followed by fixed-size records of
+(Zobrist key, move, score) sorted by key, so that a table is memory-mapped
+when it is opened and each lookup is a binary search over the file instead
+of a parse of the whole table. Keys are `Board.hash()` values, which include
+the player to move, and scores are relative to the player to move.
+
+Opening books store the move chosen by a fixed-depth search for the
+positions the agent can reach in the first plies of a game. Endgame tables
+store the exact result (+1 win, -1 loss) of positions with few open cells,
+as computed by `EndgameSolver`.
+
+Example:
+
+    python book.py opening --plies 6 --depth 6 --out opening_7x7.book
+    python book.py endgame --games 500 --cells 14 --out endgame_7x7.book
+"""
+
+import argparse
+import mmap
+import random
+import struct
+
+from isolation import Board
+
+MAGIC = b"ISOLTBL1"
+HEADER = struct.Struct("<8sBBxxI")  # magic, board width, board height, number of records
+RECORD = struct.Struct("<QBBbx")  # key, move row, move column, score
+KEY = struct.Struct("<Q")
+NO_MOVE = 0xFF  # row and column of a record without a move
+
+WIN = 1
+LOSS = -1
+
+
+class PositionTable:
+    """Read-only table of positions stored by `write_table()`.
+
+    Parameters
+    ----------
+    path : str
+        The path of the table file.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.width, self.height, self.count = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC:
+            raise ValueError("{} is not a position table".format(path))
+
+    def __len__(self):
+        return self.count
+
+    def lookup(self, key):
+        """Return the (move, score) stored for a position key, or None if the
+        position is not in the table."""
+        data = self.data
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            mid_key = KEY.unpack_from(data, HEADER.size + mid * RECORD.size)[0]
+            if mid_key < key:
+                lo = mid + 1
+            elif mid_key > key:
+                hi = mid
+            else:
+                _, row, col, score = RECORD.unpack_from(data, HEADER.size + mid * RECORD.size)
+                return (None if row == NO_MOVE else (row, col)), score
+        return None
+
+    def items(self):
+        """Iterate over the (key, (move, score)) records of the table."""
+        for idx in range(self.count):
+            key, row, col, score = RECORD.unpack_from(self.data, HEADER.size + idx * RECORD.size)
+            yield key, ((None if row == NO_MOVE else (row, col)), score)
+
+    def close(self):
+        self.data.close()
+
+
+def write_table(path, width, height, entries):
+    """Write a position table.
+
+    Parameters
+    ----------
+    path : str
+        The path of the table file.
+
+    width, height : int
+        The size of the board the positions belong to.
+
+    entries : dict
+        A map from position keys to (move, score) pairs, where move is a
+        (row, column) pair or None and score fits in a signed byte.
+    """
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, width, height, len(entries)))
+        for key in sorted(entries):
+            move, score = entries[key]
+            row, col = move if move is not None else (NO_MOVE, NO_MOVE)
+            f.write(RECORD.pack(key, row, col, score))
+
+
+class SolveTimeout(Exception):
+    """Raised by `EndgameSolver.solve()` when the time limit is reached."""
+    pass
+
+
+class EndgameSolver:
+    """Exact win/loss solver for positions with few open cells.
+
+    Results are cached by position key for the life of the solver (the
+    cache is cleared when it holds more than `max_entries` positions), and
+    positions in the endgame table are not searched again.
+
+    Parameters
+    ----------
+    table : PositionTable (optional)
+        A table of solved positions, e.g., from `generate_endgame_table()`.
+
+    max_entries : int (optional)
+        The maximum number of cached positions.
+    """
+
+    def __init__(self, table=None, max_entries=2 ** 20):
+        self.table = table
+        self.max_entries = max_entries
+        self.memo = {}
+
+    def solve(self, game, time_left=None, threshold=0.):
+        """Solve a position.
+
+        Parameters
+        ----------
+        game : isolation.Board
+            The position to solve; it is not modified.
+
+        time_left : callable (optional)
+            A function that returns the milliseconds left in the turn.
+
+        threshold : float (optional)
+            Raise SolveTimeout when time_left() falls below this value.
+
+        Returns
+        -------
+        ((int, int) or None, int)
+            A best move for the player to move (None if there are no legal
+            moves) and WIN or LOSS.
+        """
+        if len(self.memo) > self.max_entries:
+            self.memo.clear()
+        self.time_left = time_left
+        self.threshold = threshold
+        board = game.copy()
+        return self.__solve__(board)
+
+    def __solve__(self, board):
+        key = board.hash()
+        entry = self.memo.get(key)
+        if entry is None and self.table is not None:
+            entry = self.table.lookup(key)
+        if entry is not None:
+            return entry
+        if self.time_left is not None and self.time_left() < self.threshold:
+            raise SolveTimeout()
+
+        legal_moves = board.get_legal_moves()
+        if not legal_moves:
+            entry = (None, LOSS)
+        else:
+            # try the moves to the most open cells first; they win most often
+            legal_moves.sort(key=board.count_moves, reverse=True)
+            entry = (legal_moves[0], LOSS)
+            for move in legal_moves:
+                board.push_move(move)
+                _, score = self.__solve__(board)
+                board.pop_move()
+                if score == LOSS:
+                    entry = (move, WIN)
+                    break
+        self.memo[key] = entry
+        return entry
+
+
+def generate_opening_book(plies, depth, score_fn, width=7, height=7):
+    """Build an opening book from fixed-depth alpha-beta searches.
+
+    The book covers every position the agent can reach in the first `plies`
+    plies of a game, as either player, when it plays the book moves: all
+    the replies of the opponent are expanded, and only the book move of the
+    agent. The first move of each player follows the `CustomPlayer` opening
+    rule and is not stored.
+
+    Returns
+    -------
+    dict
+        A map from position keys to (move, 0) entries for `write_table()`.
+    """
+    from game_agent import CustomPlayer
+
+    agent = CustomPlayer(search_depth=depth, score_fn=score_fn, iterative=False,
+                         method='alphabeta', make_unmake=True, move_ordering=True)
+    entries = {}
+
+    def expand(board, agent_to_move):
+        if board.move_count >= plies:
+            return
+        legal_moves = board.get_legal_moves()
+        if not legal_moves:
+            return
+        if agent_to_move:
+            key = board.hash()
+            if key in entries:
+                return
+            move = agent.get_move(board, legal_moves, lambda: float("inf"))
+            if board.move_count > 1:
+                entries[key] = (move, 0)
+            legal_moves = [move]
+        for move in legal_moves:
+            board.push_move(move)
+            expand(board, not agent_to_move)
+            board.pop_move()
+
+    for players in ((agent, "opponent"), ("opponent", agent)):
+        board = Board(*players, width=width, height=height, bitboard=True)
+        expand(board, board.active_player is agent)
+    return entries
+
+
+def generate_endgame_table(games, cells, width=7, height=7, seed=0):
+    """Build an endgame table by solving the positions of random games once
+    at most `cells` cells are open.
+
+    Returns
+    -------
+    dict
+        A map from position keys to (move, WIN or LOSS) entries for every
+        position visited by the solver, for `write_table()`.
+    """
+    rng = random.Random(seed)
+    solver = EndgameSolver(max_entries=float("inf"))
+    for _ in range(games):
+        board = Board("p1", "p2", width=width, height=height, bitboard=True)
+        while board.get_legal_moves():
+            if board.count_moves(Board.NOT_MOVED) <= cells:
+                solver.solve(board)
+                break
+            board.apply_move(rng.choice(board.get_legal_moves()))
+    return solver.memo
+
+
+if __name__ == "__main__":
+    from game_agent import custom_score
+
+    parser = argparse.ArgumentParser(description="Generate opening books and endgame tables.")
+    parser.add_argument("--width", type=int, default=7)
+    parser.add_argument("--height", type=int, default=7)
+    subparsers = parser.add_subparsers(dest="table")
+    opening = subparsers.add_parser("opening", help="Search the first plies of the game " +
+                                    "with fixed-depth alpha-beta and the custom heuristic.")
+    opening.add_argument("--plies", type=int, default=6)
+    opening.add_argument("--depth", type=int, default=6)
+    opening.add_argument("--out", default="opening.book")
+    endgame = subparsers.add_parser("endgame", help="Solve the endgames of random games.")
+    endgame.add_argument("--games", type=int, default=500)
+    endgame.add_argument("--cells", type=int, default=14,
+                         help="Number of open cells at which positions are solved.")
+    endgame.add_argument("--seed", type=int, default=0)
+    endgame.add_argument("--out", default="endgame.book")
+    args = parser.parse_args()
+
+    if args.table == "opening":
+        entries = generate_opening_book(args.plies, args.depth, custom_score, args.width, args.height)
+    elif args.table == "endgame":
+        entries = generate_endgame_table(args.games, args.cells, args.width, args.height, args.seed)
+    else:
+        parser.print_help()
+        parser.exit()
+    write_table(args.out, args.width, args.height, entries)
+    print("Wrote {} positions to {}".format(len(entries), args.out))
@@ -6,12 +6,84 @@ augment the test suite with your own test cases to further test your code.
 You must test your agent's strength against a set of agents with known
 relative strength using tournament.py and include the results in your report.
 """
-import random, math
+import itertools, random, math, time
+
+from concurrent.futures import ProcessPoolExecutor, wait
+
+from transposition import TranspositionTable, EXACT, LOWER, UPPER
+from book import PositionTable, EndgameSolver, SolveTimeout, WIN
+from partition import longest_path
+from time_manager import TimeManager
+from search_stats import SearchStats
+from isolation.movetables import KNIGHT
+
+# Zobrist key mixed into the transposition table key when the agent plays as
+# player 2, since scores are stored from the agent's point of view
+PLAYER_2_KEY = 0x9E3779B97F4A7C15
 
 class Timeout(Exception):
     """Subclass base exception for code clarity."""
     pass
 
+
+def search_root_moves(game, moves, depth, deadline, node_budget=None, stats=False):
+    """Search some of the root moves of a game in a worker process of
+    `CustomPlayer.root_split()`.
+
+    Parameters
+    ----------
+    game : isolation.Board
+        A copy of the game state, with a copy of the searching agent as the
+        active player
+
+    moves : list<(int, int)>
+        The root moves to search, in order
+
+    depth : int
+        The search depth, counting the root move
+
+    deadline : float
+        The `time.monotonic()` time at which to abort the search; the clock
+        is shared by all the processes of the machine
+
+    node_budget : int (optional)
+        If set, the number of nodes the worker may visit before aborting the
+        search, instead of the deadline
+
+    stats : bool (optional)
+        Flag indicating whether to collect `SearchStats` counters
+
+    Returns
+    -------
+    (list<(float, (int, int))>, int, bool, dict or None)
+        The (score, move) pairs of the moves searched, the number of nodes
+        visited, whether all the moves were searched before the deadline,
+        and the SearchStats record of the worker's search if stats is set
+    """
+    agent = game.active_player
+    if node_budget is not None:
+        agent.time_left = lambda: float("inf") if agent.nodes < node_budget else float("-inf")
+    else:
+        agent.time_left = lambda: 1000. * (deadline - time.monotonic())
+    agent.TIMER_THRESHOLD = 0.
+    agent.root_ply = game.move_count
+    agent.nodes = 0
+    agent.extension_ply = 0
+    agent.stats = SearchStats() if stats else None
+    if stats: agent.stats.start_move(game)
+    results = []
+    alpha = float("-inf")
+    complete = True
+    try:
+        for move in moves:
+            score, _ = agent.search_child(agent.alphabeta, game, move, depth - 1,
+                                          alpha, float("inf"), False)
+            results.append((score, move))
+            alpha = max(alpha, score)
+    except Timeout:
+        complete = False
+    return results, agent.nodes, complete, agent.stats.current if stats else None
+
 # define different heuristics functions
 def heuristic_simple_weighted(game, player):
     """
@@ -231,7 +303,78 @@ def heuristic_offensive_deeper(game, player):
                    for move in game.get_legal_moves(game.get_opponent(player))]   
     return sum(own_moves_list) - 2 * sum(opp_moves_list)
 
-def custom_score(game, player, heuristic=heuristic_offensive_deeper):
+def deeper_mobility(game, player):
+    """
+    Return the number of moves available to the player one level deeper,
+    as computed by heuristic_simple_deeper and heuristic_offensive_deeper:
+    the sum over the player's legal moves m of
+    len(game.forecast_move(m).get_legal_moves(player)), counted from the
+    board's neighbour table without copying the board.
+
+    Note that forecast_move(m) moves the active player, so when the player
+    is not active each term is the player's own mobility with cell m
+    blocked, i.e. one less than its current mobility.
+    """
+    moves = game.get_legal_moves(player)
+    if player == game.active_player:
+        return float(sum(game.count_moves(move) for move in moves))
+    return float(len(moves) * (len(moves) - 1))
+
+def heuristic_simple_deeper_fast(game, player):
+    """
+    The same evaluation as heuristic_simple_deeper without creating a copy
+    of the board for every legal move (see deeper_mobility):
+    (sum of own_moves at next depth) - (sum of opponent moves at next depth)
+    """
+    if not game.count_moves(game.get_player_location(game.active_player)):
+        return float("-inf") if player == game.active_player else float("inf")
+    return deeper_mobility(game, player) - deeper_mobility(game, game.get_opponent(player))
+
+def heuristic_offensive_deeper_fast(game, player):
+    """
+    The same evaluation as heuristic_offensive_deeper without creating a
+    copy of the board for every legal move (see deeper_mobility):
+    (sum of own_moves at next depth) - (2 * sum of opponent moves at next depth)
+    """
+    if not game.count_moves(game.get_player_location(game.active_player)):
+        return float("-inf") if player == game.active_player else float("inf")
+    return deeper_mobility(game, player) - 2 * deeper_mobility(game, game.get_opponent(player))
+
+class WeightedHeuristic:
+    """
+    The weighted heuristics as one evaluation function with tunable weights
+    (see tuning.py):
+    (own * own_moves - opp * opponent moves + dist * distance
+     + inv_dist / distance) / (num empty spaces + 1)
+    where distance is the Euclidian distance between the players. The
+    default weights give heuristic_simple_weighted, opp=2 gives
+    heuristics_offensive_weighted, and own=opp=0 with dist=1 gives
+    heuristics_proximity_max_weighted. Instances can be pickled, so they can
+    be sent to worker processes.
+    """
+    PARAMS = ("own", "opp", "dist", "inv_dist")
+
+    def __init__(self, own=1., opp=1., dist=0., inv_dist=0.):
+        self.weights = (own, opp, dist, inv_dist)
+        self.__name__ = "weighted({})".format(
+            ", ".join("{}={:.3g}".format(*kv) for kv in zip(self.PARAMS, self.weights)))
+
+    def __repr__(self):
+        return self.__name__
+
+    def __call__(self, game, player):
+        if not game.count_moves(game.get_player_location(game.active_player)):
+            return float("-inf") if player == game.active_player else float("inf")
+        own, opp, dist, inv_dist = self.weights
+        own_loc = game.get_player_location(player)
+        opp_loc = game.get_player_location(game.get_opponent(player))
+        score = (own * game.count_moves(own_loc) - opp * game.count_moves(opp_loc))
+        if dist or inv_dist:
+            euclidian_dist = math.sqrt((opp_loc[0]-own_loc[0])**2+(opp_loc[1]-own_loc[1])**2)
+            score += dist * euclidian_dist + inv_dist / euclidian_dist
+        return score / (game.count_moves(game.NOT_MOVED) + 1.0)
+
+def custom_score(game, player, heuristic=heuristic_offensive_deeper_fast):
     """Calculate the heuristic value of a game state from the point of view
     of the given player.
 
@@ -283,16 +426,146 @@ class CustomPlayer:
         Time remaining (in milliseconds) when search is aborted. Should be a
         positive value large enough to allow the function to return before the
         timer expires.
+
+    make_unmake : boolean (optional)
+        Flag indicating whether to walk the game tree by applying and undoing
+        moves on a single board (`Board.push_move`/`Board.pop_move`) instead
+        of creating a copy of the board for every node with `forecast_move`.
+
+    tt_size : int (optional)
+        Number of buckets in the transposition table used by alphabeta
+        search; 0 disables the table. The table is kept between iterations
+        and turns, and its counters are available from `self.tt.stats()`.
+
+    tt_policy : {'depth', 'two-tier'} (optional)
+        Replacement policy of the transposition table.
+
+    move_ordering : boolean (optional)
+        Flag indicating whether alphabeta search should try moves in order
+        of the previous iteration's best move (or the transposition table
+        move), the killer moves of the ply, and the history table.
+
+    mobility_ordering : boolean (optional)
+        Flag indicating whether to break the remaining ties in move ordering
+        by the number of moves available from each destination cell.
+
+    node_budget : int (optional)
+        Maximum number of nodes minimax/alphabeta may visit per turn. If set,
+        the search is aborted when the budget is spent instead of when the
+        timer runs low, so the moves chosen do not depend on the speed of the
+        machine. A budget passed by `Board.play(node_limit=...)` takes
+        precedence.
+
+    stats : search_stats.SearchStats (optional)
+        Collector for per-move search statistics (nodes, leaf evaluations,
+        depth completed, cutoffs, heuristic and move generation time, and
+        timeout margin); None disables the instrumentation.
+
+    book : str (optional)
+        Path of an opening book written by `book.py opening`. Positions in
+        the book are played without searching.
+
+    endgame_cells : int (optional)
+        Number of open cells at or below which the agent solves the position
+        exactly before searching, and plays the winning move if there is
+        one; 0 disables the endgame solver. The solver gets half of the time
+        left in the turn.
+
+    endgame_table : str (optional)
+        Path of an endgame table written by `book.py endgame` (with the same
+        number of cells) of positions the solver does not need to search.
+
+    partition_endgame : boolean (optional)
+        Flag indicating whether to stop searching once the players are
+        separated (`Board.is_partitioned()`), and walk the longest path in
+        the agent's region instead, which is the best play from then on.
+
+    workers : int (optional)
+        Number of worker processes to split the root moves of alphabeta
+        search over (each worker searches its share of the root moves to the
+        full depth of the iteration); 1 searches in this process. The
+        workers are started on the first search and stopped by `close()`.
+        Worker searches do not use the transposition table.
+
+    pvs : boolean (optional)
+        Flag indicating whether alphabeta search should use principal
+        variation search: every move after the first is searched with a null
+        window, which only tells whether it beats the best move so far, and
+        searched again with the full window if it does.
+
+    aspiration : float (optional)
+        Half-width of the aspiration window of iterative deepening alphabeta
+        search: each iteration searches the root with a window around the
+        score of the previous iteration, and again with the failing side of
+        the window open if the score falls outside of it. The width depends
+        on the scale of score_fn; None searches with the full window.
+
+    time_manager : boolean (optional)
+        Flag indicating whether iterative deepening should stop when the
+        next iteration is not predicted to finish in the time left, and
+        keep a safety margin of at least the timeout that also covers the
+        time spent unwinding the search, as measured in the turns that ran
+        into it (see `time_manager.TimeManager`).
+        Ignored in node-budget mode.
+
+    forced_extension : boolean (optional)
+        Flag indicating whether alphabeta search should not count a move
+        toward the search depth when it is the only legal move.
+
+    mobility_extension : int (optional)
+        Number of legal moves at or below which alphabeta search continues
+        one more ply past the search depth instead of evaluating the state,
+        where the player to move is close to being isolated and the
+        heuristic is least reliable; 0 disables the extension.
+
+    extension_limit : int (optional)
+        Maximum number of plies added by the extensions to one path.
     """
 
     def __init__(self, search_depth=3, score_fn=custom_score,
-                 iterative=True, method='minimax', timeout=10.):
+                 iterative=True, method='minimax', timeout=10.,
+                 make_unmake=False, tt_size=0, tt_policy='depth',
+                 move_ordering=False, mobility_ordering=False, node_budget=None,
+                 stats=None, book=None, endgame_cells=0, endgame_table=None,
+                 partition_endgame=False, workers=1, pvs=False, aspiration=None,
+                 time_manager=False, forced_extension=False, mobility_extension=0,
+                 extension_limit=4):
         self.search_depth = search_depth
         self.iterative = iterative
         self.score = score_fn
         self.method = method
         self.time_left = None
         self.TIMER_THRESHOLD = timeout
+        self.make_unmake = make_unmake
+        self.tt = TranspositionTable(tt_size, tt_policy) if tt_size else None
+        self.move_ordering = move_ordering
+        self.mobility_ordering = mobility_ordering
+        self.node_budget = node_budget
+        self.turn_budget = None  # nodes allowed in the current turn, in node-budget mode
+        self.stats = stats
+        self.book = PositionTable(book) if book else None
+        self.endgame_cells = endgame_cells
+        self.endgame = EndgameSolver(PositionTable(endgame_table) if endgame_table else None) \
+            if endgame_cells else None
+        self.partition_endgame = partition_endgame
+        self.partition_path = []  # rest of the longest path being walked
+        self.workers = workers
+        self.pool = None  # worker processes for root splitting
+        self.pvs = pvs
+        self.aspiration = aspiration
+        self.researches = {"pvs": 0, "aspiration": 0}  # re-searches of the latest turn
+        self.time_manager = TimeManager(timeout) if time_manager else None
+        self.forced_extension = forced_extension
+        self.mobility_extension = mobility_extension
+        self.extension_limit = extension_limit
+        self.extension_ply = 0  # plies added by extensions to the current path
+        self.extensions = {"forced": 0, "mobility": 0}  # extensions of the latest turn
+        self.killers = {}  # move count -> [killer move, previous killer move]
+        self.history = {}  # (maximizing_player, move) -> cutoff history score
+        self.root_ply = None  # move count of the root of the current search
+        self.pv_move = None  # best move of the previous deepening iteration
+        self.nodes = 0  # number of nodes visited by minimax/alphabeta
+        self.iteration_nodes = []  # nodes visited by each deepening iteration
         self.no_move = (-1, -1) # initial no legal moves move
 
     def get_move(self, game, legal_moves, time_left):
@@ -327,11 +600,21 @@ class CustomPlayer:
         Returns
         -------
         (int, int)
-            Board coordinates corresponding to a legal move; may return
-            (-1, -1) if there are no available legal moves.
+            Board coordinates corresponding to a legal move; returns
+            (-1, -1) only if there are no available legal moves.
         """
 
         self.time_left = time_left
+        # in node-budget mode the search runs out of time when it has visited
+        # the number of nodes allowed for the turn
+        node_budget = getattr(time_left, 'node_limit', self.node_budget)
+        self.turn_budget = node_budget
+        if node_budget is not None:
+            self.time_left = lambda: float("inf") if self.nodes < node_budget else float("-inf")
+        manager = self.time_manager if node_budget is None else None
+        if manager is not None:
+            manager.start_turn(time_left)
+            self.TIMER_THRESHOLD = manager.margin
 
         # TODO: finish this function!
 
@@ -341,10 +624,25 @@ class CustomPlayer:
         
         # if there are no available legal moves
         if not legal_moves: return self.no_move
+        # let the entries of the previous turn be replaced
+        if self.tt is not None: self.tt.new_search()
+        # reset the per-turn search state used for move ordering and reports
+        self.killers.clear()
+        for key in self.history:
+            self.history[key] //= 2
+        self.root_ply = game.move_count
+        self.pv_move = None
+        self.nodes = 0
+        self.iteration_nodes = []
+        self.researches = {"pvs": 0, "aspiration": 0}
+        self.extensions = {"forced": 0, "mobility": 0}
+        self.extension_ply = 0
         # initialize no move best_move 
         best_move = self.no_move
         # occupy center of the board, probably the most winning positions at the beginning of the game
         if game.move_count <= 1:
+            # a new game: drop the path left over from the previous one
+            self.partition_path = []
             x_tmp = int(game.width/2)
             y_tmp = int(game.height/2)
             if (x_tmp, y_tmp) in legal_moves:
@@ -353,7 +651,14 @@ class CustomPlayer:
                 return (x_tmp, y_tmp - 1)
             else:
                 return legal_moves[random.randint(0, len(legal_moves) - 1)]
-         
+        # play known opening moves and winning endgame moves without searching
+        known_move = self.known_move(game, legal_moves)
+        if known_move is not None: return known_move
+
+        if self.stats is not None: self.stats.start_move(game)
+        depth_completed = None
+        timed_out = False
+        stopped_early = False
         try:
             # The search method call (alpha beta or minimax) should happen in
             # here in order to avoid timeout. The try/except block will
@@ -366,25 +671,364 @@ class CustomPlayer:
             else:
                 optimizer_meth = self.alphabeta
             
+            # split the root moves over worker processes
+            if self.workers > 1 and self.method == 'alphabeta':
+                best_move, depth_completed = self.root_split(game, legal_moves)
             # iterative deepening search in case of it is chosen
-            if self.iterative:
+            elif self.iterative:
                 depth = 0
+                score = None
                 while self.time_left() > self.TIMER_THRESHOLD:
-                    _, best_move = optimizer_meth(game, depth)
+                    nodes = self.nodes
+                    if self.aspiration is not None and self.method == 'alphabeta':
+                        score, move = self.aspiration_search(game, depth, score)
+                    else:
+                        score, move = optimizer_meth(game, depth)
+                    depth_completed = depth
+                    self.iteration_nodes.append(self.nodes - nodes)
+                    # no move is returned at depth 0 or when every move loses;
+                    # keep the move of the shallower search then
+                    if move in legal_moves:
+                        best_move = move
+                    # search the best move first in the next iteration
+                    self.pv_move = best_move
                     # go one step deeper
                     depth += 1
+                    # stop once the game is decided or the next iteration
+                    # is not expected to finish in time
+                    if manager is not None and (abs(score) == float("inf") or
+                                                not manager.next_iteration_fits(self.iteration_nodes)):
+                        stopped_early = True
+                        break
             # fixed-depth search in case of no iterative deepening is chosen
             else:
                 #best_score, best_move = optimizer_meth(game, self.search_depth)
                 _, best_move = optimizer_meth(game, self.search_depth)
+                depth_completed = self.search_depth
 
         except Timeout:
             # Handle any actions required at timeout, if necessary
-            return best_move
+            timed_out = True
+
+        # never forfeit with legal moves left: play the move that keeps the
+        # most moves open if no search completed with a move
+        if best_move not in legal_moves:
+            best_move = max(legal_moves, key=game.count_moves)
+
+        if self.stats is not None:
+            wasted = self.nodes - sum(self.iteration_nodes) if timed_out else 0
+            self.stats.end_move(self.nodes, depth_completed, timed_out, time_left(),
+                                wasted_nodes=wasted, stopped_early=stopped_early)
+        if manager is not None:
+            manager.end_turn(self.iteration_nodes, timed_out)
 
         # Return the best move from the last completed search iteration
         return best_move
 
+    def root_split(self, game, legal_moves):
+        """Run alphabeta search (iterative deepening, or a single search at
+        self.search_depth) with the root moves dealt out to self.workers
+        worker processes. Every worker stops at the same deadline, set
+        TIMER_THRESHOLD milliseconds before the end of the turn, and only
+        iterations completed by all the workers are used. In node-budget mode
+        there is no deadline: every iteration deals out the nodes left in the
+        turn's budget evenly to the workers.
+
+        Parameters
+        ----------
+        game : isolation.Board
+            The current game state
+
+        legal_moves : list<(int, int)>
+            The legal moves of the active player
+
+        Returns
+        -------
+        ((int, int), int or None)
+            The best move of the deepest completed search, and its depth
+        """
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(self.workers)
+        best_move, depth_completed = legal_moves[0], None
+        depths = itertools.count(1) if self.iterative else [self.search_depth]
+        for depth in depths:
+            if self.time_left() <= self.TIMER_THRESHOLD:
+                break
+            # search the best move of the previous iteration first
+            moves = sorted(legal_moves, key=lambda move: move != self.pv_move)
+            splits = min(self.workers, len(moves))
+            if self.turn_budget is not None:
+                deadline, timeout = None, None
+                share = (self.turn_budget - self.nodes) // splits
+                if share <= 0:
+                    break
+            else:
+                deadline = time.monotonic() + (self.time_left() - self.TIMER_THRESHOLD) / 1000.
+                timeout = max(0., deadline - time.monotonic()) + self.TIMER_THRESHOLD / 2000.
+                share = None
+            futures = [self.pool.submit(search_root_moves, game, moves[idx::self.workers], depth,
+                                        deadline, share, self.stats is not None)
+                       for idx in range(splits)]
+            done, _ = wait(futures, timeout=timeout)
+            if len(done) < len(futures):
+                break
+            results = [future.result() for future in futures]
+            self.nodes += sum(nodes for _, nodes, _, _ in results)
+            if self.stats is not None:
+                for _, _, _, record in results:
+                    self.stats.merge(record)
+            if not all(complete for _, _, complete, _ in results):
+                break
+            scores = dict((move, score) for moves_scores, _, _, _ in results for score, move in moves_scores)
+            # the first of the best moves in root order, like the serial search
+            best_move = max(moves, key=lambda move: (scores[move], -moves.index(move)))
+            depth_completed = depth
+            self.iteration_nodes.append(sum(nodes for _, nodes, _, _ in results))
+            self.pv_move = best_move
+        return best_move, depth_completed
+
+    def close(self):
+        """Stop the worker processes used for root splitting."""
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
+
+    def __getstate__(self):
+        """Leave out the state that cannot be sent to a worker process (the
+        worker pool, memory-mapped tables and timer) or that the workers do
+        not use."""
+        state = self.__dict__.copy()
+        state.update(pool=None, workers=1, time_left=None, tt=None, book=None,
+                     endgame=None, stats=None, partition_path=[], time_manager=None)
+        return state
+
+    def known_move(self, game, legal_moves):
+        """Return the opening book move for the current state, or a winning
+        move found by the endgame solver, or None if neither applies.
+
+        Parameters
+        ----------
+        game : isolation.Board
+            The current game state
+
+        legal_moves : list<(int, int)>
+            The legal moves of the active player
+
+        Returns
+        -------
+        (int, int) or None
+            A legal move to play without searching
+        """
+        # the books, tables and partition paths are all built for knight moves
+        if getattr(game, "move_rule", KNIGHT) != KNIGHT:
+            return None
+        if self.book is not None and (self.book.width, self.book.height) == (game.width, game.height):
+            entry = self.book.lookup(game.hash())
+            if entry is not None and entry[0] in legal_moves:
+                return entry[0]
+        if self.partition_endgame:
+            move = self.partition_move(game, legal_moves)
+            if move is not None:
+                return move
+        if self.endgame is not None and game.count_moves(game.NOT_MOVED) <= self.endgame_cells:
+            if self.turn_budget is not None:
+                # count the solver's nodes against at most half the turn's budget
+                limit = self.nodes + (self.turn_budget - self.nodes) // 2
+
+                def solver_time_left():
+                    self.nodes += 1
+                    return float("inf") if self.nodes <= limit else float("-inf")
+                time_left, threshold = solver_time_left, 0.
+            else:
+                time_left, threshold = self.time_left, self.time_left() / 2
+            try:
+                move, score = self.endgame.solve(game, time_left, threshold)
+            except SolveTimeout:
+                return None
+            # leave lost positions to the search, which picks the move most
+            # likely to make an imperfect opponent go wrong
+            if score == WIN and move in legal_moves:
+                return move
+        return None
+
+    def partition_move(self, game, legal_moves):
+        """Return the next move of the longest path in the agent's region if
+        the players are separated, or None otherwise. An exact path is kept
+        and followed in the next turns, since the opponent cannot block it.
+        """
+        if self.partition_path and self.partition_path[0] in legal_moves and game.is_partitioned():
+            return self.partition_path.pop(0)
+        self.partition_path = []
+        if not game.is_partitioned():
+            return None
+        _, path, exact = longest_path(game, self, time_left=self.time_left,
+                                      threshold=self.TIMER_THRESHOLD)
+        if not path or path[0] not in legal_moves:
+            return None
+        if exact:
+            self.partition_path = path[1:]
+        return path[0]
+
+    def effective_branching_factor(self):
+        """Return the ratio of the nodes visited by the last two completed
+        iterations of iterative deepening in the latest call to get_move(),
+        or None if fewer than two iterations completed."""
+        if len(self.iteration_nodes) < 2 or not self.iteration_nodes[-2]:
+            return None
+        return self.iteration_nodes[-1] / self.iteration_nodes[-2]
+
+    def order_moves(self, game, legal_moves, hash_move, maximizing_player):
+        """Sort legal moves so that the moves most likely to cause a cutoff
+        are searched first: the previous iteration's best move at the root
+        (or the transposition table move), then the killer moves of the ply,
+        then the moves with the highest history score, and optionally the
+        moves leading to the most open cells.
+
+        Parameters
+        ----------
+        game : isolation.Board
+            The current game state
+
+        legal_moves : list<(int, int)>
+            The legal moves of the active player
+
+        hash_move : (int, int) or None
+            The best move stored for this state in the transposition table
+
+        maximizing_player : bool
+            Flag indicating whether the current search depth corresponds to a
+            maximizing layer (True) or a minimizing layer (False)
+
+        Returns
+        -------
+        list<(int, int)>
+            The legal moves in search order
+        """
+        if game.move_count == self.root_ply and self.pv_move is not None:
+            hash_move = self.pv_move
+        killers = self.killers.get(game.move_count, ())
+        history = self.history
+
+        def priority(move):
+            if move == hash_move:
+                tier = 3
+            elif move in killers:
+                tier = 2 if move == killers[0] else 1
+            else:
+                tier = 0
+            if self.mobility_ordering:
+                return tier, history.get((maximizing_player, move), 0), game.count_moves(move)
+            return tier, history.get((maximizing_player, move), 0)
+
+        return sorted(legal_moves, key=priority, reverse=True)
+
+    def record_cutoff(self, game, move, depth, maximizing_player):
+        """Update the killer moves and the history table with a move that
+        caused a beta (or alpha) cutoff at the given remaining depth."""
+        killers = self.killers.setdefault(game.move_count, [])
+        if not killers or killers[0] != move:
+            killers.insert(0, move)
+            del killers[2:]
+        key = (maximizing_player, move)
+        self.history[key] = self.history.get(key, 0) + depth * depth
+
+    def evaluate(self, game):
+        """Score a leaf state with self.score(), timing the call if search
+        statistics are collected."""
+        if self.stats is not None:
+            return self.stats.score(self.score, game, self)
+        return self.score(game, self)
+
+    def legal_moves(self, game):
+        """Return the legal moves of the active player, timing the move
+        generation if search statistics are collected."""
+        if self.stats is not None:
+            return self.stats.legal_moves(game)
+        return game.get_legal_moves()
+
+    def tt_key(self, game):
+        """Return the transposition table key of a game state, which also
+        identifies which player this agent is in the game."""
+        key = game.hash()
+        return key if game.__player_1__ is self else key ^ PLAYER_2_KEY
+
+    def record_research(self, kind):
+        """Count a re-search of the given kind ('pvs' or 'aspiration')."""
+        self.researches[kind] += 1
+        if self.stats is not None:
+            self.stats.research(kind)
+
+    def record_extension(self, kind):
+        """Count a search extension of the given kind ('forced' or
+        'mobility')."""
+        self.extensions[kind] += 1
+        if self.stats is not None:
+            self.stats.extension(kind)
+
+    def horizon_extension(self, game):
+        """Return whether to search a state at the search depth one ply
+        deeper, because the player to move has few legal moves left. The
+        search counts the extension once it expands the state."""
+        if not self.mobility_extension or self.extension_ply >= self.extension_limit:
+            return False
+        moves = game.count_moves(game.get_player_location(game.active_player))
+        return 0 < moves <= self.mobility_extension
+
+    def aspiration_search(self, game, depth, guess):
+        """Run an alphabeta search of the root with a window of
+        self.aspiration on both sides of guess, the score of the previous
+        iteration, and search again with the failing side of the window open
+        if the score falls outside of it.
+
+        Returns
+        -------
+        (float, (int, int))
+            The score and best move of the search, as returned by alphabeta
+        """
+        if guess is None or math.isinf(guess):
+            return self.alphabeta(game, depth)
+        alpha, beta = guess - self.aspiration, guess + self.aspiration
+        score, move = self.alphabeta(game, depth, alpha, beta)
+        if score <= alpha:
+            self.record_research('aspiration')
+            score, move = self.alphabeta(game, depth, float("-inf"), beta)
+        elif score >= beta:
+            self.record_research('aspiration')
+            score, move = self.alphabeta(game, depth, alpha, float("inf"))
+        return score, move
+
+    def search_child(self, search_fn, game, move, *args):
+        """Apply a move and search the resulting child state, either on a
+        copy of the board or, if self.make_unmake is set, on the same board
+        which is restored before returning (also when the search times out).
+
+        Parameters
+        ----------
+        search_fn : callable
+            The search method (self.minimax or self.alphabeta) to call on the
+            child state.
+
+        game : isolation.Board
+            The current game state
+
+        move : (int, int)
+            A legal move for the active player in the current game state
+
+        *args
+            The remaining arguments for search_fn after the game state
+
+        Returns
+        -------
+        The value returned by search_fn for the child state
+        """
+        if not self.make_unmake:
+            return search_fn(game.forecast_move(move), *args)
+        game.push_move(move)
+        try:
+            return search_fn(game, *args)
+        finally:
+            game.pop_move()
+
     def minimax(self, game, depth, maximizing_player=True):
         """Implement the minimax search algorithm as described in the lectures.
 
@@ -418,6 +1062,7 @@ class CustomPlayer:
         """
         if self.time_left() < self.TIMER_THRESHOLD:
             raise Timeout()
+        self.nodes += 1
         
         # initial best_move variable for no legal moves scenario
         best_move = self.no_move
@@ -426,15 +1071,15 @@ class CustomPlayer:
         # define optimizing function base on player type
         optimizer_fn = max if maximizing_player else min
         # check for the bottom of the tree 
-        if depth is 0: return self.score(game, self), best_move
+        if depth is 0: return self.evaluate(game), best_move
         # get active player moves
-        legal_moves = game.get_legal_moves() 
+        legal_moves = self.legal_moves(game)
         # check if no more moves available
-        if not legal_moves: return self.score(game, self), best_move
+        if not legal_moves: return self.evaluate(game), best_move
         # recursive minimax search in legal_moves
         for tmp_move in legal_moves:
             # get score
-            tmp_score, _ = self.minimax(game.forecast_move(tmp_move), depth - 1, not maximizing_player)
+            tmp_score, _ = self.search_child(self.minimax, game, tmp_move, depth - 1, not maximizing_player)
             # choose the best score base on minimizing or maximizing player demand
             best_score, best_move = optimizer_fn((best_score, best_move), (tmp_score, tmp_move))      
         
@@ -480,21 +1125,66 @@ class CustomPlayer:
         """
         if self.time_left() < self.TIMER_THRESHOLD:
             raise Timeout()
+        self.nodes += 1
 
         # initial best_move variable for no legal moves scenario
         best_move = self.no_move
         # best_score base on palyer type
         best_score = alpha if maximizing_player else beta
-        # check for the bottom of the tree 
-        if depth is 0: return self.score(game, self), best_move
+        # plies added to the path by extensions at this node
+        extended = 0
+        horizon = False
+        # check for the bottom of the tree, unless the state is worth one more ply
+        if depth is 0:
+            if not self.horizon_extension(game): return self.evaluate(game), best_move
+            depth, extended, horizon = 1, 1, True
+        # reuse the result of an earlier search of this position if it is
+        # deep enough and its score is exact or a bound outside the window
+        hash_move = None
+        if self.tt is not None:
+            tt_key = self.tt_key(game)
+            entry = self.tt.probe(tt_key)
+            if entry is not None:
+                _, tt_depth, tt_score, tt_flag, hash_move, _ = entry
+                if tt_depth >= depth and (tt_flag == EXACT or (tt_flag == LOWER and tt_score >= beta)
+                                          or (tt_flag == UPPER and tt_score <= alpha)):
+                    return tt_score, hash_move
+            alpha_orig, beta_orig = alpha, beta
         # get active player moves
-        legal_moves = game.get_legal_moves() 
+        legal_moves = self.legal_moves(game)
         # check if no more moves available
-        if not legal_moves: return self.score(game, self), best_move      
+        if not legal_moves: return self.evaluate(game), best_move      
+        # search the moves most likely to cause a cutoff first
+        if self.move_ordering:
+            legal_moves = self.order_moves(game, legal_moves, hash_move, maximizing_player)
+        # a forced move does not count toward the depth
+        child_depth = depth - 1
+        if self.forced_extension and len(legal_moves) == 1 and \
+                self.extension_ply + extended < self.extension_limit:
+            self.record_extension('forced')
+            child_depth, extended = depth, extended + 1
+        # count the horizon extension only now that the children are searched
+        if horizon: self.record_extension('mobility')
+        self.extension_ply += extended
         # recursive alphabeta search in legal_moves
-        for tmp_move in legal_moves:
+        for idx, tmp_move in enumerate(legal_moves):
             # get score
-            tmp_score, _ = self.alphabeta(game.forecast_move(tmp_move), depth - 1, alpha, beta, not maximizing_player)
+            if self.pvs and idx:
+                # prove with a null window that the move is no better than the
+                # best so far, and search it again if it is
+                if maximizing_player:
+                    window = (alpha, math.nextafter(alpha, math.inf))
+                else:
+                    window = (math.nextafter(beta, -math.inf), beta)
+                tmp_score, _ = self.search_child(self.alphabeta, game, tmp_move, child_depth,
+                                                 window[0], window[1], not maximizing_player)
+                if alpha < tmp_score < beta:
+                    self.record_research('pvs')
+                    tmp_score, _ = self.search_child(self.alphabeta, game, tmp_move, child_depth,
+                                                     alpha, beta, not maximizing_player)
+            else:
+                tmp_score, _ = self.search_child(self.alphabeta, game, tmp_move, child_depth,
+                                                 alpha, beta, not maximizing_player)
             # check score for maximizing player
             if maximizing_player:
                 # in case of new score higher than best score assign it to alpha value
@@ -503,7 +1193,11 @@ class CustomPlayer:
                     alpha = best_score
                 # in case of new score value higher than beta, prun this branch
                 if tmp_score >= beta: 
-                    return (tmp_score, best_move)               
+                    best_score = tmp_score
+                    if self.move_ordering:
+                        self.record_cutoff(game, tmp_move, depth, maximizing_player)
+                    if self.stats is not None: self.stats.cutoff()
+                    break
             # check score for minmizing player
             else:
                 # in case of new score lower than best score assign it to beta value
@@ -512,6 +1206,20 @@ class CustomPlayer:
                     beta = best_score
                 # in case of new score value lower or equal alpha, prun this branch
                 if tmp_score <= alpha: 
-                    return (tmp_score, best_move)       
-        
+                    best_score = tmp_score
+                    if self.move_ordering:
+                        self.record_cutoff(game, tmp_move, depth, maximizing_player)
+                    if self.stats is not None: self.stats.cutoff()
+                    break
+        self.extension_ply -= extended
+        # store the result with the kind of bound it gives on the true score
+        if self.tt is not None:
+            if best_score <= alpha_orig:
+                tt_flag = UPPER
+            elif best_score >= beta_orig:
+                tt_flag = LOWER
+            else:
+                tt_flag = EXACT
+            self.tt.store(tt_key, depth, best_score, tt_flag, best_move)
+
         return best_score, best_move
@@ -0,0 +1,231 @@
+"""
+This file contains a compact binary format for the games played in
+tournaments, and a streaming reader to replay and analyse them.
+
+A record file is a sequence of game records, each one made of a header, the
+names of the two agents and two bytes (row, column) per move:
+
+    magic           4 bytes, b"ISGR"
+    width, height   1 byte each
+    winner          1 byte, 0 for player 1, 1 for player 2, 0xFF for none
+    termination     1 byte, the index of the reason in TERMINATIONS
+    name lengths    1 byte each, for player 1 and player 2
+    moves           2 bytes, the number of moves
+    names           UTF-8 bytes of the player 1 and player 2 names
+    moves           (row, column) pairs, 0xFF 0xFF for no move
+
+The moves start from the empty board, with player 1 to move, and include the
+last move that the loser failed to make (too late, or not a legal move), as
+in the move history of `Board.play()`. A whole record is written with a
+single `write()` on a file opened in append mode, so parallel workers can
+add games to the same file. Readers never hold more than one game in
+memory.
+
+Example:
+
+    python game_records.py stats games.rec
+    python game_records.py replay games.rec --game 3
+"""
+
+import argparse
+import os
+import struct
+
+from collections import namedtuple, OrderedDict
+
+from isolation import Board
+
+MAGIC = b"ISGR"
+HEADER = struct.Struct("<4sBBBBBBH")  # magic, width, height, winner, termination, name lengths, moves
+MOVE = struct.Struct("<BB")
+NO_MOVE = 0xFF  # row and column of a missing move, and winner of a game without one
+TERMINATIONS = ["", "timeout", "illegal move"]
+
+GameRecord = namedtuple("GameRecord", ["width", "height", "players", "winner", "termination", "moves"])
+
+
+def flatten(move_history):
+    """Return the moves of a `Board.play()` move history in playing order."""
+    return [move for turn in move_history for move in turn]
+
+
+def encode_game(record):
+    """Return the bytes of a GameRecord."""
+    names = [name.encode("utf-8")[:255] for name in record.players]
+    winner = NO_MOVE if record.winner is None else record.winner
+    data = [HEADER.pack(MAGIC, record.width, record.height, winner,
+                        TERMINATIONS.index(record.termination), len(names[0]), len(names[1]),
+                        len(record.moves))]
+    data.extend(names)
+    for move in record.moves:
+        # (-1, -1) and None are both "no move"
+        if move is None or not (0 <= move[0] < record.height and 0 <= move[1] < record.width):
+            move = (NO_MOVE, NO_MOVE)
+        data.append(MOVE.pack(*move))
+    return b"".join(data)
+
+
+def write_game(path, record):
+    """Append a GameRecord to a record file with a single write."""
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, encode_game(record))
+    finally:
+        os.close(fd)
+
+
+def record_game(board, winner, move_history, termination, names, opening=()):
+    """Build the GameRecord of a game played by `Board.play()`.
+
+    Parameters
+    ----------
+    board : isolation.Board
+        The board the game was played on.
+
+    winner : object
+        The winning player returned by `Board.play()`.
+
+    move_history : list<[(int, int),]>
+        The move history returned by `Board.play()`.
+
+    termination : str
+        The termination reason returned by `Board.play()`.
+
+    names : dict
+        A map from the players of the board to the names to store.
+
+    opening : list<(int, int)> (optional)
+        The moves applied to the board before `Board.play()` was called.
+    """
+    players = (board.__player_1__, board.__player_2__)
+    return GameRecord(board.width, board.height, tuple(names[p] for p in players),
+                      players.index(winner) if winner in players else None, termination,
+                      list(opening) + flatten(move_history))
+
+
+def read_games(path):
+    """Iterate over the GameRecords of a record file."""
+    with open(path, "rb") as f:
+        while True:
+            header = f.read(HEADER.size)
+            if not header:
+                return
+            if len(header) < HEADER.size:
+                raise ValueError("{} ends with a truncated game record".format(path))
+            magic, width, height, winner, termination, len_1, len_2, num_moves = HEADER.unpack(header)
+            if magic != MAGIC:
+                raise ValueError("{} is not a game record file".format(path))
+            names = f.read(len_1), f.read(len_2)
+            data = f.read(num_moves * MOVE.size)
+            moves = [None if move[0] == NO_MOVE else move for move in MOVE.iter_unpack(data)]
+            yield GameRecord(width, height, tuple(name.decode("utf-8") for name in names),
+                             None if winner == NO_MOVE else winner, TERMINATIONS[termination], moves)
+
+
+def new_board(record):
+    """Return an empty board of the record's size with the record's names as
+    players (or "name (1)" and "name (2)" when both agents have the same
+    name)."""
+    players = record.players
+    if players[0] == players[1]:
+        players = (players[0] + " (1)", players[1] + " (2)")
+    return Board(*players, width=record.width, height=record.height)
+
+
+def replay(record):
+    """Iterate over the positions of a game, from the empty board to the
+    final position, as new boards with the names of `new_board()` as
+    players. The last move, which the loser failed to make, is not
+    applied."""
+    board = new_board(record)
+    yield board.copy()
+    for move in record.moves[:-1]:
+        board.apply_move(move)
+        yield board.copy()
+
+
+def is_illegal_loss(record):
+    """Return whether the loser of a game lost by making a move that was not
+    legal, rather than by having no legal moves left (which `Board.play()`
+    also reports as an "illegal move") or by running out of time."""
+    if record.termination != "illegal move" or not record.moves or record.moves[-1] is None:
+        return False
+    board = new_board(record)
+    for move in record.moves[:-1]:
+        board.apply_move(move)
+    return record.moves[-1] not in board.get_legal_moves()
+
+
+def agent_statistics(paths):
+    """Aggregate the games of record files by agent name.
+
+    Returns
+    -------
+    OrderedDict
+        A map from agent names to dicts with the number of games, wins,
+        wins as player 1 and games as player 1, losses by timeout and by
+        illegal move (see `is_illegal_loss()`), and total plies played (not
+        counting the move the loser failed to make).
+    """
+    stats = OrderedDict()
+    for path in paths:
+        for record in read_games(path):
+            illegal = is_illegal_loss(record)
+            for idx, name in enumerate(record.players):
+                agent = stats.setdefault(name, {"games": 0, "wins": 0, "first_games": 0, "first_wins": 0,
+                                                "timeouts": 0, "illegal_moves": 0, "plies": 0})
+                agent["games"] += 1
+                agent["plies"] += max(len(record.moves) - 1, 0)
+                if not idx:
+                    agent["first_games"] += 1
+                if record.winner == idx:
+                    agent["wins"] += 1
+                    if not idx:
+                        agent["first_wins"] += 1
+                elif record.winner is not None:
+                    if record.termination == "timeout":
+                        agent["timeouts"] += 1
+                    elif illegal:
+                        agent["illegal_moves"] += 1
+    return stats
+
+
+def print_statistics(stats):
+    """Print the table of `agent_statistics()`."""
+    print("{:<40}{:>8}{:>8}{:>10}{:>10}{:>10}".format("agent", "games", "win %", "1st win %",
+                                                       "timeouts", "plies"))
+    for name, agent in stats.items():
+        print("{:<40}{:>8}{:>8.1f}{:>10.1f}{:>10}{:>10.1f}".format(
+            name, agent["games"], 100. * agent["wins"] / agent["games"],
+            100. * agent["first_wins"] / agent["first_games"] if agent["first_games"] else 0.,
+            agent["timeouts"], agent["plies"] / agent["games"]))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Analyse and replay recorded games.")
+    subparsers = parser.add_subparsers(dest="command")
+    stats = subparsers.add_parser("stats", help="Print the results of every agent.")
+    stats.add_argument("paths", nargs="+")
+    replay_parser = subparsers.add_parser("replay", help="Print the positions of a game.")
+    replay_parser.add_argument("path")
+    replay_parser.add_argument("--game", type=int, default=0, help="Index of the game in the file.")
+    args = parser.parse_args()
+
+    if args.command == "stats":
+        print_statistics(agent_statistics(args.paths))
+    elif args.command == "replay":
+        for idx, record in enumerate(read_games(args.path)):
+            if idx == args.game:
+                print("{} vs {}".format(*record.players))
+                for ply, board in enumerate(replay(record)):
+                    if ply:
+                        print("{}. {}".format(ply, record.moves[ply - 1]))
+                    print(board.print_board())
+                print("Last move: {}, {}".format(record.moves[-1] if record.moves else None,
+                                                 record.termination))
+                print("Winner: {}".format("-" if record.winner is None else record.players[record.winner]))
+                break
+        else:
+            parser.exit(1, "{} has fewer than {} games\n".format(args.path, args.game + 1))
+    else:
+        parser.print_help()
@@ -11,6 +11,12 @@ import io
 
 # Make the Board class available at the root of the module for imports
 from .isolation import Board
+from .isolation import DIRECTIONS
+from .isolation import NodeBudget
+from .isolation import neighbour_table
+from .movetables import MOVE_RULES
+from .movetables import MoveRule
+from .bitboard import BitBoard
 
 
 def game_as_text(winner, move_history, termination="", board=Board(1, 2)):
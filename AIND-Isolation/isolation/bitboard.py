@@ -0,0 +1,403 @@
+"""
+This file contains the `BitBoard` class, an alternative engine for the
+`isolation.Board` API that stores the blocked cells of the grid in a single
+integer bitmask and looks up knight moves from tables precomputed once per
+board size.
+
+Cell (row, col) is stored in bit `row * width + col` of the mask. Construct a
+`BitBoard` directly or through `Board(player_1, player_2, bitboard=True)`.
+"""
+
+from copy import copy
+
+from .isolation import Board
+from .isolation import DIRECTIONS
+from .isolation import neighbour_table
+from .isolation import zobrist_keys
+from .movetables import KNIGHT
+from .movetables import get_rule
+
+# move tables shared by every board of the same size; see `move_tables()`
+_MOVE_TABLES = {}
+# shift tables shared by every board of the same size; see `shift_table()`
+_SHIFT_TABLES = {}
+
+
+def move_tables(width, height):
+    """
+    Return the knight-move tables for a board of the given size.
+
+    Parameters
+    ----------
+    width : int
+        The number of columns of the board.
+
+    height : int
+        The number of rows of the board.
+
+    Returns
+    ----------
+    (list<int>, list<tuple<(int, (int, int))>>)
+        For every cell index, the bitmask of all cells a knight can reach
+        from that cell, and the (bit, (row, column)) pairs of those cells in
+        the same order that `Board.__get_moves__` generates them.
+    """
+    key = (width, height)
+    if key not in _MOVE_TABLES:
+        masks = []
+        moves = []
+        for neighbours in neighbour_table(width, height):
+            cell_moves = tuple((1 << (r * width + c), (r, c)) for r, c in neighbours)
+            mask = 0
+            for bit, _ in cell_moves:
+                mask |= bit
+            masks.append(mask)
+            moves.append(cell_moves)
+        _MOVE_TABLES[key] = (masks, moves)
+    return _MOVE_TABLES[key]
+
+
+def shift_table(width, height):
+    """
+    Return the shifts that move a whole set of cells by one knight move.
+
+    Parameters
+    ----------
+    width : int
+        The number of columns of the board.
+
+    height : int
+        The number of rows of the board.
+
+    Returns
+    ----------
+    list<(int, int)>
+        For every direction in `DIRECTIONS`, the bitmask of the cells that
+        stay on the board when moving in that direction, and the distance in
+        bits to shift them by (negative for a right shift).
+    """
+    key = (width, height)
+    if key not in _SHIFT_TABLES:
+        table = []
+        for dr, dc in DIRECTIONS:
+            mask = 0
+            for r in range(height):
+                for c in range(width):
+                    if 0 <= r + dr < height and 0 <= c + dc < width:
+                        mask |= 1 << (r * width + c)
+            table.append((mask, dr * width + dc))
+        _SHIFT_TABLES[key] = table
+    return _SHIFT_TABLES[key]
+
+
+class BitBoard(Board):
+    """
+    Implement the `isolation.Board` API with the occupied cells stored in an
+    integer bitmask, so that copying a board copies a single integer instead
+    of a nested list, and move generation is a table lookup.
+
+    Parameters
+    ----------
+    player_1 : object
+        An object with a get_move() function. This is the only function
+        directly called by the Board class for each player.
+
+    player_2 : object
+        An object with a get_move() function. This is the only function
+        directly called by the Board class for each player.
+
+    width : int (optional)
+        The number of columns that the board should have.
+
+    height : int (optional)
+        The number of rows that the board should have.
+
+    move_rule : str or isolation.movetables.MoveRule (optional)
+        Must be the knight rule, the only one the move tables support.
+    """
+
+    def __init__(self, player_1, player_2, width=7, height=7, bitboard=True, move_rule=KNIGHT):
+        if get_rule(move_rule) != KNIGHT:
+            raise ValueError("BitBoard only supports knight moves, not {!r}".format(move_rule))
+        self.width = width
+        self.height = height
+        self.move_count = 0
+        self.__player_1__ = player_1
+        self.__player_2__ = player_2
+        self.__active_player__ = player_1
+        self.__inactive_player__ = player_2
+        self.__blocked__ = 0
+        self.__last_player_move__ = {player_1: Board.NOT_MOVED, player_2: Board.NOT_MOVED}
+        self.__player_symbols__ = {Board.BLANK: Board.BLANK, player_1: 1, player_2: 2}
+        self.__move_masks__, self.__move_table__ = move_tables(width, height)
+        self.__shift_table__ = shift_table(width, height)
+        self.__move_stack__ = []
+        self.__zobrist_keys__ = zobrist_keys(width, height)
+        self.__zobrist__ = 0
+        self.move_rule = KNIGHT
+
+    def __getstate__(self):
+        """ Pickle the board without the tables shared by all boards of the
+        same size, which are looked up again when the board is unpickled. """
+        state = self.__dict__.copy()
+        for name in ('__move_masks__', '__move_table__', '__shift_table__', '__zobrist_keys__'):
+            del state[name]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.__move_masks__, self.__move_table__ = move_tables(self.width, self.height)
+        self.__shift_table__ = shift_table(self.width, self.height)
+        self.__zobrist_keys__ = zobrist_keys(self.width, self.height)
+
+    def copy(self):
+        """ Return a copy of the current board. """
+        new_board = object.__new__(BitBoard)
+        new_board.__dict__.update(self.__dict__)
+        new_board.__last_player_move__ = copy(self.__last_player_move__)
+        new_board.__move_stack__ = []
+        return new_board
+
+    def move_is_legal(self, move):
+        """
+        Test whether a move is legal in the current game state.
+
+        Parameters
+        ----------
+        move : (int, int)
+            A coordinate pair (row, column) indicating the next position for
+            the active player on the board.
+
+        Returns
+        ----------
+        bool
+            Returns True if the move is legal, False otherwise
+        """
+        row, col = move
+        return 0 <= row < self.height and \
+               0 <= col < self.width and \
+               not self.__blocked__ >> (row * self.width + col) & 1
+
+    def get_blank_spaces(self):
+        """
+        Return a list of the locations that are still available on the board.
+        """
+        blocked = self.__blocked__
+        width = self.width
+        return [(i, j) for j in range(width) for i in range(self.height)
+                if not blocked >> (i * width + j) & 1]
+
+    def get_legal_moves(self, player=None):
+        """
+        Return the list of all legal moves for the specified player.
+
+        Parameters
+        ----------
+        player : object (optional)
+            An object registered as a player in the current game. If None,
+            return the legal moves for the active player on the board.
+
+        Returns
+        ----------
+        list<(int, int)>
+            The list of coordinate pairs (row, column) of all legal moves
+            for the player constrained by the current game state.
+        """
+        if player is None:
+            player = self.__active_player__
+        return self.__get_moves__(self.__last_player_move__[player])
+
+    def count_moves(self, move):
+        """
+        Count the open cells reachable in one move from a location with a
+        single mask lookup.
+
+        Parameters
+        ----------
+        move : (int, int)
+            A coordinate pair (row, column) on the board, or Board.NOT_MOVED
+            to count every open cell.
+
+        Returns
+        ----------
+        int
+            The number of legal moves for a player at that location.
+        """
+        if move == Board.NOT_MOVED:
+            return self.width * self.height - bin(self.__blocked__).count("1")
+        return bin(self.__move_masks__[move[0] * self.width + move[1]] & ~self.__blocked__).count("1")
+
+    def get_region(self, player=None):
+        """
+        Return the open cells that a player can reach with any sequence of
+        moves, flood filling all the cells of a step at once with shifts.
+
+        Parameters
+        ----------
+        player : object (optional)
+            An object registered as a player in the current game. If None,
+            return the region of the active player on the board.
+
+        Returns
+        ----------
+        list<(int, int)>
+            The coordinate pairs (row, column) of the reachable cells, in the
+            same order as `get_blank_spaces()`.
+        """
+        if player is None:
+            player = self.__active_player__
+        location = self.__last_player_move__[player]
+        if location == Board.NOT_MOVED:
+            return self.get_blank_spaces()
+        region = self.region_mask(location)
+        width = self.width
+        return [(i, j) for j in range(width) for i in range(self.height)
+                if region >> (i * width + j) & 1]
+
+    def region_mask(self, location):
+        """
+        Return the bitmask of the open cells reachable from a location.
+
+        Parameters
+        ----------
+        location : (int, int)
+            A coordinate pair (row, column) on the board.
+
+        Returns
+        ----------
+        int
+            The mask with bit `row * width + column` set for every cell of
+            the region.
+        """
+        open_cells = ~self.__blocked__ & ((1 << (self.width * self.height)) - 1)
+        frontier = self.__move_masks__[location[0] * self.width + location[1]] & open_cells
+        region = 0
+        while frontier:
+            region |= frontier
+            step = 0
+            for mask, shift in self.__shift_table__:
+                if shift > 0:
+                    step |= (frontier & mask) << shift
+                else:
+                    step |= (frontier & mask) >> -shift
+            frontier = step & open_cells & ~region
+        return region
+
+    def is_partitioned(self):
+        """
+        Test whether the players can no longer reach a common cell. From then
+        on neither player can block the other, and each player wins or loses
+        by the length of the longest path it can walk in its own region.
+        """
+        p1_loc = self.__last_player_move__[self.__player_1__]
+        p2_loc = self.__last_player_move__[self.__player_2__]
+        if Board.NOT_MOVED in (p1_loc, p2_loc):
+            return False
+        return not self.region_mask(p1_loc) & self.region_mask(p2_loc)
+
+    def apply_move(self, move):
+        """
+        Move the active player to a specified location.
+
+        Parameters
+        ----------
+        move : (int, int)
+            A coordinate pair (row, column) indicating the next position for
+            the active player on the board.
+
+        Returns
+        ----------
+        None
+        """
+        row, col = move
+        self.__toggle_hash__(self.__active_player__, move, self.__last_player_move__[self.__active_player__])
+        self.__last_player_move__[self.__active_player__] = move
+        self.__blocked__ |= 1 << (row * self.width + col)
+        self.__active_player__, self.__inactive_player__ = self.__inactive_player__, self.__active_player__
+        self.move_count += 1
+
+    def push_move(self, move):
+        """
+        Move the active player to a specified location, remembering enough
+        of the previous state to restore it with `pop_move()`.
+
+        Parameters
+        ----------
+        move : (int, int)
+            A coordinate pair (row, column) indicating the next position for
+            the active player on the board.
+
+        Returns
+        ----------
+        None
+        """
+        player = self.__active_player__
+        previous = self.__last_player_move__[player]
+        self.__move_stack__.append(previous)
+        self.__toggle_hash__(player, move, previous)
+        self.__last_player_move__[player] = move
+        self.__blocked__ |= 1 << (move[0] * self.width + move[1])
+        self.__active_player__, self.__inactive_player__ = self.__inactive_player__, player
+        self.move_count += 1
+
+    def pop_move(self):
+        """
+        Undo the most recent move applied with `push_move()`.
+
+        Returns
+        ----------
+        (int, int)
+            The coordinate pair (row, column) of the move that was undone.
+        """
+        player = self.__inactive_player__
+        self.__active_player__, self.__inactive_player__ = player, self.__active_player__
+        move = self.__last_player_move__[player]
+        self.__blocked__ &= ~(1 << (move[0] * self.width + move[1]))
+        previous = self.__move_stack__.pop()
+        self.__toggle_hash__(player, move, previous)
+        self.__last_player_move__[player] = previous
+        self.move_count -= 1
+        return move
+
+    def __get_moves__(self, move):
+        """
+        Look up the list of possible moves for an L-shaped motion (like a
+        knight in chess) from the precomputed move table.
+        """
+
+        if move == Board.NOT_MOVED:
+            return self.get_blank_spaces()
+
+        blocked = self.__blocked__
+        return [m for bit, m in self.__move_table__[move[0] * self.width + move[1]]
+                if not blocked & bit]
+
+    def to_string(self):
+        """Generate a string representation of the current game state, marking
+        the location of each player and indicating which cells have been
+        blocked, and which remain open.
+        """
+
+        p1_loc = self.__last_player_move__[self.__player_1__]
+        p2_loc = self.__last_player_move__[self.__player_2__]
+
+        out = ''
+
+        for i in range(self.height):
+            out += ' | '
+
+            for j in range(self.width):
+
+                if not self.__blocked__ >> (i * self.width + j) & 1:
+                    out += ' '
+                elif p1_loc and i == p1_loc[0] and j == p1_loc[1]:
+                    out += '1'
+                elif p2_loc and i == p2_loc[0] and j == p2_loc[1]:
+                    out += '2'
+                else:
+                    out += '-'
+
+                out += ' | '
+            out += '\n\r'
+
+        return out
@@ -1,21 +1,85 @@
 """
 This file contains the `Board` class, which implements the rules for the
 game Isolation as described in lecture, modified so that the players move
-like knights in chess rather than queens.
+like knights in chess rather than queens (other move rules are available
+from `isolation.movetables`).
 
 You MAY use and modify this class, however ALL function signatures must
 remain compatible with the defaults provided, and none of your changes will
 be available to project reviewers.
 """
 
+import random
 import timeit
 
 from copy import deepcopy
 from copy import copy
 
+from .movetables import DIRECTIONS
+from .movetables import KNIGHT
+from .movetables import get_rule
+from .movetables import neighbour_table
+from .movetables import ray_table
+
 
 TIME_LIMIT_MILLIS = 200
 
+# Zobrist keys shared by every board of the same size; see `zobrist_keys()`
+_ZOBRIST_KEYS = {}
+
+
+def zobrist_keys(width, height):
+    """
+    Return the random 64-bit keys used to hash boards of the given size.
+
+    The keys are drawn from a generator seeded with the board size, so the
+    hash of a position is the same in every process (e.g., for tables that
+    are stored on disk).
+
+    Parameters
+    ----------
+    width : int
+        The number of columns of the board.
+
+    height : int
+        The number of rows of the board.
+
+    Returns
+    ----------
+    (list<int>, (list<int>, list<int>), int)
+        A key for each blocked cell, a key for each cell occupied by player 1
+        and by player 2, and the key toggled after every move.
+    """
+    key = (width, height)
+    if key not in _ZOBRIST_KEYS:
+        rng = random.Random("zobrist-{}x{}".format(width, height))
+        num_cells = width * height
+        cell_keys = [rng.getrandbits(64) for _ in range(num_cells)]
+        player_keys = ([rng.getrandbits(64) for _ in range(num_cells)],
+                       [rng.getrandbits(64) for _ in range(num_cells)])
+        _ZOBRIST_KEYS[key] = (cell_keys, player_keys, rng.getrandbits(64))
+    return _ZOBRIST_KEYS[key]
+
+
+class NodeBudget:
+    """
+    The `time_left` function passed to the players by `Board.play` when the
+    turns are limited by search nodes instead of time. It never runs out of
+    time; players that support node budgets read `node_limit` from it and
+    stop searching after expanding that many nodes.
+
+    Parameters
+    ----------
+    node_limit : int
+        The maximum number of search nodes a player may expand in one turn.
+    """
+
+    def __init__(self, node_limit):
+        self.node_limit = node_limit
+
+    def __call__(self):
+        return float("inf")
+
 
 class Board(object):
     """
@@ -37,11 +101,28 @@ class Board(object):
 
     height : int (optional)
         The number of rows that the board should have.
+
+    bitboard : bool (optional)
+        Flag indicating whether to construct the integer bitmask engine
+        (`isolation.bitboard.BitBoard`) instead of the list-of-lists board.
+        Both engines expose the same public API and generate moves in the
+        same order.
+
+    move_rule : str or isolation.movetables.MoveRule (optional)
+        How the players move: "knight" (default), "king" or "queen" (see
+        `isolation.movetables`). Only the list-of-lists board supports
+        rules other than "knight".
     """
     BLANK = 0
     NOT_MOVED = None
 
-    def __init__(self, player_1, player_2, width=7, height=7):
+    def __new__(cls, *args, bitboard=False, **kwargs):
+        if bitboard and cls is Board:
+            from .bitboard import BitBoard
+            cls = BitBoard
+        return super(Board, cls).__new__(cls)
+
+    def __init__(self, player_1, player_2, width=7, height=7, bitboard=False, move_rule=KNIGHT):
         self.width = width
         self.height = height
         self.move_count = 0
@@ -52,6 +133,28 @@ class Board(object):
         self.__board_state__ = [[Board.BLANK for i in range(width)] for j in range(height)]
         self.__last_player_move__ = {player_1: Board.NOT_MOVED, player_2: Board.NOT_MOVED}
         self.__player_symbols__ = {Board.BLANK: Board.BLANK, player_1: 1, player_2: 2}
+        self.__move_stack__ = []
+        self.__zobrist_keys__ = zobrist_keys(width, height)
+        self.__zobrist__ = 0
+        self.move_rule = get_rule(move_rule)
+        self.__neighbours__ = neighbour_table(width, height, self.move_rule)
+        # the rays of a sliding rule, which stop at the first blocked cell
+        self.__rays__ = ray_table(width, height, self.move_rule) if self.move_rule.max_distance > 1 else None
+
+    def __getstate__(self):
+        """ Pickle the board without the tables shared by all boards of the
+        same size (e.g., to send it to another process), which are looked up
+        again when the board is unpickled. """
+        state = self.__dict__.copy()
+        del state['__neighbours__'], state['__rays__'], state['__zobrist_keys__']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.__neighbours__ = neighbour_table(self.width, self.height, self.move_rule)
+        self.__rays__ = ray_table(self.width, self.height, self.move_rule) \
+            if self.move_rule.max_distance > 1 else None
+        self.__zobrist_keys__ = zobrist_keys(self.width, self.height)
 
     @property
     def active_player(self):
@@ -93,15 +196,36 @@ class Board(object):
 
     def copy(self):
         """ Return a deep copy of the current board. """
-        new_board = Board(self.__player_1__, self.__player_2__, width=self.width, height=self.height)
+        new_board = Board(self.__player_1__, self.__player_2__, width=self.width, height=self.height,
+                          move_rule=self.move_rule)
         new_board.move_count = self.move_count
         new_board.__active_player__ = self.__active_player__
         new_board.__inactive_player__ = self.__inactive_player__
         new_board.__last_player_move__ = copy(self.__last_player_move__)
         new_board.__player_symbols__ = copy(self.__player_symbols__)
         new_board.__board_state__ = deepcopy(self.__board_state__)
+        new_board.__zobrist__ = self.__zobrist__
         return new_board
 
+    def hash(self):
+        """
+        Return the Zobrist hash of the current game state, which identifies
+        the blocked cells, the player locations and the player to move. The
+        hash is updated incrementally by every move.
+        """
+        return self.__zobrist__
+
+    def __toggle_hash__(self, player, move, previous):
+        """ Update the Zobrist hash for `player` moving from `previous` to
+        `move` (or undoing that move). """
+        cell_keys, player_keys, side_key = self.__zobrist_keys__
+        player_keys = player_keys[self.__player_symbols__[player] - 1]
+        cell = move[0] * self.width + move[1]
+        h = self.__zobrist__ ^ cell_keys[cell] ^ player_keys[cell] ^ side_key
+        if previous != Board.NOT_MOVED:
+            h ^= player_keys[previous[0] * self.width + previous[1]]
+        self.__zobrist__ = h
+
     def forecast_move(self, move):
         """
         Return a deep copy of the current game with an input move applied to
@@ -185,6 +309,100 @@ class Board(object):
             player = self.active_player
         return self.__get_moves__(self.__last_player_move__[player])
 
+    def count_moves(self, move):
+        """
+        Count the open cells reachable in one move from a location, without
+        building the list of moves.
+
+        Parameters
+        ----------
+        move : (int, int)
+            A coordinate pair (row, column) on the board, or Board.NOT_MOVED
+            to count every open cell.
+
+        Returns
+        ----------
+        int
+            The number of legal moves for a player at that location.
+        """
+        if move == Board.NOT_MOVED:
+            return len(self.get_blank_spaces())
+        if self.__rays__ is not None:
+            return len(self.__get_moves__(move))
+        state = self.__board_state__
+        return sum(1 for r, c in self.__neighbours__[move[0] * self.width + move[1]]
+                   if state[r][c] == Board.BLANK)
+
+    def get_region(self, player=None):
+        """
+        Return the open cells that a player can reach with any sequence of
+        moves (a flood fill over the blank cells from the player's location).
+
+        Parameters
+        ----------
+        player : object (optional)
+            An object registered as a player in the current game. If None,
+            return the region of the active player on the board.
+
+        Returns
+        ----------
+        list<(int, int)>
+            The coordinate pairs (row, column) of the reachable cells, in the
+            same order as `get_blank_spaces()`.
+        """
+        if player is None:
+            player = self.__active_player__
+        location = self.__last_player_move__[player]
+        if location == Board.NOT_MOVED:
+            return self.get_blank_spaces()
+        return sorted(self.__flood_fill__(location), key=lambda cell: (cell[1], cell[0]))
+
+    def region_mask(self, location):
+        """
+        Return the open cells reachable from a location as a bitmask.
+
+        Parameters
+        ----------
+        location : (int, int)
+            A coordinate pair (row, column) on the board.
+
+        Returns
+        ----------
+        int
+            The mask with bit `row * width + column` set for every cell of
+            the region.
+        """
+        mask = 0
+        for r, c in self.__flood_fill__(location):
+            mask |= 1 << (r * self.width + c)
+        return mask
+
+    def __flood_fill__(self, location):
+        """ Return the set of open cells reachable from a location. """
+        state = self.__board_state__
+        neighbours = self.__neighbours__
+        region = set()
+        stack = [location]
+        while stack:
+            r, c = stack.pop()
+            for cell in neighbours[r * self.width + c]:
+                if cell not in region and state[cell[0]][cell[1]] == Board.BLANK:
+                    region.add(cell)
+                    stack.append(cell)
+        return region
+
+    def is_partitioned(self):
+        """
+        Test whether the players can no longer reach a common cell. From then
+        on neither player can block the other, and each player wins or loses
+        by the length of the longest path it can walk in its own region.
+        """
+        if Board.NOT_MOVED in (self.__last_player_move__[self.__player_1__],
+                               self.__last_player_move__[self.__player_2__]):
+            return False
+        return not self.__flood_fill__(self.__last_player_move__[self.__player_1__]) & \
+            self.__flood_fill__(self.__last_player_move__[self.__player_2__])
+
     def apply_move(self, move):
         """
         Move the active player to a specified location.
@@ -200,11 +418,53 @@ class Board(object):
         None
         """
         row, col = move
+        self.__toggle_hash__(self.active_player, move, self.__last_player_move__[self.active_player])
         self.__last_player_move__[self.active_player] = move
         self.__board_state__[row][col] = self.__player_symbols__[self.active_player]
         self.__active_player__, self.__inactive_player__ = self.__inactive_player__, self.__active_player__
         self.move_count += 1
 
+    def push_move(self, move):
+        """
+        Move the active player to a specified location, remembering enough
+        of the previous state to restore it with `pop_move()`.
+
+        Unlike `forecast_move()`, this changes the calling object, which lets
+        a search walk the game tree on a single board without copying it.
+        Moves applied with `apply_move()` (or before a `copy()`) cannot be
+        undone.
+
+        Parameters
+        ----------
+        move : (int, int)
+            A coordinate pair (row, column) indicating the next position for
+            the active player on the board.
+
+        Returns
+        ----------
+        None
+        """
+        self.__move_stack__.append(self.__last_player_move__[self.__active_player__])
+        self.apply_move(move)
+
+    def pop_move(self):
+        """
+        Undo the most recent move applied with `push_move()`.
+
+        Returns
+        ----------
+        (int, int)
+            The coordinate pair (row, column) of the move that was undone.
+        """
+        previous = self.__move_stack__.pop()
+        self.__active_player__, self.__inactive_player__ = self.__inactive_player__, self.__active_player__
+        move = self.__last_player_move__[self.__active_player__]
+        self.__board_state__[move[0]][move[1]] = Board.BLANK
+        self.__toggle_hash__(self.__active_player__, move, previous)
+        self.__last_player_move__[self.__active_player__] = previous
+        self.move_count -= 1
+        return move
+
     def is_winner(self, player):
         """ Test whether the specified player has won the game. """
         return player == self.inactive_player and not self.get_legal_moves(self.active_player)
@@ -250,18 +510,25 @@ class Board(object):
     def __get_moves__(self, move):
         """
         Generate the list of possible moves for an L-shaped motion (like a
-        knight in chess).
+        knight in chess), or for the board's move rule.
         """
 
         if move == Board.NOT_MOVED:
             return self.get_blank_spaces()
 
-        r, c = move
+        state = self.__board_state__
 
-        directions = [(-2, -1), (-2, 1), (-1, -2), (-1, 2),
-                      (1, -2),  (1, 2), (2, -1),  (2, 1)]
+        if self.__rays__ is not None:
+            valid_moves = []
+            for ray in self.__rays__[move[0] * self.width + move[1]]:
+                for r, c in ray:
+                    if state[r][c] != Board.BLANK:
+                        break
+                    valid_moves.append((r, c))
+            return valid_moves
 
-        valid_moves = [(r+dr,c+dc) for dr, dc in directions if self.move_is_legal((r+dr, c+dc))]
+        valid_moves = [(r, c) for r, c in self.__neighbours__[move[0] * self.width + move[1]]
+                       if state[r][c] == Board.BLANK]
 
         return valid_moves
 
@@ -299,7 +566,7 @@ class Board(object):
 
         return out
 
-    def play(self, time_limit=TIME_LIMIT_MILLIS):
+    def play(self, time_limit=TIME_LIMIT_MILLIS, node_limit=None):
         """
         Execute a match between the players by alternately soliciting them
         to select a move and applying it in the game.
@@ -310,6 +577,13 @@ class Board(object):
             The maximum number of milliseconds to allow before timeout
             during each turn.
 
+        node_limit : int (optional)
+            The maximum number of search nodes to allow during each turn.
+            If set, the players receive a `NodeBudget` instead of a timer and
+            time_limit is not enforced, so the outcome of the game does not
+            depend on the speed of the machine. Every player must support
+            node budgets (e.g., `CustomPlayer`) or search a fixed depth.
+
         Returns
         ----------
         (player, list<[(int, int),]>, str)
@@ -327,8 +601,11 @@ class Board(object):
 
             game_copy = self.copy()
 
-            move_start = curr_time_millis()
-            time_left = lambda : time_limit - (curr_time_millis() - move_start)
+            if node_limit is not None:
+                time_left = NodeBudget(node_limit)
+            else:
+                move_start = curr_time_millis()
+                time_left = lambda : time_limit - (curr_time_millis() - move_start)
             curr_move = self.active_player.get_move(game_copy, legal_player_moves, time_left)
             move_end = time_left()
 
@@ -0,0 +1,127 @@
+"""
+This file contains the move rules supported by `isolation.Board` and the
+move tables precomputed for them, once per process for every board size and
+rule.
+
+A move rule is a set of directions and the maximum number of steps a player
+may take along one of them in a single move:
+
+    knight      the eight L-shaped jumps of a chess knight (the default)
+    king        one step to any of the eight surrounding cells
+    queen       up to `QUEEN_DISTANCE` steps in a straight line along a row,
+                column or diagonal, stopping before the first blocked cell
+
+A rule that takes a single step per move (knight, king) jumps over blocked
+cells, so its moves from a cell are the open cells of `neighbour_table()`. A
+sliding rule (queen) walks the rays of `ray_table()` instead.
+"""
+
+from collections import namedtuple
+
+MoveRule = namedtuple("MoveRule", ["name", "directions", "max_distance"])
+
+# L-shaped (knight) move offsets, in the order moves are generated
+DIRECTIONS = [(-2, -1), (-2, 1), (-1, -2), (-1, 2),
+              (1, -2),  (1, 2), (2, -1),  (2, 1)]
+
+# one-step offsets of the king and queen rules, in the order moves are generated
+KING_DIRECTIONS = [(-1, -1), (-1, 0), (-1, 1), (0, -1),
+                   (0, 1),   (1, -1), (1, 0),  (1, 1)]
+
+QUEEN_DISTANCE = 3  # the longest move of the queen rule
+
+KNIGHT = MoveRule("knight", tuple(DIRECTIONS), 1)
+KING = MoveRule("king", tuple(KING_DIRECTIONS), 1)
+QUEEN = MoveRule("queen", tuple(KING_DIRECTIONS), QUEEN_DISTANCE)
+
+MOVE_RULES = {rule.name: rule for rule in (KNIGHT, KING, QUEEN)}
+
+# ray and neighbour tables shared by every board of the same size and rule
+_RAY_TABLES = {}
+_NEIGHBOUR_TABLES = {}
+
+
+def get_rule(rule):
+    """
+    Return the MoveRule for a rule or the name of one of `MOVE_RULES`.
+    """
+    if isinstance(rule, MoveRule):
+        return rule
+    if rule not in MOVE_RULES:
+        raise ValueError("Unknown move rule {!r}; expected one of {}".format(
+            rule, ", ".join(sorted(MOVE_RULES))))
+    return MOVE_RULES[rule]
+
+
+def ray_table(width, height, rule=KNIGHT):
+    """
+    Return the cells reachable along every direction of a move rule from
+    every cell of a board of the given size, ignoring blocked cells.
+
+    Parameters
+    ----------
+    width : int
+        The number of columns of the board.
+
+    height : int
+        The number of rows of the board.
+
+    rule : MoveRule or str (optional)
+        The move rule, or the name of one of `MOVE_RULES`.
+
+    Returns
+    ----------
+    list<tuple<tuple<(int, int)>>>
+        For the cell (row, column) at index `row * width + column`, one ray
+        per direction that stays on the board, in the order of the rule's
+        directions. A ray lists the coordinate pairs of its cells from the
+        nearest to the farthest, up to `rule.max_distance` steps.
+    """
+    rule = get_rule(rule)
+    key = (width, height, rule)
+    if key not in _RAY_TABLES:
+        table = []
+        for r in range(height):
+            for c in range(width):
+                rays = []
+                for dr, dc in rule.directions:
+                    ray = tuple((r + k * dr, c + k * dc) for k in range(1, rule.max_distance + 1)
+                                if 0 <= r + k * dr < height and 0 <= c + k * dc < width)
+                    if ray:
+                        rays.append(ray)
+                table.append(tuple(rays))
+        _RAY_TABLES[key] = table
+    return _RAY_TABLES[key]
+
+
+def neighbour_table(width, height, rule=KNIGHT):
+    """
+    Return the cells reachable with one step of a move rule from every cell
+    of a board of the given size, ignoring blocked cells.
+
+    Parameters
+    ----------
+    width : int
+        The number of columns of the board.
+
+    height : int
+        The number of rows of the board.
+
+    rule : MoveRule or str (optional)
+        The move rule, or the name of one of `MOVE_RULES`. Defaults to the
+        L-shaped moves of a knight.
+
+    Returns
+    ----------
+    list<tuple<(int, int)>>
+        For the cell (row, column) at index `row * width + column`, the
+        coordinate pairs of its neighbours in the order of the rule's
+        directions. These are all the moves of a single-step rule, and the
+        cells a sliding rule must pass through.
+    """
+    rule = get_rule(rule)
+    key = (width, height, rule)
+    if key not in _NEIGHBOUR_TABLES:
+        _NEIGHBOUR_TABLES[key] = [tuple(ray[0] for ray in rays)
+                                  for rays in ray_table(width, height, rule)]
+    return _NEIGHBOUR_TABLES[key]
@@ -0,0 +1,266 @@
+"""
+This file contains test cases for the board engines in the `isolation`
+package. The engines must agree with the reference `isolation.Board` on every
+observable part of the game state.
+"""
+import os
+import pickle
+import random
+import tempfile
+import unittest
+
+import game_records
+import isolation
+import simulator
+
+from sample_players import RandomPlayer
+
+
+def random_game(board, seed):
+    """Play random moves on the board until the active player is stuck, and
+    return the list of boards observed along the way.
+    """
+    rng = random.Random(seed)
+    boards = [board.copy()]
+    while board.get_legal_moves():
+        board.apply_move(rng.choice(board.get_legal_moves()))
+        boards.append(board.copy())
+    return boards
+
+
+class BitBoardTest(unittest.TestCase):
+
+    def test_constructor_selects_engine(self):
+        """ Test that Board(..., bitboard=True) builds a BitBoard """
+        board = isolation.Board("p1", "p2", bitboard=True)
+        self.assertIsInstance(board, isolation.BitBoard)
+        self.assertIsInstance(board.copy(), isolation.BitBoard)
+        self.assertNotIsInstance(isolation.Board("p1", "p2"), isolation.BitBoard)
+
+    def test_matches_reference_board(self):
+        """ Test that BitBoard reproduces the reference board move by move """
+        for seed, (w, h) in enumerate([(7, 7), (5, 9), (9, 6)]):
+            reference = random_game(isolation.Board("p1", "p2", w, h), seed)
+            moves = [b.get_player_location(b.inactive_player) for b in reference[1:]]
+            board = isolation.Board("p1", "p2", w, h, bitboard=True)
+            for ref, move in zip(reference, moves + [None]):
+                self.assertEqual(ref.get_legal_moves(), board.get_legal_moves())
+                self.assertEqual(ref.get_legal_moves("p1"), board.get_legal_moves("p1"))
+                self.assertEqual(ref.get_legal_moves("p2"), board.get_legal_moves("p2"))
+                self.assertEqual(ref.get_blank_spaces(), board.get_blank_spaces())
+                self.assertEqual(ref.to_string(), board.to_string())
+                self.assertEqual(ref.utility("p1"), board.utility("p1"))
+                self.assertEqual(ref.hash(), board.hash())
+                self.assertEqual(ref.get_region("p1"), board.get_region("p1"))
+                self.assertEqual(ref.get_region("p2"), board.get_region("p2"))
+                self.assertEqual(ref.is_partitioned(), board.is_partitioned())
+                if move is not None:
+                    forecast = board.forecast_move(move)
+                    self.assertNotEqual(forecast.hash(), board.hash())
+                    board.apply_move(move)
+                    self.assertEqual(forecast.hash(), board.hash())
+
+
+class MoveRuleTest(unittest.TestCase):
+
+    @staticmethod
+    def brute_force_moves(board, location, rule):
+        """ Return the moves of a rule from a location by walking every
+        direction one step at a time on the board """
+        moves = []
+        for dr, dc in rule.directions:
+            for k in range(1, rule.max_distance + 1):
+                r, c = location[0] + k * dr, location[1] + k * dc
+                if not (0 <= r < board.height and 0 <= c < board.width) or (r, c) not in \
+                        board.get_blank_spaces():
+                    break
+                moves.append((r, c))
+        return moves
+
+    def test_knight_table_unchanged(self):
+        """ Test that the default rule is the knight rule, in DIRECTIONS order """
+        board = isolation.Board("p1", "p2", 9, 8)
+        self.assertEqual(board.move_rule, isolation.MOVE_RULES["knight"])
+        expected = [tuple((r + dr, c + dc) for dr, dc in isolation.DIRECTIONS
+                          if 0 <= r + dr < 8 and 0 <= c + dc < 9)
+                    for r in range(8) for c in range(9)]
+        self.assertEqual(isolation.neighbour_table(9, 8), expected)
+
+    def test_moves_match_brute_force(self):
+        """ Test every rule's moves against a direct search of the board """
+        for seed, (name, (w, h)) in enumerate([("knight", (7, 7)), ("king", (8, 6)),
+                                               ("queen", (7, 9)), ("queen", (11, 11))]):
+            rule = isolation.MOVE_RULES[name]
+            for board in random_game(isolation.Board("p1", "p2", w, h, move_rule=name), seed)[2:]:
+                self.assertEqual(board.move_rule, rule)
+                for player in ("p1", "p2"):
+                    location = board.get_player_location(player)
+                    moves = self.brute_force_moves(board, location, rule)
+                    self.assertEqual(board.get_legal_moves(player), moves)
+                    self.assertEqual(board.count_moves(location), len(moves))
+
+    def test_rule_survives_copy_and_pickle(self):
+        """ Test that copies keep the rule and BitBoard rejects other rules """
+        board = isolation.Board("p1", "p2", move_rule="queen")
+        board.apply_move((3, 3))
+        board.apply_move((0, 0))
+        for other in (board.copy(), board.forecast_move((3, 1)), pickle.loads(pickle.dumps(board))):
+            self.assertEqual(other.move_rule.name, "queen")
+        self.assertEqual(len(board.get_legal_moves()), 3 * 8 - 1)  # (0, 0) blocks one diagonal
+        with self.assertRaises(ValueError):
+            isolation.Board("p1", "p2", bitboard=True, move_rule="king")
+        with self.assertRaises(ValueError):
+            isolation.Board("p1", "p2", move_rule="bishop")
+
+
+class PartitionTest(unittest.TestCase):
+
+    def test_region_and_partition(self):
+        """ Test flood fill regions and partition detection on both engines """
+        partitioned = 0
+        for seed in range(20):
+            for bitboard in (False, True):
+                boards = random_game(isolation.Board("p1", "p2", bitboard=bitboard), seed)
+                for board in boards[2:]:
+                    regions = []
+                    for player in ("p1", "p2"):
+                        # breadth-first search with the rules of the game
+                        region = set()
+                        frontier = [board.get_player_location(player)]
+                        while frontier:
+                            r, c = frontier.pop()
+                            for dr, dc in isolation.DIRECTIONS:
+                                cell = (r + dr, c + dc)
+                                if cell not in region and board.move_is_legal(cell):
+                                    region.add(cell)
+                                    frontier.append(cell)
+                        self.assertEqual(board.get_region(player),
+                                         sorted(region, key=lambda cell: (cell[1], cell[0])))
+                        regions.append(region)
+                    self.assertEqual(board.is_partitioned(), not regions[0] & regions[1])
+                    partitioned += board.is_partitioned()
+        self.assertGreater(partitioned, 0)
+
+
+class PushPopTest(unittest.TestCase):
+
+    def test_pop_restores_state(self):
+        """ Test that pop_move() undoes push_move() on both engines """
+        for bitboard in (False, True):
+            board = isolation.Board("p1", "p2", bitboard=bitboard)
+            board.apply_move((3, 3))
+            board.apply_move((0, 0))
+            history = []
+            rng = random.Random(1)
+            while board.get_legal_moves():
+                move = rng.choice(board.get_legal_moves())
+                history.append((board.copy(), move))
+                board.push_move(move)
+            for before, move in reversed(history):
+                self.assertEqual(board.pop_move(), move)
+                self.assertEqual(board.to_string(), before.to_string())
+                self.assertEqual(board.hash(), before.hash())
+                self.assertEqual(board.move_count, before.move_count)
+                self.assertEqual(board.active_player, before.active_player)
+                self.assertEqual(board.get_legal_moves(), before.get_legal_moves())
+
+
+class GameRecordsTest(unittest.TestCase):
+
+    def test_write_read_replay(self):
+        """ Test that recorded games read back and replay to the final position """
+        random.seed(0)
+        player_1, player_2 = RandomPlayer(), RandomPlayer()
+        names = {player_1: "first", player_2: "second"}
+        played = []
+        for bitboard in (False, True):
+            board = isolation.Board(player_1, player_2, bitboard=bitboard)
+            opening = [(3, 3), (0, 0)]
+            for move in opening:
+                board.apply_move(move)
+            winner, move_history, termination = board.play()
+            played.append((board, game_records.record_game(board, winner, move_history, termination,
+                                                           names, opening)))
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "games.rec")
+            for _, record in played:
+                game_records.write_game(path, record)
+            records = list(game_records.read_games(path))
+            stats = game_records.agent_statistics([path])
+
+        self.assertEqual(len(records), 2)
+        for (board, record), read in zip(played, records):
+            # the failed last move, (-1, -1), is stored as no move
+            self.assertEqual(read, record._replace(moves=record.moves[:-1] + [None]))
+            final = list(game_records.replay(read))[-1]
+            self.assertEqual(final.get_blank_spaces(), board.get_blank_spaces())
+            self.assertEqual(final.get_player_location("first"), board.get_player_location(player_1))
+            self.assertEqual(final.get_player_location("second"), board.get_player_location(player_2))
+        self.assertEqual(stats["first"]["games"], 2)
+        self.assertEqual(stats["first"]["wins"] + stats["second"]["wins"], 2)
+        # losing with no legal moves left is not an illegal move
+        self.assertEqual(stats["first"]["illegal_moves"] + stats["second"]["illegal_moves"], 0)
+
+    def test_illegal_move_statistics(self):
+        """ Test that only moves that were not legal count as illegal moves """
+        played = [(3, 3), (0, 0), (3, 3)]
+        records = [game_records.GameRecord(7, 7, ("a", "b"), 1, "illegal move", played),
+                   game_records.GameRecord(7, 7, ("a", "b"), 1, "illegal move", played[:2] + [(1, 4)]),
+                   game_records.GameRecord(7, 7, ("a", "b"), 1, "illegal move", played[:2] + [None])]
+        self.assertEqual([game_records.is_illegal_loss(record) for record in records],
+                         [True, False, False])
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "games.rec")
+            for record in records:
+                game_records.write_game(path, record)
+            stats = game_records.agent_statistics([path])
+        self.assertEqual(stats["a"]["illegal_moves"], 1)
+        self.assertEqual(stats["b"]["illegal_moves"], 0)
+
+
+
+class SimulatorTest(unittest.TestCase):
+
+    class MakeUnmakePlayer():
+        """ Random player that probes every move on the board it is given """
+
+        def get_move(self, game, legal_moves, time_left):
+            for move in legal_moves:
+                game.push_move(move)
+                game.pop_move()
+            game.apply_move(legal_moves[0])
+            return legal_moves[random.randint(0, len(legal_moves) - 1)]
+
+    def test_games_match_board_play(self):
+        """ Test that simulated games follow the rules without changing the
+        shared board, and that both handoffs play the same games """
+        results = []
+        for handoff in ("cow", "copy"):
+            random.seed(0)
+            players = (self.MakeUnmakePlayer(), RandomPlayer())
+            results.append(list(simulator.simulate(*players, 6, names=("a", "b"), handoff=handoff)))
+        self.assertEqual(results[0], results[1])
+        for idx, record in enumerate(results[0]):
+            self.assertEqual(record.players, ("a", "b") if idx % 2 == 0 else ("b", "a"))
+            self.assertEqual(record.termination, "")
+            self.assertIsNone(record.moves[-1])
+            final = list(game_records.replay(record))[-1]
+            self.assertFalse(final.get_legal_moves())
+            self.assertEqual(final.active_player, record.players[1 - record.winner])
+
+    def test_copy_on_write(self):
+        """ Test that the view copies the board on the first change only """
+        board = isolation.Board("p1", "p2")
+        board.apply_move((3, 3))
+        view = simulator.CopyOnWriteBoard(board)
+        self.assertEqual(view.get_legal_moves(), board.get_legal_moves())
+        self.assertNotIsInstance(view, isolation.Board)
+        view.apply_move((0, 0))
+        self.assertIsInstance(view, isolation.Board)
+        self.assertEqual(board.move_count, 1)
+        self.assertEqual(view.move_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
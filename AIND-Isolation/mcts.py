@@ -0,0 +1,240 @@
+"""
+This file contains `MCTSPlayer`, a Monte Carlo Tree Search (UCT) agent for
+Isolation with the same `get_move(game, legal_moves, time_left)` interface
+as `game_agent.CustomPlayer`.
+
+Each iteration of the search selects several leaves of the tree with the
+UCB1 rule, counting the playouts in flight as visits without wins (a
+"virtual loss") so that the leaves differ, and then finishes the games of
+all the leaves at once with random moves on a NumPy array of boards (see
+`random_playouts()`). The tree is kept between turns: the subtree of the
+move played and the opponent's reply becomes the root of the next search.
+
+Example:
+
+    from mcts import MCTSPlayer
+    Board(MCTSPlayer(), CustomPlayer()).play()
+"""
+
+import math
+import random
+
+import numpy as np
+
+from batch_heuristics import encode_board, neighbour_array
+
+
+def random_playouts(neighbours, blocked, locations, turns, rng):
+    """Play random games to the end on a batch of boards.
+
+    Parameters
+    ----------
+    neighbours : numpy.ndarray
+        The array of the cells reachable from each cell, from
+        `batch_heuristics.neighbour_array()`.
+
+    blocked : numpy.ndarray
+        The (boards, cells + 1) boolean array of blocked cells; modified.
+
+    locations : numpy.ndarray
+        The (boards, 2) array of the cells of player 1 and player 2;
+        modified.
+
+    turns : numpy.ndarray
+        The (boards,) array of the player to move on each board (0 for
+        player 1, 1 for player 2).
+
+    rng : numpy.random.Generator
+        The random number generator for the moves.
+
+    Returns
+    -------
+    numpy.ndarray
+        The winner of the game on each board (0 for player 1, 1 for player 2).
+    """
+    boards = np.arange(len(blocked))
+    winners = np.zeros(len(blocked), dtype=np.int8)
+    mover = turns.copy()
+    while len(boards):
+        players = mover[boards]
+        cells = neighbours[locations[boards, players]]
+        open_cells = ~blocked[boards[:, None], cells]
+        # the player to move loses when it has no open cell
+        stuck = ~open_cells.any(axis=1)
+        winners[boards[stuck]] = 1 - players[stuck]
+        moving = ~stuck
+        boards, players, cells, open_cells = boards[moving], players[moving], cells[moving], open_cells[moving]
+        # pick an open cell at random: the largest random key among them
+        choice = np.argmax(rng.random(open_cells.shape) * open_cells, axis=1)
+        moves = cells[np.arange(len(boards)), choice]
+        blocked[boards, moves] = True
+        locations[boards, players] = moves
+        mover[boards] = 1 - players
+    return winners
+
+
+class Node:
+    """A state in the search tree, reached by `move` from its parent.
+
+    `player` is the player who made the move (0 for player 1, 1 for player
+    2), and `wins` counts the playouts through the node won by that player.
+    """
+
+    __slots__ = ("move", "parent", "player", "key", "children", "untried", "visits", "wins")
+
+    def __init__(self, move, parent, player, key):
+        self.move = move
+        self.parent = parent
+        self.player = player
+        self.key = key
+        self.children = {}
+        self.untried = None
+        self.visits = 0
+        self.wins = 0
+
+
+class MCTSPlayer:
+    """Game-playing agent that chooses the move with the most playouts of a
+    Monte Carlo Tree Search.
+
+    Parameters
+    ----------
+    exploration : float (optional)
+        The exploration constant of the UCB1 rule.
+
+    leaves : int (optional)
+        The number of leaves selected for each batch of playouts.
+
+    playouts : int (optional)
+        The number of random games played from each selected leaf.
+
+    timeout : float (optional)
+        Time remaining (in milliseconds) when search is aborted.
+
+    seed : int (optional)
+        Seed of the random number generators, for reproducible searches.
+    """
+
+    def __init__(self, exploration=math.sqrt(2), leaves=16, playouts=16, timeout=10., seed=None):
+        self.exploration = exploration
+        self.leaves = leaves
+        self.playouts = playouts
+        self.TIMER_THRESHOLD = timeout
+        self.random = random.Random(seed)
+        self.rng = np.random.default_rng(seed)
+        self.root = None
+        self.num_playouts = 0  # playouts of the latest call to get_move()
+
+    def get_move(self, game, legal_moves, time_left):
+        """Search for the best move from the available legal moves and return a
+        result before the time limit expires.
+
+        Parameters
+        ----------
+        game : `isolation.Board`
+            An instance of `isolation.Board` encoding the current state of the
+            game (e.g., player locations and blocked cells).
+
+        legal_moves : list<(int, int)>
+            A list containing legal moves. Moves are encoded as tuples of pairs
+            of ints defining the next (row, col) for the agent to occupy.
+
+        time_left : callable
+            A function that returns the number of milliseconds left in the
+            current turn. Returning with any less than 0 ms remaining forfeits
+            the game.
+
+        Returns
+        -------
+        (int, int)
+            Board coordinates corresponding to a legal move; may return
+            (-1, -1) if there are no available legal moves.
+        """
+        if not legal_moves:
+            return (-1, -1)
+        # random playouts need both players on the board; take the centre
+        # first, like CustomPlayer
+        if game.move_count < 2:
+            centre = (int(game.width / 2), int(game.height / 2))
+            for move in (centre, (centre[0], centre[1] - 1)):
+                if move in legal_moves:
+                    return move
+            return self.random.choice(legal_moves)
+
+        root = self.reuse_root(game)
+        board = game.copy()
+        neighbours = neighbour_array(game.width, game.height)
+        self.num_playouts = 0
+        while time_left() > self.TIMER_THRESHOLD:
+            paths, states = [], []
+            for _ in range(self.leaves):
+                path = self.select(root, board)
+                states.append(encode_board(board))
+                for _ in path[1:]:
+                    board.pop_move()
+                # count the playouts in flight as lost visits
+                for node in path:
+                    node.visits += self.playouts
+                paths.append(path)
+            winners = self.playout(neighbours, states)
+            for idx, path in enumerate(paths):
+                wins = winners[idx * self.playouts:(idx + 1) * self.playouts].sum()
+                # wins counts playouts won by player 2
+                for node in path:
+                    node.wins += wins if node.player else self.playouts - wins
+            self.num_playouts += len(winners)
+
+        if not root.children:
+            return legal_moves[0]
+        best = max(root.children.values(), key=lambda node: node.visits)
+        # keep the subtree of the move for the next turn
+        self.root = best
+        best.parent = None
+        return best.move
+
+    def reuse_root(self, game):
+        """Return the node of the current game state from the tree of the
+        previous turn, or a new root if it is not in the tree."""
+        key = game.hash()
+        if self.root is not None:
+            reply = self.root.children.get(game.get_player_location(game.inactive_player))
+            if reply is not None and reply.key == key:
+                reply.parent = None
+                return reply
+        player = 0 if game.inactive_player is game.__player_1__ else 1
+        return Node(None, None, player, key)
+
+    def select(self, root, board):
+        """Walk down the tree with the UCB1 rule, applying the moves to the
+        board, and expand one untried move of the node reached. Return the
+        list of nodes from the root to the new leaf."""
+        node = root
+        path = [node]
+        while True:
+            if node.untried is None:
+                node.untried = board.get_legal_moves()
+                self.random.shuffle(node.untried)
+            if node.untried:
+                move = node.untried.pop()
+                board.push_move(move)
+                child = Node(move, node, 1 - node.player, board.hash())
+                node.children[move] = child
+                path.append(child)
+                return path
+            if not node.children:
+                return path
+            log_visits = math.log(node.visits)
+            exploration = self.exploration
+            node = max(node.children.values(),
+                       key=lambda child: child.wins / child.visits +
+                       exploration * math.sqrt(log_visits / child.visits))
+            board.push_move(node.move)
+            path.append(node)
+
+    def playout(self, neighbours, states):
+        """Run self.playouts random games from each state and return the
+        winners, in blocks of self.playouts per state."""
+        blocked = np.repeat(np.array([state[0] for state in states]), self.playouts, axis=0)
+        locations = np.repeat(np.array([state[1] for state in states]), self.playouts, axis=0)
+        turns = np.repeat(np.array([state[2] for state in states], dtype=np.int8), self.playouts)
+        return random_playouts(neighbours, blocked, locations, turns, self.rng)
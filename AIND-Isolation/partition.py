@@ -0,0 +1,169 @@
+"""
+This file contains the endgame of `CustomPlayer` for separated players.
+
+Once `Board.is_partitioned()`, neither player can reach a cell of the other
+player's region, so the moves of one player never change the options of the
+other. The game is then decided by the longest path each player can walk in
+its own region: the player to move wins if and only if its longest path is
+longer than its opponent's, and the best move is the first step of its
+longest path, whatever the opponent does.
+
+The longest path is found by a depth-first search over the region bitmask,
+trying the cells with the fewest onward moves first (Warnsdorff's rule) and
+pruning branches that cannot beat the best path so far. Since a knight move
+always changes the colour of the cell (as on a chessboard), a path cannot be
+longer than twice the number of reachable cells of the colour it visits
+least. The search stops early when a path reaches that bound, and returns
+the best path found so far (a lower bound) when it runs out of nodes or
+time.
+"""
+
+from isolation.bitboard import move_tables, shift_table
+
+WIN = 1
+LOSS = -1
+
+
+class _Stop(Exception):
+    """Stop the path search (it found a path as long as the upper bound, or
+    ran out of nodes or time)."""
+    pass
+
+
+def popcount(mask):
+    return bin(mask).count("1")
+
+
+def colour_mask(width, height):
+    """Return the mask of the cells (row, column) with an even row + column."""
+    mask = 0
+    for r in range(height):
+        for c in range(width):
+            if not (r + c) % 2:
+                mask |= 1 << (r * width + c)
+    return mask
+
+
+def path_bound(cells, colour, even):
+    """Return an upper bound on the length of a path through cells, from a
+    cell of even colour (or not), where colour is the mask of even cells."""
+    same = popcount(cells & colour)
+    other = popcount(cells) - same
+    if not even:
+        same, other = other, same
+    # the path alternates between the other colour and the starting colour
+    return 2 * other if other <= same else 2 * same + 1
+
+
+def reachable(cell_mask, open_cells, shifts):
+    """Return the mask of the open cells reachable from the cells in
+    cell_mask, with all cells of a step moved at once."""
+    region = 0
+    frontier = cell_mask
+    while frontier:
+        step = 0
+        for mask, shift in shifts:
+            if shift > 0:
+                step |= (frontier & mask) << shift
+            else:
+                step |= (frontier & mask) >> -shift
+        frontier = step & open_cells & ~region
+        region |= frontier
+    return region
+
+
+def longest_path(game, player, node_limit=20000, time_left=None, threshold=0.):
+    """Search the longest sequence of moves a player can make alone.
+
+    Parameters
+    ----------
+    game : isolation.Board
+        The current game state.
+
+    player : object
+        A player registered in the game.
+
+    node_limit : int (optional)
+        The maximum number of paths to extend before giving up.
+
+    time_left : callable (optional)
+        A function that returns the milliseconds left in the turn; the search
+        gives up when it falls below threshold.
+
+    threshold : float (optional)
+        The time left (in milliseconds) at which the search gives up.
+
+    Returns
+    -------
+    (int, list<(int, int)>, bool)
+        The length of the longest path found, its moves, and whether it is
+        known to be the longest.
+    """
+    location = game.get_player_location(player)
+    width = game.width
+    masks, moves = move_tables(width, game.height)
+    shifts = shift_table(width, game.height)
+    region = game.region_mask(location)
+    colour = colour_mask(width, game.height)
+    upper = path_bound(region, colour, not sum(location) % 2)
+    best = []
+    path = []
+    nodes = [0]
+
+    def search(cell, open_cells):
+        nodes[0] += 1
+        if nodes[0] > node_limit or (time_left is not None and not nodes[0] & 255
+                                     and time_left() < threshold):
+            raise _Stop()
+        if len(path) > len(best):
+            best[:] = path
+            if len(best) == upper:
+                raise _Stop()
+        children = [(popcount(masks[m[0] * width + m[1]] & open_cells), bit, m)
+                    for bit, m in moves[cell] if open_cells & bit]
+        children.sort()
+        for _, bit, move in children:
+            rest = open_cells & ~bit
+            if len(path) + 1 + popcount(rest) <= len(best):
+                continue
+            if len(path) + 1 + path_bound(reachable(bit, rest, shifts), colour,
+                                          not sum(move) % 2) <= len(best):
+                continue
+            path.append(move)
+            search(move[0] * width + move[1], rest)
+            path.pop()
+
+    exact = True
+    try:
+        search(location[0] * width + location[1], region)
+    except _Stop:
+        exact = len(best) == upper
+    return len(best), list(best), exact
+
+
+def region_bound(game, player):
+    """Return an upper bound on the length of the longest path of a player."""
+    location = game.get_player_location(player)
+    return path_bound(game.region_mask(location), colour_mask(game.width, game.height),
+                      not sum(location) % 2)
+
+
+def partition_outcome(game, node_limit=20000):
+    """Decide a partitioned game for the player to move.
+
+    Returns
+    -------
+    (int or None, list<(int, int)>)
+        WIN or LOSS for the player to move, or None if the path searches
+        were not exact enough to tell, and the longest path found for the
+        player to move.
+    """
+    own_length, own_path, own_exact = longest_path(game, game.active_player, node_limit)
+    opp_length, _, opp_exact = longest_path(game, game.inactive_player, node_limit)
+    own_upper = own_length if own_exact else region_bound(game, game.active_player)
+    opp_upper = opp_length if opp_exact else region_bound(game, game.inactive_player)
+    if own_length > opp_upper:
+        return WIN, own_path
+    if own_upper <= opp_length:
+        return LOSS, own_path
+    return None, own_path
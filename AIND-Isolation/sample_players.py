@@ -96,6 +96,60 @@ def improved_score(game, player):
     return float(own_moves - opp_moves)
 
 
+def open_move_score_fast(game, player):
+    """The same evaluation as `open_move_score`, counting moves with
+    `Board.count_moves()` instead of building the lists of legal moves.
+
+    Parameters
+    ----------
+    game : `isolation.Board`
+        An instance of `isolation.Board` encoding the current state of the
+        game (e.g., player locations and blocked cells).
+
+    player : hashable
+        One of the objects registered by the game object as a valid player.
+        (i.e., `player` should be either game.__player_1__ or
+        game.__player_2__).
+
+    Returns
+    ----------
+    float
+        The heuristic value of the current game state
+    """
+    if not game.count_moves(game.get_player_location(game.active_player)):
+        return float("-inf") if player == game.active_player else float("inf")
+
+    return float(game.count_moves(game.get_player_location(player)))
+
+
+def improved_score_fast(game, player):
+    """The same evaluation as `improved_score`, counting moves with
+    `Board.count_moves()` instead of building the lists of legal moves.
+
+    Parameters
+    ----------
+    game : `isolation.Board`
+        An instance of `isolation.Board` encoding the current state of the
+        game (e.g., player locations and blocked cells).
+
+    player : hashable
+        One of the objects registered by the game object as a valid player.
+        (i.e., `player` should be either game.__player_1__ or
+        game.__player_2__).
+
+    Returns
+    ----------
+    float
+        The heuristic value of the current game state
+    """
+    if not game.count_moves(game.get_player_location(game.active_player)):
+        return float("-inf") if player == game.active_player else float("inf")
+
+    own_moves = game.count_moves(game.get_player_location(player))
+    opp_moves = game.count_moves(game.get_player_location(game.get_opponent(player)))
+    return float(own_moves - opp_moves)
+
+
 class RandomPlayer():
     """Player that chooses a move randomly."""
 
@@ -0,0 +1,205 @@
+"""
+This file contains the `SearchStats` collector, which records what the
+search of a `game_agent.CustomPlayer` did on every move: the nodes visited,
+the leaf evaluations, the depth completed by iterative deepening, the
+alpha-beta cutoffs, window re-searches and search extensions, the time spent in the heuristic
+and in move generation, how much time was left on the clock when the move
+was returned, and how the last iteration ended (aborted by the timer, with
+its nodes wasted, or not started because it was not expected to finish).
+
+Attach a collector to an agent with `CustomPlayer(stats=SearchStats())`.
+The records can be written to JSON or CSV files and summarized with
+`summarize()`, e.g., to compare heuristics or spot regressions between
+tournament runs.
+"""
+
+import csv
+import json
+import math
+import statistics
+import timeit
+
+FIELDS = ["game", "ply", "nodes", "leaf_evals", "depth", "cutoffs", "pvs_researches",
+          "aspiration_researches", "forced_extensions", "mobility_extensions", "score_time",
+          "movegen_time", "search_time", "timeout_margin", "timed_out", "wasted_nodes",
+          "stopped_early"]
+
+# the fields of a record that add up over the processes searching one move
+COUNTERS = ["leaf_evals", "cutoffs", "pvs_researches", "aspiration_researches",
+            "forced_extensions", "mobility_extensions"]
+
+
+class SearchStats:
+    """Collect search statistics per move.
+
+    Every move searched by the agent adds one record (a dict with the keys
+    in `FIELDS`) to `self.moves`. Times are in seconds, except the timeout
+    margin, which is the number of milliseconds left in the turn when the
+    move was returned (None in node-budget mode).
+    """
+
+    def __init__(self):
+        self.moves = []
+        self.game = 0
+        self.current = None
+
+    def new_game(self):
+        """Start numbering the following moves as part of a new game."""
+        self.game += 1
+
+    def start_move(self, game):
+        """Start a record for a move searched from the given game state."""
+        self.current = {"game": self.game, "ply": game.move_count, "nodes": 0,
+                        "leaf_evals": 0, "depth": None, "cutoffs": 0, "pvs_researches": 0,
+                        "aspiration_researches": 0, "forced_extensions": 0,
+                        "mobility_extensions": 0, "score_time": 0.,
+                        "movegen_time": 0., "search_time": 0., "timeout_margin": None,
+                        "timed_out": False, "wasted_nodes": 0, "stopped_early": False}
+        self.start = timeit.default_timer()
+
+    def end_move(self, nodes, depth, timed_out, time_left, wasted_nodes=0, stopped_early=False):
+        """Complete the current record.
+
+        Parameters
+        ----------
+        nodes : int
+            The number of nodes visited by the search.
+
+        depth : int or None
+            The deepest search that completed, or None if none did.
+
+        timed_out : bool
+            Whether the last search was aborted by the timer.
+
+        time_left : float
+            The milliseconds left in the turn.
+
+        wasted_nodes : int (optional)
+            The nodes of the iteration aborted by the timer.
+
+        stopped_early : bool (optional)
+            Whether iterative deepening stopped before the timer, because
+            the next iteration was not expected to finish.
+        """
+        record = self.current
+        record["search_time"] = timeit.default_timer() - self.start
+        record["nodes"] = nodes
+        record["depth"] = depth
+        record["timed_out"] = timed_out
+        record["wasted_nodes"] = wasted_nodes
+        record["stopped_early"] = stopped_early
+        if math.isfinite(time_left):
+            record["timeout_margin"] = time_left
+        self.moves.append(record)
+        self.current = None
+
+    def merge(self, record):
+        """Add the counters of a record from another process searching the
+        same move (a root-split worker) to the current record. The nodes are
+        passed to end_move() instead; the times are left out, since they
+        overlap with the time of the current record."""
+        for key in COUNTERS:
+            self.current[key] += record[key]
+
+    def score(self, score_fn, game, player):
+        """Evaluate a leaf with score_fn and record the evaluation."""
+        start = timeit.default_timer()
+        value = score_fn(game, player)
+        self.current["score_time"] += timeit.default_timer() - start
+        self.current["leaf_evals"] += 1
+        return value
+
+    def legal_moves(self, game):
+        """Generate the legal moves of a state and record the time spent."""
+        start = timeit.default_timer()
+        moves = game.get_legal_moves()
+        self.current["movegen_time"] += timeit.default_timer() - start
+        return moves
+
+    def cutoff(self):
+        """Record an alpha or beta cutoff."""
+        self.current["cutoffs"] += 1
+
+    def research(self, kind):
+        """Record a re-search of a principal variation search null window
+        (kind 'pvs') or of an aspiration window (kind 'aspiration')."""
+        self.current[kind + "_researches"] += 1
+
+    def extension(self, kind):
+        """Record a forced move (kind 'forced') or low mobility (kind
+        'mobility') search extension."""
+        self.current[kind + "_extensions"] += 1
+
+    def write_json(self, path):
+        """Write the move records to a JSON file."""
+        with open(path, "w") as f:
+            json.dump(self.moves, f, indent=1)
+
+    def write_csv(self, path):
+        """Write the move records to a CSV file with a header row."""
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDS)
+            writer.writeheader()
+            writer.writerows(self.moves)
+
+
+def load(path):
+    """Read the move records written by `SearchStats.write_json()` or
+    `SearchStats.write_csv()`."""
+    if path.endswith(".json"):
+        with open(path) as f:
+            return json.load(f)
+    with open(path, newline="") as f:
+        records = []
+        for row in csv.DictReader(f):
+            record = {}
+            for key, value in row.items():
+                if key in ("timed_out", "stopped_early"):
+                    record[key] = value == "True"
+                elif value == "":
+                    record[key] = None
+                else:
+                    record[key] = float(value) if "." in value else int(value)
+            records.append(record)
+        return records
+
+
+def summarize(records):
+    """Aggregate move records into a dict of totals and averages.
+
+    Returns
+    -------
+    dict
+        The number of moves and games, the nodes per second, the median and
+        minimum depth completed (the median is not skewed by endgames, where
+        iterative deepening runs past the end of the game), the cutoffs and
+        leaf evaluations per node, the principal variation and aspiration
+        re-searches and the forced move and low mobility extensions per
+        move, the share of search time spent in the
+        heuristic and in move generation, the fraction of moves that timed
+        out and that stopped deepening early, the share of the nodes wasted
+        in aborted iterations, and the smallest timeout margin.
+    """
+    if not records:
+        return {}
+    nodes = sum(r["nodes"] for r in records)
+    search_time = sum(r["search_time"] for r in records)
+    depths = [r["depth"] for r in records if r["depth"] is not None]
+    margins = [r["timeout_margin"] for r in records if r["timeout_margin"] is not None]
+    return {"moves": len(records),
+            "games": len(set(r["game"] for r in records)),
+            "nodes_per_sec": nodes / search_time if search_time else 0.,
+            "median_depth": statistics.median(depths) if depths else None,
+            "min_depth": min(depths) if depths else None,
+            "cutoff_rate": sum(r["cutoffs"] for r in records) / nodes if nodes else 0.,
+            "pvs_researches": sum(r.get("pvs_researches", 0) for r in records) / len(records),
+            "aspiration_researches": sum(r.get("aspiration_researches", 0) for r in records) / len(records),
+            "forced_extensions": sum(r.get("forced_extensions", 0) for r in records) / len(records),
+            "mobility_extensions": sum(r.get("mobility_extensions", 0) for r in records) / len(records),
+            "leaf_rate": sum(r["leaf_evals"] for r in records) / nodes if nodes else 0.,
+            "score_share": sum(r["score_time"] for r in records) / search_time if search_time else 0.,
+            "movegen_share": sum(r["movegen_time"] for r in records) / search_time if search_time else 0.,
+            "timeout_rate": sum(r["timed_out"] for r in records) / len(records),
+            "early_stop_rate": sum(r.get("stopped_early", False) for r in records) / len(records),
+            "wasted_share": sum(r.get("wasted_nodes", 0) for r in records) / nodes if nodes else 0.,
+            "min_margin": min(margins) if margins else None}
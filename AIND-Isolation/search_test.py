@@ -0,0 +1,563 @@
+"""
+This file contains test cases for the optional search features of
+`game_agent.CustomPlayer`. Every feature must leave the value of the search
+unchanged with respect to the plain minimax and alpha-beta searches tested in
+agent_test.py.
+"""
+import os
+import pickle
+import random
+import tempfile
+import unittest
+
+import numpy as np
+
+import isolation
+import batch_heuristics
+import book
+import game_agent
+import game_records
+import mcts
+import partition
+import search_stats
+import time_manager
+import tuning
+
+from sample_players import improved_score, improved_score_fast
+from sample_players import open_move_score, open_move_score_fast
+
+
+def random_position(seed, plies=8, bitboard=False, w=7, h=7):
+    """Return a CustomPlayer and a board after a few random moves, with the
+    CustomPlayer holding the initiative.
+    """
+    rng = random.Random(seed)
+    agentUT = game_agent.CustomPlayer(score_fn=improved_score)
+    agentUT.time_left = lambda: 1e6
+    board = isolation.Board(agentUT, 'null_agent', w, h, bitboard=bitboard)
+    for _ in range(plies):
+        board.apply_move(rng.choice(board.get_legal_moves()))
+    return agentUT, board
+
+
+class MakeUnmakeTest(unittest.TestCase):
+
+    def test_same_result_as_forecast(self):
+        """ Test that make/unmake search matches forecast_move search """
+        for seed in range(4):
+            for bitboard in (False, True):
+                agentUT, board = random_position(seed, bitboard=bitboard)
+                before = board.to_string()
+                expected = agentUT.alphabeta(board, 4)
+                agentUT.make_unmake = True
+                self.assertEqual(agentUT.alphabeta(board, 4), expected)
+                self.assertEqual(agentUT.minimax(board, 3),
+                                 agentUT.minimax(board.copy(), 3))
+                self.assertEqual(board.to_string(), before)
+
+
+class TranspositionTableTest(unittest.TestCase):
+
+    def test_same_result_with_table(self):
+        """ Test that alphabeta returns the same result with a fresh table """
+        for seed in range(4):
+            for policy in ('depth', 'two-tier'):
+                agentUT, board = random_position(seed, bitboard=True)
+                expected = agentUT.alphabeta(board, 5)
+                agentUT.tt = game_agent.TranspositionTable(2 ** 10, policy)
+                self.assertEqual(agentUT.alphabeta(board, 5), expected)
+                self.assertEqual(agentUT.alphabeta(board, 5), expected)
+                self.assertGreater(agentUT.tt.stats()['hits'], 0)
+
+
+class MoveOrderingTest(unittest.TestCase):
+
+    def test_same_score_with_ordering(self):
+        """ Test that move ordering changes the nodes but not the score """
+        for seed in range(4):
+            agentUT, board = random_position(seed, bitboard=True)
+            expected, _ = agentUT.alphabeta(board, 5)
+            nodes = agentUT.nodes
+            agentUT, board = random_position(seed, bitboard=True)
+            agentUT.move_ordering = agentUT.mobility_ordering = True
+            for depth in range(1, 5):
+                agentUT.alphabeta(board, depth)
+            agentUT.nodes = 0
+            score, move = agentUT.alphabeta(board, 5)
+            self.assertEqual(score, expected)
+            self.assertIn(move, board.get_legal_moves())
+            self.assertLessEqual(agentUT.nodes, nodes)
+
+
+class WindowSearchTest(unittest.TestCase):
+
+    def test_pvs_same_result(self):
+        """ Test that principal variation search returns the alphabeta result """
+        researches = 0
+        for seed in range(6):
+            agentUT, board = random_position(seed, bitboard=True)
+            expected = agentUT.alphabeta(board, 5)
+            agentUT.pvs = True
+            self.assertEqual(agentUT.alphabeta(board, 5), expected)
+            researches += agentUT.researches['pvs']
+        self.assertGreater(researches, 0)
+
+    def test_aspiration_same_result(self):
+        """ Test that aspiration windows return the full-window result """
+        for seed in range(6):
+            agentUT, board = random_position(seed, bitboard=True)
+            agentUT.aspiration = 1.5
+            expected = agentUT.alphabeta(board, 4)
+            for guess in (expected[0], expected[0] - 10, expected[0] + 10):
+                self.assertEqual(agentUT.aspiration_search(board, 4, guess), expected)
+            self.assertEqual(agentUT.researches['aspiration'], 2)
+
+
+class ExtensionTest(unittest.TestCase):
+
+    def test_forced_move_extension(self):
+        """ Test that a forced move does not count toward the depth """
+        agentUT, board = random_position(1, plies=12)
+        self.assertEqual(len(board.get_legal_moves()), 1)
+        expected = agentUT.alphabeta(board, 2)
+        agentUT.forced_extension = True
+        self.assertEqual(agentUT.alphabeta(board, 1), expected)
+        self.assertEqual(agentUT.extensions['forced'], 1)
+        self.assertEqual(agentUT.extension_ply, 0)
+
+    def test_mobility_extension(self):
+        """ Test that extending every leaf once searches one ply deeper, and
+        that the extension limit is respected """
+        for seed in range(4):
+            agentUT, board = random_position(seed, bitboard=True)
+            expected = agentUT.alphabeta(board, 4)
+            agentUT.mobility_extension = 8
+            agentUT.extension_limit = 1
+            self.assertEqual(agentUT.alphabeta(board, 3), expected)
+            self.assertGreater(agentUT.extensions['mobility'], 0)
+            agentUT.extension_limit = 0
+            self.assertEqual(agentUT.alphabeta(board, 4), expected)
+            self.assertEqual(agentUT.extension_ply, 0)
+
+    def test_table_hit_is_not_an_extension(self):
+        """ Test that extended states answered by the transposition table
+        are not counted as extensions """
+        class HitTable():
+            """ Table that misses the root and hits every other state """
+            probes = 0
+
+            def probe(self, key):
+                self.probes += 1
+                return None if self.probes == 1 else (key, 99, 0., game_agent.EXACT, None, 0)
+
+            def store(self, *args):
+                pass
+
+        agentUT, board = random_position(0, bitboard=True)
+        agentUT.mobility_extension = 8
+        agentUT.stats = search_stats.SearchStats()
+        agentUT.stats.start_move(board)
+        agentUT.tt = HitTable()
+        agentUT.alphabeta(board, 1)
+        self.assertGreater(agentUT.tt.probes, 1)
+        self.assertEqual(agentUT.extensions['mobility'], 0)
+        self.assertEqual(agentUT.stats.current['mobility_extensions'], 0)
+
+
+class TimeManagerTest(unittest.TestCase):
+
+    def test_prediction_and_margin(self):
+        """ Test the stop decision and the margin learned from an overrun """
+        clock = [100.]
+        manager = time_manager.TimeManager(10.)
+        manager.start_turn(lambda: clock[0])
+        clock[0] = 80.
+        nodes = [1, 10, 40, 160]  # 640 nodes predicted at 211 nodes per 20 ms
+        self.assertTrue(manager.next_iteration_fits(nodes))
+        clock[0] = 60.
+        self.assertFalse(manager.next_iteration_fits(nodes))
+        self.assertEqual(manager.early_stops, 1)
+        clock[0] = 4.
+        manager.end_turn(nodes, timed_out=True)
+        self.assertEqual(manager.margin, 12.)
+        self.assertEqual(manager.ebf, 4.)
+
+    def test_always_returns_legal_move(self):
+        """ Test that get_move returns a legal move when the search finds
+        none: out of time before depth 1, or every move lost """
+        agentUT, board = random_position(3)
+        agentUT.time_manager = time_manager.TimeManager(10.)
+        legal_moves = board.get_legal_moves()
+        self.assertEqual(agentUT.get_move(board, legal_moves, lambda: 0.),
+                         max(legal_moves, key=board.count_moves))
+        agentUT, board = random_position(0, plies=28)
+        agentUT.method = 'alphabeta'
+        self.assertEqual(agentUT.alphabeta(board, 6), (float("-inf"), (-1, -1)))
+        agentUT.node_budget = 2000
+        self.assertIn(agentUT.get_move(board, board.get_legal_moves(), lambda: 0.),
+                      board.get_legal_moves())
+
+
+class FastHeuristicTest(unittest.TestCase):
+
+    def test_fast_heuristics_match(self):
+        """ Test that the copy-free heuristics return identical scores """
+        pairs = [(game_agent.heuristic_simple_deeper, game_agent.heuristic_simple_deeper_fast),
+                 (game_agent.heuristic_offensive_deeper, game_agent.heuristic_offensive_deeper_fast),
+                 (improved_score, improved_score_fast),
+                 (open_move_score, open_move_score_fast)]
+        for seed in range(10):
+            for bitboard in (False, True):
+                rng = random.Random(seed)
+                board = isolation.Board("p1", "p2", bitboard=bitboard)
+                while True:
+                    for slow, fast in pairs:
+                        for player in ("p1", "p2"):
+                            self.assertEqual(slow(board, player), fast(board, player))
+                    if not board.get_legal_moves():
+                        break
+                    board.apply_move(rng.choice(board.get_legal_moves()))
+
+
+class BatchHeuristicTest(unittest.TestCase):
+
+    def test_batch_heuristics_match(self):
+        """ Test that the batch heuristics match the scalar heuristics """
+        boards = []
+        for seed in range(10):
+            rng = random.Random(seed)
+            board = isolation.Board("p1", "p2", bitboard=bool(seed % 2))
+            while True:
+                boards.append(board.copy())
+                if not board.get_legal_moves():
+                    break
+                board.apply_move(rng.choice(board.get_legal_moves()))
+        for score_fn in batch_heuristics.BATCH_HEURISTICS:
+            # the proximity heuristics need both players on the board
+            scored = boards if "proximity" not in score_fn.__name__ else [
+                board for board in boards if board.move_count > 1]
+            for player in ("p1", "p2"):
+                expected = [score_fn(board, player) for board in scored]
+                self.assertEqual(batch_heuristics.score_boards(score_fn, scored, player), expected)
+
+
+class WeightedHeuristicTest(unittest.TestCase):
+
+    def test_matches_weighted_heuristics(self):
+        """ Test that WeightedHeuristic reproduces the weighted heuristics """
+        pairs = [(game_agent.heuristic_simple_weighted, game_agent.WeightedHeuristic()),
+                 (game_agent.heuristics_offensive_weighted, game_agent.WeightedHeuristic(opp=2.)),
+                 (game_agent.heuristics_proximity_max_weighted,
+                  pickle.loads(pickle.dumps(game_agent.WeightedHeuristic(0., 0., 1.))))]
+        for seed in range(5):
+            rng = random.Random(seed)
+            board = isolation.Board("p1", "p2", bitboard=bool(seed % 2))
+            for _ in range(2):
+                board.apply_move(rng.choice(board.get_legal_moves()))
+            while True:
+                for original, weighted in pairs:
+                    for player in ("p1", "p2"):
+                        self.assertEqual(weighted(board, player), original(board, player))
+                if not board.get_legal_moves():
+                    break
+                board.apply_move(rng.choice(board.get_legal_moves()))
+
+    def test_openings_are_cached(self):
+        """ Test that tuning reuses the stored openings and extends them """
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "openings.json")
+            openings = tuning.load_openings(path, 3, seed=1)
+            self.assertEqual(tuning.load_openings(path, 2, seed=5), openings[:2])
+            self.assertEqual(tuning.load_openings(path, 5, seed=5)[:3], openings)
+
+
+class NodeBudgetTest(unittest.TestCase):
+
+    def test_budget_is_deterministic(self):
+        """ Test that node-budget games replay identically within budget """
+        histories = []
+        for _ in range(2):
+            random.seed(0)
+            players = [game_agent.CustomPlayer(score_fn=improved_score, method='alphabeta')
+                       for _ in range(2)]
+            board = isolation.Board(*players, bitboard=True)
+            winner, history, termination = board.play(node_limit=300)
+            self.assertNotEqual(termination, "timeout")
+            self.assertLessEqual(max(p.nodes for p in players), 300)
+            histories.append((players.index(winner), history))
+        self.assertEqual(histories[0], histories[1])
+
+    def test_player_budget(self):
+        """ Test that the node_budget parameter ignores the clock """
+        agentUT, board = random_position(5)
+        agentUT.node_budget = 1000
+        agentUT.method = 'alphabeta'
+        move = agentUT.get_move(board, board.get_legal_moves(), lambda: -1.)
+        self.assertIn(move, board.get_legal_moves())
+        self.assertEqual(agentUT.nodes, 1000)
+
+
+class SearchStatsTest(unittest.TestCase):
+
+    def test_records_search(self):
+        """ Test that the collector records each searched move """
+        agentUT, board = random_position(3)
+        agentUT.method = 'alphabeta'
+        agentUT.stats = search_stats.SearchStats()
+        agentUT.iterative = False
+        agentUT.get_move(board, board.get_legal_moves(), lambda: 1e6)
+        record = agentUT.stats.moves[-1]
+        agentUT.stats = None
+        agentUT.get_move(board, board.get_legal_moves(), lambda: 1e6)
+
+        self.assertEqual(record["nodes"], agentUT.nodes)
+        self.assertEqual(record["depth"], 3)
+        self.assertFalse(record["timed_out"])
+        self.assertGreater(record["leaf_evals"], 0)
+        self.assertGreater(record["cutoffs"], 0)
+        self.assertEqual(record["timeout_margin"], 1e6)
+
+    def test_export_round_trip(self):
+        """ Test that JSON and CSV exports load back the same records """
+        stats = search_stats.SearchStats()
+        agentUT, board = random_position(4)
+        agentUT.stats = stats
+        agentUT.search_depth = 2
+        agentUT.iterative = False
+        for _ in range(2):
+            stats.new_game()
+            agentUT.get_move(board, board.get_legal_moves(), lambda: 1e6)
+        with tempfile.TemporaryDirectory() as directory:
+            for name in ("stats.json", "stats.csv"):
+                path = os.path.join(directory, name)
+                if name.endswith(".json"):
+                    stats.write_json(path)
+                else:
+                    stats.write_csv(path)
+                records = search_stats.load(path)
+                self.assertEqual(len(records), 2)
+                self.assertEqual(search_stats.summarize(records)["games"], 2)
+                self.assertEqual([r["nodes"] for r in records], [r["nodes"] for r in stats.moves])
+
+
+class BookTest(unittest.TestCase):
+
+    def test_solver_matches_full_search(self):
+        """ Test that the endgame solver agrees with a full-depth search """
+        for seed in (0, 2, 4, 6, 9, 13):
+            agentUT, board = random_position(seed, plies=10, w=5, h=5)
+            agentUT.score = lambda game, player: game.utility(player)
+            blanks = len(board.get_blank_spaces())
+            score, _ = agentUT.alphabeta(board, blanks + 1)
+            move, result = book.EndgameSolver().solve(board)
+            self.assertEqual(result, book.WIN if score > 0 else book.LOSS)
+            if result == book.WIN:
+                self.assertEqual(agentUT.alphabeta(board.forecast_move(move), blanks,
+                                                   maximizing_player=False)[0], score)
+
+    def test_agent_uses_tables(self):
+        """ Test that the agent plays stored book and winning endgame moves """
+        agentUT, board = random_position(2, plies=4)
+        move = board.get_legal_moves()[-1]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "opening.book")
+            book.write_table(path, 7, 7, {board.hash(): (move, 0), 1: (None, -1)})
+            table = book.PositionTable(path)
+            self.assertEqual(len(table), 2)
+            self.assertEqual(table.lookup(1), (None, -1))
+            self.assertIsNone(table.lookup(2))
+            agentUT.book = table
+            self.assertEqual(agentUT.get_move(board, board.get_legal_moves(), lambda: 1e6), move)
+            table.close()
+
+        for seed in (0, 2, 4, 6, 9, 13):
+            agentUT, board = random_position(seed, plies=10, w=5, h=5)
+            winning_move, result = book.EndgameSolver().solve(board)
+            agentUT.endgame_cells = 25
+            agentUT.endgame = book.EndgameSolver()
+            agentUT.iterative = False
+            move = agentUT.get_move(board, board.get_legal_moves(), lambda: 1e6)
+            if result == book.WIN:
+                self.assertEqual(move, winning_move)
+                self.assertEqual(agentUT.nodes, 0)
+            else:
+                self.assertGreater(agentUT.nodes, 0)
+
+    def test_solver_node_budget(self):
+        """ Test that the endgame solver stays within the node budget """
+        agentUT, board = random_position(3, plies=4)
+        agentUT.endgame_cells = 49
+        agentUT.endgame = book.EndgameSolver()
+        agentUT.node_budget = 1000
+        agentUT.method = 'alphabeta'
+        move = agentUT.get_move(board, board.get_legal_moves(), lambda: -1.)
+        self.assertIn(move, board.get_legal_moves())
+        self.assertEqual(agentUT.nodes, 1000)
+
+
+
+def separated_positions(w, h, count):
+    """Return boards from random games with the players just separated,
+    with a CustomPlayer as the player to move."""
+    positions = []
+    seed = 0
+    while len(positions) < count:
+        agentUT, board = random_position(seed, plies=2, w=w, h=h)
+        rng = random.Random(seed)
+        seed += 1
+        while board.get_legal_moves() and not board.is_partitioned():
+            board.apply_move(rng.choice(board.get_legal_moves()))
+        if board.get_legal_moves() and board.active_player is agentUT:
+            positions.append((agentUT, board))
+    return positions
+
+
+class PartitionTest(unittest.TestCase):
+
+    def test_longest_path(self):
+        """ Test the path search against an exhaustive search """
+        def exhaustive(board, location, visited):
+            best = 0
+            for dr, dc in isolation.DIRECTIONS:
+                cell = (location[0] + dr, location[1] + dc)
+                if cell not in visited and board.move_is_legal(cell):
+                    best = max(best, 1 + exhaustive(board, cell, visited | {cell}))
+            return best
+
+        for agentUT, board in separated_positions(5, 5, 8):
+            for player in (agentUT, board.inactive_player):
+                length, path, exact = partition.longest_path(board, player)
+                self.assertTrue(exact)
+                self.assertEqual(length, exhaustive(board, board.get_player_location(player), set()))
+                location = board.get_player_location(player)
+                for move in path:
+                    self.assertIn((move[0] - location[0], move[1] - location[1]), isolation.DIRECTIONS)
+                    self.assertTrue(board.move_is_legal(move))
+                    location = move
+                self.assertEqual(len(set(path)), length)
+
+    def test_outcome_matches_full_search(self):
+        """ Test that separated games are decided like a full-depth search """
+        for agentUT, board in separated_positions(5, 5, 8):
+            agentUT.score = lambda game, player: game.utility(player)
+            score, _ = agentUT.alphabeta(board, len(board.get_blank_spaces()) + 1)
+            result, path = partition.partition_outcome(board)
+            self.assertEqual(result, partition.WIN if score > 0 else partition.LOSS)
+
+            agentUT.partition_endgame = True
+            move = agentUT.get_move(board, board.get_legal_moves(), lambda: 1e6)
+            self.assertEqual(move, path[0])
+            self.assertEqual(agentUT.nodes, 0)
+
+    def test_path_cleared_between_games(self):
+        """ Test that a path from a previous game is not followed """
+        agentUT, board = separated_positions(5, 5, 1)[0]
+        agentUT.partition_endgame = True
+        agentUT.get_move(board, board.get_legal_moves(), lambda: 1e6)
+        self.assertTrue(agentUT.partition_path)
+        board = isolation.Board(agentUT, 'null_agent', 5, 5)
+        agentUT.get_move(board, board.get_legal_moves(), lambda: 1e6)
+        self.assertEqual(agentUT.partition_path, [])
+
+
+class RootSplitTest(unittest.TestCase):
+
+    def test_same_move_as_serial_search(self):
+        """ Test that root splitting finds the move of the serial search """
+        agentUT, board = random_position(1, bitboard=True)
+        agentUT.method = 'alphabeta'
+        agentUT.iterative = False
+        expected = agentUT.get_move(board, board.get_legal_moves(), lambda: 1e6)
+        agentUT.workers = 2
+        try:
+            self.assertEqual(agentUT.get_move(board, board.get_legal_moves(), lambda: 1e6), expected)
+            self.assertGreater(agentUT.nodes, 0)
+        finally:
+            agentUT.close()
+
+    def test_node_budget(self):
+        """ Test that root splitting shares the node budget out to the workers """
+        agentUT, board = random_position(1, bitboard=True)
+        agentUT.method = 'alphabeta'
+        agentUT.node_budget = 5000
+        agentUT.workers = 2
+        try:
+            move = agentUT.get_move(board, board.get_legal_moves(), lambda: -1.)
+            self.assertIn(move, board.get_legal_moves())
+            self.assertGreater(agentUT.nodes, 0)
+            self.assertLessEqual(agentUT.nodes, 5000)
+        finally:
+            agentUT.close()
+
+    def test_worker_stats_merged(self):
+        """ Test that the search statistics include the workers' searches """
+        agentUT, board = random_position(1, bitboard=True)
+        agentUT.method = 'alphabeta'
+        agentUT.iterative = False
+        agentUT.workers = 2
+        agentUT.stats = search_stats.SearchStats()
+        try:
+            agentUT.get_move(board, board.get_legal_moves(), lambda: 1e6)
+        finally:
+            agentUT.close()
+        record = agentUT.stats.moves[-1]
+        self.assertEqual(record["nodes"], agentUT.nodes)
+        self.assertGreater(record["leaf_evals"], 0)
+        self.assertGreater(record["cutoffs"], 0)
+
+
+class GameRecordsTest(unittest.TestCase):
+
+    def test_non_square_round_trip(self):
+        """ Test that moves of a non-square board read back unchanged """
+        random.seed(1)
+        agentUT, board = random_position(3, plies=0, w=5, h=9)
+        moves = []
+        for _ in range(10):
+            if not board.get_legal_moves():
+                break
+            moves.append(random.choice(board.get_legal_moves()))
+            board.apply_move(moves[-1])
+        records = [game_records.GameRecord(5, 9, ("a", "b"), 0, "", moves + [None]),
+                   game_records.GameRecord(5, 9, ("a", "b"), 1, "", [(6, 1), (8, 0), (4, 4), None])]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "games.rec")
+            for record in records:
+                game_records.write_game(path, record)
+            self.assertEqual(list(game_records.read_games(path)), records)
+
+
+class MCTSTest(unittest.TestCase):
+
+    def test_random_playouts(self):
+        """ Test that batched playouts finish forced games on every board """
+        agentUT = mcts.MCTSPlayer(seed=0)
+        neighbours = batch_heuristics.neighbour_array(3, 3)
+        blocked = np.ones((4, 10), dtype=bool)
+        # player 1 on (0, 0) can only move to (1, 2); player 2 is stuck in the centre
+        blocked[:2, 5] = False
+        locations = np.array([[0, 4]] * 4)
+        turns = np.array([0, 0, 1, 1], dtype=np.int8)
+        winners = mcts.random_playouts(neighbours, blocked, locations, turns, agentUT.rng)
+        self.assertEqual(list(winners), [0, 0, 0, 0])
+        self.assertEqual(list(locations[:2, 0]), [5, 5])
+
+    def test_tree_reuse(self):
+        """ Test that MCTSPlayer plays legal moves and keeps its tree """
+        agentUT = mcts.MCTSPlayer(seed=0)
+        board = isolation.Board(agentUT, 'null_agent', bitboard=True)
+        rng = random.Random(0)
+        for _ in range(8):
+            board.apply_move(rng.choice(board.get_legal_moves()))
+        deadline = iter(range(200, 0, -1))
+        move = agentUT.get_move(board, board.get_legal_moves(), lambda: next(deadline))
+        self.assertIn(move, board.get_legal_moves())
+        self.assertGreater(agentUT.num_playouts, 0)
+        board.apply_move(move)
+        reply = max(agentUT.root.children.values(), key=lambda node: node.visits)
+        board.apply_move(reply.move)
+        self.assertIs(agentUT.reuse_root(board), reply)
+
+
+if __name__ == '__main__':
+    unittest.main()
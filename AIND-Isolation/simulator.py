@@ -0,0 +1,220 @@
+"""
+This file contains a headless simulator that plays many games between two
+agents with as little work per ply as possible, for load testing agents.
+
+`Board.play()` copies the board and builds a new timer for every move.
+`simulate()` instead reuses one timer object for the whole run, hands the
+agents either a copy of the board or a `CopyOnWriteBoard` view that only
+copies the board if the agent moves on it, and yields every game as a
+`game_records.GameRecord` as soon as it ends, so results can be streamed to
+a record file or aggregated without keeping the games in memory.
+
+A game ends like in `Board.play()`: the player to move loses if it has no
+legal moves, returns a move that is not legal, or returns after its time is
+up. When the player to move has no legal moves the game ends without asking
+it for one, and the record ends with a missing move (None) in its place.
+
+Example:
+
+    python simulator.py --games 1000 --player-1 greedy --player-2 random
+    python simulator.py --games 200 --player-1 improved --nodes 500 --records games.rec
+"""
+
+import argparse
+import time
+import timeit
+
+from operator import methodcaller
+
+from isolation import Board, NodeBudget
+from game_records import GameRecord, write_game
+from game_agent import CustomPlayer
+from sample_players import GreedyPlayer, RandomPlayer, improved_score
+from tournament_new import CUSTOM_ARGS
+
+# agents available from the command line
+AGENTS = {"random": lambda: RandomPlayer(),
+          "greedy": lambda: GreedyPlayer(),
+          "improved": lambda: CustomPlayer(score_fn=improved_score, **CUSTOM_ARGS)}
+
+# methods that change the board an agent is given
+MUTATORS = frozenset(["apply_move", "push_move", "pop_move"])
+
+
+class CopyOnWriteBoard(object):
+    """
+    A view of a board that is handed to an agent instead of a copy. Reads
+    (legal moves, locations, `forecast_move()`, ...) go to the shared board.
+    The first time the agent asks for a method that changes the board, the
+    view copies the board and becomes that copy (its class is replaced by
+    the board's class), so the agent never changes the shared board and
+    pays no further indirection.
+
+    The view has two limits that a copy does not:
+
+    - until the first change, it is not an instance of the board's class,
+      so `isinstance(game, Board)` is False in the agent;
+    - until the first change, it reads the shared board, so an agent that
+      keeps the view after `get_move()` returns sees the later moves of
+      the game on it. Agents that keep the board must copy it, or be
+      simulated with `handoff="copy"`.
+
+    Parameters
+    ----------
+    board : isolation.Board
+        The board to share.
+    """
+
+    def __init__(self, board):
+        self.__dict__['_board'] = board
+
+    def __getattr__(self, name):
+        board = self.__dict__['_board']
+        if name not in MUTATORS:
+            return getattr(board, name)
+        board = board.copy()
+        object.__setattr__(self, '__class__', type(board))
+        self.__dict__.clear()
+        self.__dict__.update(board.__dict__)
+        return getattr(self, name)
+
+    def __setattr__(self, name, value):
+        self.__getattr__('apply_move')
+        setattr(self, name, value)
+
+
+class Timer(object):
+    """
+    The `time_left` function given to the agents, reset at every turn
+    instead of being created anew.
+
+    Parameters
+    ----------
+    time_limit : float
+        The milliseconds allowed per turn.
+    """
+
+    def __init__(self, time_limit):
+        self.time_limit = time_limit
+        self.deadline = 0.
+
+    def reset(self):
+        """Start the clock of a new turn."""
+        self.deadline = time.perf_counter() + self.time_limit / 1000.
+
+    def __call__(self):
+        return 1000. * (self.deadline - time.perf_counter())
+
+
+def simulate(player_1, player_2, games, time_limit=150, node_limit=None, names=None,
+             width=7, height=7, bitboard=True, handoff="cow", alternate=True):
+    """
+    Play games between two agents and yield the record of each game as soon
+    as it ends.
+
+    Parameters
+    ----------
+    player_1, player_2 : object
+        The agents, objects with a get_move() function. The same objects
+        play every game.
+
+    games : int
+        The number of games to play.
+
+    time_limit : float (optional)
+        The milliseconds allowed per turn.
+
+    node_limit : int (optional)
+        If set, the search nodes allowed per turn (see `Board.play()`)
+        instead of a time limit.
+
+    names : (str, str) (optional)
+        The names of the agents in the records; defaults to their class
+        names.
+
+    width, height : int (optional)
+        The size of the board.
+
+    bitboard : bool (optional)
+        Flag indicating whether to play on the bitmask engine.
+
+    handoff : {'cow', 'copy'} (optional)
+        Give the agents a `CopyOnWriteBoard` view of the board ('cow'), or
+        a copy of the board like `Board.play()` ('copy'). Use 'copy' for
+        agents that check the type of the board or keep it between turns.
+
+    alternate : bool (optional)
+        Flag indicating whether the agents take turns to move first, from
+        one game to the next; otherwise player_1 always moves first.
+
+    Yields
+    ------
+    game_records.GameRecord
+        The record of every game, with the moves from the empty board.
+    """
+    if names is None:
+        names = (type(player_1).__name__, type(player_2).__name__)
+    timer = NodeBudget(node_limit) if node_limit is not None else Timer(time_limit)
+    reset = getattr(timer, "reset", None)
+    view = CopyOnWriteBoard if handoff == "cow" else methodcaller("copy")
+    for idx in range(games):
+        players, order = (player_1, player_2), names
+        if alternate and idx % 2:
+            players, order = (player_2, player_1), names[::-1]
+        board = Board(*players, width=width, height=height, bitboard=bitboard)
+        moves = []
+        termination = ""
+        while True:
+            legal_moves = board.get_legal_moves()
+            if not legal_moves:
+                moves.append(None)
+                break
+            if reset is not None:
+                reset()
+            move = board.active_player.get_move(view(board), legal_moves, timer)
+            moves.append(move)
+            if timer() < 0:
+                termination = "timeout"
+                break
+            if move not in legal_moves:
+                termination = "illegal move"
+                break
+            board.apply_move(move)
+        # the player to move lost
+        yield GameRecord(width, height, order, 1 - board.move_count % 2, termination, moves)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play games between two agents " +
+                                     "as fast as possible and report the throughput.")
+    parser.add_argument("--player-1", choices=sorted(AGENTS), default="greedy")
+    parser.add_argument("--player-2", choices=sorted(AGENTS), default="random")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--time-limit", type=int, default=150, help="Milliseconds per turn.")
+    parser.add_argument("--nodes", type=int, default=None, help="Search nodes per turn.")
+    parser.add_argument("--handoff", choices=["cow", "copy"], default="cow")
+    parser.add_argument("--list-board", action="store_true",
+                        help="Play on the list-of-lists board instead of the bitboard.")
+    parser.add_argument("--records", default=None, help="Record file to append the games to.")
+    args = parser.parse_args()
+
+    names = (args.player_1, args.player_2) if args.player_1 != args.player_2 else \
+        (args.player_1 + " (1)", args.player_2 + " (2)")
+    wins = [0, 0]
+    plies = 0
+    start = timeit.default_timer()
+    for record in simulate(AGENTS[args.player_1](), AGENTS[args.player_2](), args.games,
+                           args.time_limit, args.nodes, names, bitboard=not args.list_board,
+                           handoff=args.handoff):
+        wins[names.index(record.players[record.winner])] += 1
+        plies += len(record.moves) - 1
+        if args.records:
+            write_game(args.records, record)
+    elapsed = timeit.default_timer() - start
+    print("{} {} - {} {}".format(names[0], wins[0], wins[1], names[1]))
+    print("{} games, {} plies in {:.2f}s: {:.0f} plies/s ({:.2f}M plies/hour)".format(
+        args.games, plies, elapsed, plies / elapsed, 3600e-6 * plies / elapsed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+This file contains the `TimeManager` used by `game_agent.CustomPlayer` to
+decide when iterative deepening should stop.
+
+Without it, the agent starts a new iteration as long as more than
+TIMER_THRESHOLD milliseconds are left, and an iteration that cannot finish
+is aborted by a `Timeout` raised deep in the search, so its nodes are
+wasted. The manager instead predicts the time of the next iteration from
+the nodes of the last one, the effective branching factor (the ratio of
+the nodes of the last two iterations, or the average of earlier turns) and
+the node rate of the turn, and stops deepening when the prediction does not
+fit in the time left.
+
+The timer is still checked at every node, with a safety margin in place of
+TIMER_THRESHOLD. The margin has to cover two gaps:
+
+    - the time between `get_move()` returning and `Board.play` reading the
+      timer. The agent cannot measure this gap (the next time it reads the
+      clock is after the opponent's turn), so the configured minimum is a
+      fixed reserve for it.
+    - the time the agent itself spends between the check that stops the
+      search and the end of `get_move()` (unwinding the search and
+      bookkeeping). After every turn that ran into the margin, the margin
+      grows at once to a multiple of that time, and it shrinks slowly back
+      towards the minimum.
+"""
+
+
+class TimeManager:
+    """Predict whether another iteration of iterative deepening fits in the
+    turn, and learn the safety margin to keep on the timer.
+
+    Parameters
+    ----------
+    min_margin : float
+        The smallest safety margin, in milliseconds: the fixed reserve for
+        the time after `get_move()` returns, which is not measured.
+
+    growth : float (optional)
+        The margin after a turn is at least this multiple of the time used
+        between stopping the search and the call to end_turn().
+
+    decay : float (optional)
+        The factor by which the margin shrinks after every turn that ended
+        by the timer, down to min_margin.
+
+    default_ebf : float (optional)
+        The effective branching factor assumed before any turn measured one.
+
+    slack : float (optional)
+        How many times the time left the predicted time of an iteration may
+        be for the iteration to start anyway. The predictions are unbiased
+        but often off by half, so values above 1 trade some wasted nodes
+        for completing more of the iterations that do fit.
+    """
+
+    def __init__(self, min_margin, growth=2., decay=0.9, default_ebf=4., slack=1.):
+        self.min_margin = min_margin
+        self.margin = min_margin
+        self.growth = growth
+        self.decay = decay
+        self.slack = slack
+        self.ebf = default_ebf  # running average of the measured branching factors
+        self.time_left = None
+        self.start = None
+        self.early_stops = 0  # turns where deepening stopped before the timer
+
+    def start_turn(self, time_left):
+        """Start timing a turn with the turn's timer."""
+        self.time_left = time_left
+        self.start = time_left()
+
+    def predict(self, iteration_nodes):
+        """Return the predicted milliseconds of the next iteration, given
+        the nodes visited by every iteration completed so far this turn."""
+        elapsed = self.start - self.time_left()
+        nodes = sum(iteration_nodes)
+        if not iteration_nodes or elapsed <= 0 or not nodes:
+            return 0.
+        if len(iteration_nodes) > 1 and iteration_nodes[-2]:
+            ebf = iteration_nodes[-1] / iteration_nodes[-2]
+        else:
+            ebf = self.ebf
+        return iteration_nodes[-1] * max(ebf, 1.) * elapsed / nodes
+
+    def next_iteration_fits(self, iteration_nodes):
+        """Return whether the next iteration is predicted to finish before
+        the margin, and count an early stop if it is not."""
+        if self.predict(iteration_nodes) < self.slack * (self.time_left() - self.margin):
+            return True
+        self.early_stops += 1
+        return False
+
+    def end_turn(self, iteration_nodes, timed_out):
+        """Update the branching factor and the margin at the end of a turn.
+
+        Parameters
+        ----------
+        iteration_nodes : list<int>
+            The nodes visited by every completed iteration of the turn.
+
+        timed_out : bool
+            Whether the search was stopped by the timer (so the time used
+            since, up to this call, is the overhead the learned part of the
+            margin must cover). Call this last in `get_move()`; the time
+            after it returns is covered by min_margin only.
+        """
+        ratios = [b / a for a, b in zip(iteration_nodes[1:-1], iteration_nodes[2:]) if a]
+        if ratios:
+            self.ebf = 0.8 * self.ebf + 0.2 * sum(ratios) / len(ratios)
+        if timed_out:
+            used = self.margin - self.time_left()
+            self.margin = max(self.min_margin, self.decay * self.margin, self.growth * used)
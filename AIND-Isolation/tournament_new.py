@@ -20,6 +20,7 @@ initiative in the second match with agentB at (5, 2) as player 1 and agentA at
 """
 
 import itertools
+import os
 import random
 import warnings
 
@@ -36,10 +37,16 @@ from game_agent import heuristics_proximity_min, heuristics_proximity_min_weight
 from game_agent import heuristics_proximity_max, heuristics_proximity_max_weighted, heuristics_proximity_max_weighted_inv
 from game_agent import heuristic_simple_deeper, heuristic_offensive_deeper
 from game_agent import CustomPlayer
+from search_stats import SearchStats, summarize
+from game_records import record_game, write_game
 #from game_agent import custom_score
 
 NUM_MATCHES = 5  # number of matches against each opponent
 TIME_LIMIT = 150  # number of milliseconds before timeout
+NODE_LIMIT = None  # number of search nodes per turn instead of TIME_LIMIT (see `benchmark.py calibrate`)
+BITBOARD = True  # play on the bitmask board engine (same rules, faster copies)
+STATS_DIR = None  # directory for the search statistics of the evaluated agents; None disables them
+RECORD_FILE = None  # file to append the game records to (see game_records.py); None disables them
 
 # list of student heuristics
 HEURISTICS_STUDENT = [heuristic_simple_weighted, heuristic_simple_weighted_inv, heuristic_simple_deeper,
@@ -68,27 +75,41 @@ same opponents.
 Agent = namedtuple("Agent", ["player", "name"])
 
 
-def play_match(player1, player2):
+def play_match(player1, player2, node_limit=NODE_LIMIT, names=None, record_file=RECORD_FILE,
+               opening=None):
     """
     Play a "fair" set of matches between two agents by playing two games
     between the players, forcing each agent to play from randomly selected
     positions. This should control for differences in outcome resulting from
-    advantage due to starting position on the board.
+    advantage due to starting position on the board. If node_limit is set,
+    turns are limited by search nodes instead of TIME_LIMIT. If record_file
+    is set, both games are appended to it with the agents' names. If opening
+    is set, its two moves replace the random move and response.
     """
+    player_names = dict(zip((player1, player2), names or ("player1", "player2")))
     num_wins = {player1: 0, player2: 0}
     num_timeouts = {player1: 0, player2: 0}
     num_invalid_moves = {player1: 0, player2: 0}
-    games = [Board(player1, player2), Board(player2, player1)]
+    games = [Board(player1, player2, bitboard=BITBOARD),
+             Board(player2, player1, bitboard=BITBOARD)]
 
-    # initialize both games with a random move and response
-    for _ in range(2):
-        move = random.choice(games[0].get_legal_moves())
-        games[0].apply_move(move)
-        games[1].apply_move(move)
+    # initialize both games with a random move and response, unless given
+    opening = list(opening or [])
+    for idx in range(2):
+        if idx == len(opening):
+            opening.append(random.choice(games[0].get_legal_moves()))
+        games[0].apply_move(opening[idx])
+        games[1].apply_move(opening[idx])
 
     # play both games and tally the results
     for game in games:
-        winner, _, termination = game.play(time_limit=TIME_LIMIT)
+        for player in (player1, player2):
+            if getattr(player, "stats", None) is not None:
+                player.stats.new_game()
+        winner, move_history, termination = game.play(time_limit=TIME_LIMIT, node_limit=node_limit)
+        if record_file:
+            write_game(record_file, record_game(game, winner, move_history, termination,
+                                                player_names, opening))
 
         if player1 == winner:
             num_wins[player1] += 1
@@ -128,12 +149,13 @@ def play_round(agents, num_matches):
 
         counts = {agent_1.player: 0., agent_2.player: 0.}
         names = [agent_1.name, agent_2.name]
+        player_names = {agent_1.player: agent_1.name, agent_2.player: agent_2.name}
         print("  Match {}: {!s:^11} vs {!s:^11}".format(idx + 1, *names), end=' ')
 
         # Each player takes a turn going first
         for p1, p2 in itertools.permutations((agent_1.player, agent_2.player)):
             for _ in range(num_matches):
-                score_1, score_2 = play_match(p1, p2)
+                score_1, score_2 = play_match(p1, p2, names=(player_names[p1], player_names[p2]))
                 counts[p1] += score_1
                 counts[p2] += score_2
                 total += score_1 + score_2
@@ -146,14 +168,41 @@ def play_round(agents, num_matches):
     return 100. * wins / total
 
 
-def main():
+def write_search_stats(agent, directory):
+    """
+    Write the search statistics of an agent to JSON and CSV files named
+    after the agent, and print a summary of them.
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, agent.name)
+    agent.player.stats.write_json(path + ".json")
+    agent.player.stats.write_csv(path + ".csv")
+
+    summary = summarize(agent.player.stats.moves)
+    print("\nSearch statistics ({} moves in {} games):".format(summary["moves"], summary["games"]))
+    print("  nodes/s {:.0f}, median depth {:.1f} (min {}), cutoffs/node {:.3f}, leaves/node {:.3f}".format(
+        summary["nodes_per_sec"], summary["median_depth"] or 0., summary["min_depth"],
+        summary["cutoff_rate"], summary["leaf_rate"]))
+    print("  re-searches/move: pvs {:.2f}, aspiration {:.2f}; extensions/move: forced {:.2f}, mobility {:.2f}".format(
+        summary["pvs_researches"], summary["aspiration_researches"],
+        summary["forced_extensions"], summary["mobility_extensions"]))
+    print("  heuristic {:.0%} and move generation {:.0%} of search time, min margin {} ms".format(
+        summary["score_share"], summary["movegen_share"],
+        "-" if summary["min_margin"] is None else "{:.1f}".format(summary["min_margin"])))
+    print("  timeouts {:.0%} of moves ({:.0%} of nodes wasted), early stops {:.0%} of moves".format(
+        summary["timeout_rate"], summary["wasted_share"], summary["early_stop_rate"]))
+
+
+HEURISTICS = [("Null", null_score),
+              ("Open", open_move_score),
+              ("Improved", improved_score)]
+AB_ARGS = {"search_depth": 5, "method": 'alphabeta', "iterative": False}
+MM_ARGS = {"search_depth": 3, "method": 'minimax', "iterative": False}
+CUSTOM_ARGS = {"method": 'alphabeta', 'iterative': True, 'make_unmake': True,
+               'partition_endgame': True, 'time_manager': True}
 
-    HEURISTICS = [("Null", null_score),
-                  ("Open", open_move_score),
-                  ("Improved", improved_score)]
-    AB_ARGS = {"search_depth": 5, "method": 'alphabeta', "iterative": False}
-    MM_ARGS = {"search_depth": 3, "method": 'minimax', "iterative": False}
-    CUSTOM_ARGS = {"method": 'alphabeta', 'iterative': True}
+
+def main():
 
     # Create a collection of CPU agents using fixed-depth minimax or alpha beta
     # search, or random selection.  The agent names encode the search method
@@ -176,9 +225,11 @@ def main():
     print("Student heuristics:")
     
     test_agents = [Agent(CustomPlayer(score_fn=improved_score, 
+                                    stats=SearchStats() if STATS_DIR else None,
                                     **CUSTOM_ARGS), "ID_Improved")]
     for heuristic_tmp in HEURISTICS_STUDENT:
                test_agents.append(Agent(CustomPlayer(score_fn=heuristic_tmp, 
+                                    stats=SearchStats() if STATS_DIR else None,
                                     **CUSTOM_ARGS), heuristic_tmp.__name__))
                print(heuristic_tmp.__name__)
         
@@ -195,6 +246,9 @@ def main():
         print("----------")
         print("{!s:<15}{:>10.2f}%".format(agentUT.name, win_ratio))
 
+        if STATS_DIR and agentUT.player.stats.moves:
+            write_search_stats(agentUT, STATS_DIR)
+
 
 if __name__ == "__main__":
     main()
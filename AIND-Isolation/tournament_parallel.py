@@ -0,0 +1,225 @@
+"""
+Run the tournament from tournament_new.py with the matches distributed over
+a pool of worker processes.
+
+Every match (a "fair" pair of games, see `tournament_new.play_match`) is an
+independent task. Each worker is pinned to its own CPU core where the
+platform supports it, and the pool never has more workers than cores, so
+only one game runs per core and the timed moves of the agents are not
+starved by other games. Matches are seeded from the tournament seed and
+their index, so the random openings do not depend on which worker plays
+them.
+
+The results are aggregated into the same win-ratio tables as the serial
+tournament, followed by the CPU load of every worker.
+
+Example:
+
+    python tournament_parallel.py --workers 8 --matches 5
+    python tournament_parallel.py --nodes 15000
+    python tournament_parallel.py --records games.rec
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import time
+import timeit
+import warnings
+
+from collections import namedtuple, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from sample_players import RandomPlayer
+from game_agent import CustomPlayer
+from tournament_new import (AB_ARGS, MM_ARGS, CUSTOM_ARGS, DESCRIPTION,
+                            HEURISTICS, HEURISTICS_STUDENT, NODE_LIMIT, NUM_MATCHES,
+                            RECORD_FILE, TIMEOUT_WARNING, play_match)
+from sample_players import improved_score
+
+# Agents are sent to the workers as a name and constructor arguments, and
+# every worker builds (and keeps) its own instance.
+AgentSpec = namedtuple("AgentSpec", ["name", "cls", "kwargs"])
+
+MatchResult = namedtuple("MatchResult", ["agent_ut", "opponent", "wins_ut", "wins_opp",
+                                         "timeout", "pid", "core", "cpu_time", "wall_time"])
+
+_AGENTS = {}  # agents built by this worker, by name
+_CORE = None  # core this worker is pinned to
+
+
+def available_cores():
+    """Return the list of CPU cores this process may run on."""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def opponent_specs():
+    """The fixed opponents of tournament_new.py: random, fixed-depth minimax
+    and fixed-depth alpha-beta agents."""
+    return ([AgentSpec("Random", RandomPlayer, {})] +
+            [AgentSpec("MM_" + name, CustomPlayer, dict(MM_ARGS, score_fn=h))
+             for name, h in HEURISTICS] +
+            [AgentSpec("AB_" + name, CustomPlayer, dict(AB_ARGS, score_fn=h))
+             for name, h in HEURISTICS])
+
+
+def test_specs():
+    """The agents evaluated by tournament_new.py: ID_Improved and one
+    iterative deepening agent per student heuristic."""
+    return ([AgentSpec("ID_Improved", CustomPlayer, dict(CUSTOM_ARGS, score_fn=improved_score))] +
+            [AgentSpec(h.__name__, CustomPlayer, dict(CUSTOM_ARGS, score_fn=h))
+             for h in HEURISTICS_STUDENT])
+
+
+def init_worker(cores):
+    """Pool initializer: pin the worker to the next free core."""
+    global _CORE
+    _CORE = cores.get()
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, {_CORE})
+    random.seed(os.getpid())
+
+
+def get_agent(spec):
+    """Return this worker's instance of the agent described by spec."""
+    if spec.name not in _AGENTS:
+        _AGENTS[spec.name] = spec.cls(**spec.kwargs)
+    return _AGENTS[spec.name]
+
+
+def run_match(ut_spec, opp_spec, ut_first, seed, node_limit=NODE_LIMIT, record_file=RECORD_FILE):
+    """Play one match between the agent under test and an opponent, and
+    return a MatchResult with the wins of each agent and the CPU and wall
+    time the match took on this worker. If record_file is set, the games
+    are appended to it."""
+    random.seed(seed)
+    agent_ut, opponent = get_agent(ut_spec), get_agent(opp_spec)
+    players = (agent_ut, opponent) if ut_first else (opponent, agent_ut)
+    names = (ut_spec.name, opp_spec.name) if ut_first else (opp_spec.name, ut_spec.name)
+
+    cpu_start, wall_start = time.process_time(), timeit.default_timer()
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        score_1, score_2 = play_match(*players, node_limit=node_limit, names=names,
+                                      record_file=record_file)
+    cpu_time = time.process_time() - cpu_start
+    wall_time = timeit.default_timer() - wall_start
+
+    wins_ut, wins_opp = (score_1, score_2) if ut_first else (score_2, score_1)
+    return MatchResult(ut_spec.name, opp_spec.name, wins_ut, wins_opp, bool(caught),
+                       os.getpid(), _CORE, cpu_time, wall_time)
+
+
+def play_tournament(test_agents, opponents, num_matches, workers, seed=0, node_limit=NODE_LIMIT,
+                    record_file=RECORD_FILE):
+    """Play num_matches matches with each player order between every agent
+    under test and every opponent, and return the list of MatchResults in
+    the order of the serial tournament. If node_limit is set, turns are
+    limited by search nodes instead of time. If record_file is set, every
+    worker appends its games to it."""
+    rng = random.Random(seed)
+    tasks = [(agent_ut, opponent, ut_first, rng.getrandbits(32), node_limit, record_file)
+             for agent_ut in test_agents
+             for opponent in opponents
+             for ut_first in (True, False)
+             for _ in range(num_matches)]
+
+    # hand out the cores round-robin, in case there are more workers than cores
+    available = available_cores()
+    cores = multiprocessing.Queue()
+    for idx in range(workers):
+        cores.put(available[idx % len(available)])
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(cores,)) as executor:
+        futures = [executor.submit(run_match, *task) for task in tasks]
+        return [future.result() for future in futures]
+
+
+def print_results(results, test_agents, opponents):
+    """Print the match results and win ratio of every agent under test in
+    the format of tournament_new.py."""
+    for agent_ut in test_agents:
+        print("")
+        print("*************************")
+        print("{:^25}".format("Evaluating: " + agent_ut.name))
+        print("*************************")
+        print("\nPlaying Matches:")
+        print("----------")
+
+        wins = 0.
+        total = 0.
+        for idx, opponent in enumerate(opponents):
+            matches = [r for r in results
+                       if r.agent_ut == agent_ut.name and r.opponent == opponent.name]
+            wins_ut = sum(r.wins_ut for r in matches)
+            wins_opp = sum(r.wins_opp for r in matches)
+            wins += wins_ut
+            total += wins_ut + wins_opp
+            print("  Match {}: {!s:^11} vs {!s:^11}".format(idx + 1, agent_ut.name, opponent.name), end=' ')
+            print("\tResult: {} to {}".format(int(wins_ut), int(wins_opp)))
+
+        print("\n\nResults:")
+        print("----------")
+        print("{!s:<15}{:>10.2f}%".format(agent_ut.name, 100. * wins / total if total else 0.))
+
+    if any(r.timeout for r in results):
+        print("\n" + TIMEOUT_WARNING)
+
+
+def print_worker_load(results, elapsed):
+    """Print the matches, CPU time and CPU load (CPU time over the wall time
+    spent in matches) of every worker, and the overall speedup."""
+    workers = OrderedDict()
+    for r in results:
+        workers.setdefault((r.pid, r.core), []).append(r)
+
+    print("\nWorker load:")
+    print("----------")
+    print("{:>8}{:>6}{:>9}{:>10}{:>10}{:>8}".format("pid", "core", "matches", "cpu (s)", "wall (s)", "load"))
+    for (pid, core), matches in workers.items():
+        cpu_time = sum(r.cpu_time for r in matches)
+        wall_time = sum(r.wall_time for r in matches)
+        print("{:>8}{!s:>6}{:>9}{:>10.1f}{:>10.1f}{:>7.0f}%".format(
+            pid, core, len(matches), cpu_time, wall_time, 100. * cpu_time / wall_time))
+
+    match_time = sum(r.wall_time for r in results)
+    print("\nTournament wall time: {:.1f}s for {:.1f}s of matches ({:.2f}x)".format(
+        elapsed, match_time, match_time / elapsed))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the tournament of tournament_new.py " +
+                                     "on a pool of worker processes.")
+    parser.add_argument("--workers", type=int, default=len(available_cores()),
+                        help="Number of worker processes (at most one per core).")
+    parser.add_argument("--matches", type=int, default=NUM_MATCHES,
+                        help="Number of matches against each opponent with each player order.")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="Seed for the random openings of the matches.")
+    parser.add_argument("--nodes", type=int, default=NODE_LIMIT,
+                        help="Limit each turn to this many search nodes instead of " +
+                        "the time limit, for results that do not depend on the machine load.")
+    parser.add_argument("--records", default=RECORD_FILE,
+                        help="Append every game to this file (see game_records.py).")
+    args = parser.parse_args()
+    workers = max(1, min(args.workers, len(available_cores())))
+
+    test_agents, opponents = test_specs(), opponent_specs()
+    print(DESCRIPTION)
+    print("Playing {} matches on {} workers".format(
+        len(test_agents) * len(opponents) * 2 * args.matches, workers))
+
+    start = timeit.default_timer()
+    results = play_tournament(test_agents, opponents, args.matches, workers, args.seed, args.nodes,
+                              args.records)
+    elapsed = timeit.default_timer() - start
+
+    print_results(results, test_agents, opponents)
+    print_worker_load(results, elapsed)
+
+
+if __name__ == "__main__":
+    main()
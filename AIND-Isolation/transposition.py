@@ -0,0 +1,136 @@
+"""This file contains a bounded transposition table for caching the results
+of game tree searches between iterative deepening iterations (and turns).
+
+Entries are keyed by the Zobrist hash of a position (`Board.hash()`), and
+record the search depth, the score, whether the score is exact or a bound,
+and the best move found for the position.
+"""
+
+EXACT = 0  # score is the exact minimax value for the searched depth
+LOWER = 1  # score is a lower bound (the search failed high)
+UPPER = 2  # score is an upper bound (the search failed low)
+
+POLICIES = ('depth', 'two-tier')
+
+
+class TranspositionTable:
+    """Fixed-size hash table of search results.
+
+    Parameters
+    ----------
+    size : int (optional)
+        The number of buckets in the table; rounded up to a power of two.
+
+    policy : {'depth', 'two-tier'} (optional)
+        The replacement policy. With 'depth', each bucket holds one entry
+        that is only replaced by a search of equal or greater depth. With
+        'two-tier', each bucket holds a depth-preferred entry and an
+        always-replace entry for everything the first one rejects. Entries
+        left over from an earlier call to `new_search()` can always be
+        replaced.
+    """
+
+    def __init__(self, size=2 ** 16, policy='depth'):
+        if policy not in POLICIES:
+            raise ValueError("`policy` must be one of {}".format(POLICIES))
+        self.size = 1
+        while self.size < size:
+            self.size *= 2
+        self.mask = self.size - 1
+        self.policy = policy
+        self.slots = 2 if policy == 'two-tier' else 1
+        self.clear()
+
+    def clear(self):
+        """Remove all entries and reset the counters."""
+        self.table = [None] * (self.size * self.slots)
+        self.age = 0
+        self.hits = 0
+        self.misses = 0
+        self.collisions = 0
+        self.stores = 0
+        self.overwrites = 0
+
+    def new_search(self):
+        """Mark all current entries as belonging to an earlier search (e.g.,
+        the previous turn), so that they no longer block replacement."""
+        self.age += 1
+
+    def probe(self, key):
+        """Look up a position.
+
+        Parameters
+        ----------
+        key : int
+            The Zobrist hash of the position.
+
+        Returns
+        -------
+        tuple(int, int, float, int, tuple(int, int), int) or None
+            The (key, depth, score, flag, move, age) entry for the position,
+            or None if the position is not in the table.
+        """
+        index = (key & self.mask) * self.slots
+        collision = False
+        for entry in self.table[index:index + self.slots]:
+            if entry is None:
+                continue
+            if entry[0] == key:
+                self.hits += 1
+                return entry
+            collision = True
+        if collision:
+            self.collisions += 1
+        self.misses += 1
+        return None
+
+    def store(self, key, depth, score, flag, move):
+        """Record the result of a search.
+
+        Parameters
+        ----------
+        key : int
+            The Zobrist hash of the position.
+
+        depth : int
+            The number of plies searched below the position.
+
+        score : float
+            The score returned by the search.
+
+        flag : {EXACT, LOWER, UPPER}
+            Whether the score is exact or a bound.
+
+        move : tuple(int, int)
+            The best move found for the position.
+        """
+        index = (key & self.mask) * self.slots
+        entry = (key, depth, score, flag, move, self.age)
+        current = self.table[index]
+        self.stores += 1
+        if current is None or current[0] == key or depth >= current[1] or current[5] != self.age:
+            if current is not None and current[0] != key:
+                self.overwrites += 1
+                if self.slots == 2:
+                    # keep the displaced entry in the always-replace slot
+                    self.table[index + 1] = current
+            self.table[index] = entry
+        elif self.slots == 2:
+            if self.table[index + 1] is not None and self.table[index + 1][0] != key:
+                self.overwrites += 1
+            self.table[index + 1] = entry
+
+    def __len__(self):
+        return sum(entry is not None for entry in self.table)
+
+    def stats(self):
+        """Return a dict of the table counters, for sizing the table."""
+        lookups = self.hits + self.misses
+        return {'size': self.size * self.slots,
+                'used': len(self),
+                'hits': self.hits,
+                'misses': self.misses,
+                'collisions': self.collisions,
+                'stores': self.stores,
+                'overwrites': self.overwrites,
+                'hit_rate': self.hits / lookups if lookups else 0.}
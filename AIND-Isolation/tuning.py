@@ -0,0 +1,195 @@
+"""
+Tune the weights of `game_agent.WeightedHeuristic` by self-play with SPSA
+(simultaneous perturbation stochastic approximation).
+
+Every iteration perturbs all the tuned weights at once by +c_k or -c_k,
+plays the agent with the "plus" weights against the agent with the "minus"
+weights from every cached opening (a fair match per opening, see
+`tournament_new.play_match`), and moves the weights along the perturbation
+in proportion to the score difference. The matches of an iteration are
+spread over a pool of worker processes.
+
+The openings (a random move and response each) are drawn once and stored
+in a JSON file, so every iteration, and every later run with the same file,
+compares the weights on the same positions. Turns are limited by search
+nodes by default, so results do not depend on the machine load.
+
+The weight of the agent's own moves stays at its starting value, since only
+the ratios between the weights change the moves chosen. Every iteration is
+appended to a CSV learning curve, and the final weights are written to a
+JSON file, after a check against the starting weights.
+
+Example:
+
+    python tuning.py --start heuristics_offensive_weighted --iterations 100 --workers 4
+"""
+
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import random
+
+from concurrent.futures import ProcessPoolExecutor
+
+from isolation import Board
+from game_agent import CustomPlayer, WeightedHeuristic
+from tournament_new import CUSTOM_ARGS, play_match
+from tournament_parallel import available_cores, init_worker
+
+# starting weights (own, opp, dist, inv_dist) of each weighted heuristic
+START_WEIGHTS = {"heuristic_simple_weighted": (1., 1., 0., 0.),
+                 "heuristics_offensive_weighted": (1., 2., 0., 0.),
+                 "heuristics_proximity_max_weighted": (0., 0., 1., 0.),
+                 "heuristics_proximity_min_weighted": (0., 0., 0., 1.)}
+TUNED = (1, 2, 3)  # indexes of the tuned weights in WeightedHeuristic.PARAMS
+NODE_LIMIT = 2000  # search nodes per turn during tuning
+
+
+def load_openings(path, count, seed=0, width=7, height=7):
+    """Return count openings (pairs of first moves) from the JSON file at
+    path, drawing and saving new ones if the file has too few."""
+    openings = []
+    if path and os.path.exists(path):
+        with open(path) as f:
+            openings = [[tuple(move) for move in opening] for opening in json.load(f)]
+    if len(openings) < count:
+        rng = random.Random(seed + len(openings))
+        while len(openings) < count:
+            board = Board("p1", "p2", width, height)
+            opening = []
+            for _ in range(2):
+                opening.append(rng.choice(board.get_legal_moves()))
+                board.apply_move(opening[-1])
+            openings.append(opening)
+        if path:
+            with open(path, "w") as f:
+                json.dump(openings, f)
+    return openings[:count]
+
+
+def play_opening(weights_1, weights_2, opening, node_limit):
+    """Play a fair match from an opening between agents with two weight
+    sets, and return the wins of each."""
+    player_1 = CustomPlayer(score_fn=WeightedHeuristic(*weights_1), **CUSTOM_ARGS)
+    player_2 = CustomPlayer(score_fn=WeightedHeuristic(*weights_2), **CUSTOM_ARGS)
+    return play_match(player_1, player_2, node_limit=node_limit, opening=opening)
+
+
+def compare(executor, weights_1, weights_2, openings, node_limit):
+    """Return the wins of each weight set over fair matches from all the
+    openings, played on the executor's workers."""
+    futures = [executor.submit(play_opening, weights_1, weights_2, opening, node_limit)
+               for opening in openings]
+    results = [future.result() for future in futures]
+    return sum(r[0] for r in results), sum(r[1] for r in results)
+
+
+def spsa(start, iterations, openings, executor, node_limit=NODE_LIMIT, a=0.5, c=0.5,
+         alpha=0.602, gamma=0.101, seed=0, log_path=None):
+    """Tune the weights with SPSA.
+
+    Parameters
+    ----------
+    start : tuple<float>
+        The starting weights (own, opp, dist, inv_dist).
+
+    iterations : int
+        The number of iterations.
+
+    openings : list
+        The openings of the matches played in every iteration.
+
+    executor : concurrent.futures.Executor
+        The pool that plays the matches.
+
+    node_limit : int (optional)
+        The search nodes per turn.
+
+    a, c, alpha, gamma : float (optional)
+        The SPSA gains: the step size at iteration k is a / (k + 1 + A)^alpha
+        with A = iterations / 10, and the perturbation is c / (k + 1)^gamma.
+
+    seed : int (optional)
+        The seed of the perturbations.
+
+    log_path : str (optional)
+        The CSV file the learning curve is written to.
+
+    Returns
+    -------
+    tuple<float>
+        The tuned weights.
+    """
+    rng = random.Random(seed)
+    theta = list(start)
+    stability = iterations / 10.
+    log = None
+    if log_path:
+        log = open(log_path, "w", newline="")
+        writer = csv.writer(log)
+        writer.writerow(["iteration", "wins_plus", "wins_minus", "step", "perturbation"] +
+                        list(WeightedHeuristic.PARAMS))
+    try:
+        for k in range(iterations):
+            a_k = a / (k + 1 + stability) ** alpha
+            c_k = c / (k + 1) ** gamma
+            delta = {idx: rng.choice((-1, 1)) for idx in TUNED}
+            plus, minus = list(theta), list(theta)
+            for idx, sign in delta.items():
+                plus[idx] += c_k * sign
+                minus[idx] -= c_k * sign
+            wins_plus, wins_minus = compare(executor, plus, minus, openings, node_limit)
+            score = (wins_plus - wins_minus) / float(wins_plus + wins_minus)
+            for idx, sign in delta.items():
+                theta[idx] += a_k * score / (2 * c_k) * sign
+            if log:
+                writer.writerow([k, wins_plus, wins_minus, a_k, c_k] + theta)
+                log.flush()
+            print("{:>5}  {:>3} to {:<3}  {}".format(k, wins_plus, wins_minus, WeightedHeuristic(*theta)))
+    finally:
+        if log:
+            log.close()
+    return tuple(theta)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune the weights of the weighted " +
+                                     "heuristics with SPSA over self-play matches.")
+    parser.add_argument("--start", choices=sorted(START_WEIGHTS), default="heuristic_simple_weighted",
+                        help="Heuristic whose weights start the search.")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--openings", type=int, default=16,
+                        help="Number of openings (fair matches) per iteration.")
+    parser.add_argument("--openings-file", default="tuning_openings.json",
+                        help="Cache of the openings, reused between runs.")
+    parser.add_argument("--workers", type=int, default=len(available_cores()))
+    parser.add_argument("--nodes", type=int, default=NODE_LIMIT, help="Search nodes per turn.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--log", default="tuning_curve.csv", help="CSV learning curve.")
+    parser.add_argument("--out", default="tuning_best.json", help="JSON file for the tuned weights.")
+    args = parser.parse_args()
+
+    start = START_WEIGHTS[args.start]
+    openings = load_openings(args.openings_file, args.openings, args.seed)
+    workers = max(1, min(args.workers, len(available_cores())))
+    cores = multiprocessing.Queue()
+    for idx in range(workers):
+        cores.put(available_cores()[idx % len(available_cores())])
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(cores,)) as executor:
+        best = spsa(start, args.iterations, openings, executor, args.nodes,
+                    seed=args.seed, log_path=args.log)
+        wins, losses = compare(executor, best, start, openings, args.nodes)
+
+    print("\n{} won {} to {} against {}".format(WeightedHeuristic(*best), wins, losses,
+                                                WeightedHeuristic(*start)))
+    with open(args.out, "w") as f:
+        json.dump({"start": args.start, "weights": dict(zip(WeightedHeuristic.PARAMS, best)),
+                   "wins": wins, "losses": losses, "iterations": args.iterations,
+                   "openings": args.openings, "nodes": args.nodes}, f, indent=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,7 +7,7 @@ functions."""
 from .utils import (
     is_in, argmin, argmax, argmax_random_tie, probability,
     weighted_sample_with_replacement, memoize, print_table, DataFile, Stack,
-    FIFOQueue, PriorityQueue, name
+    LIFOQueue, FIFOQueue, PriorityQueue, name
 )
 from .grid import distance
 
@@ -215,7 +215,7 @@ def depth_first_tree_search(problem):
 
 def depth_first_graph_search(problem):
     "Search the deepest nodes in the search tree first."
-    return graph_search(problem, Stack())
+    return graph_search(problem, LIFOQueue())
 
 
 def breadth_first_search(problem):
@@ -176,5 +176,38 @@ def test_expr():
     assert (expr('GP(x, z) <== P(x, y) & P(y, z)')
             == Expr('<==', GP(x, z), P(x, y) & P(y, z)))
 
+
+def test_PriorityQueue():
+    q = PriorityQueue(min, f=lambda x: x[1])
+    q.extend([('a', 3), ('b', 1), ('c', 2), ('d', 1)])
+    assert len(q) == 4 and ('c', 2) in q
+    del q[('c', 2)]
+    assert ('c', 2) not in q and q[('c', 2)] is None and len(q) == 3
+    assert [q.pop() for _ in range(3)] == [('b', 1), ('d', 1), ('a', 3)]
+    q = PriorityQueue(max, f=len)
+    q.extend(['ab', 'a', 'abc', 'ba'])
+    assert [q.pop() for _ in range(4)] == ['abc', 'ba', 'ab', 'a']
+
+
+def test_FIFOQueue():
+    q = FIFOQueue()
+    q.extend([1, 2, 1, 3])
+    assert len(q) == 4 and 1 in q and 4 not in q
+    assert [q.pop() for _ in range(2)] == [1, 2]
+    assert 1 in q and 2 not in q
+    assert [q.pop() for _ in range(2)] == [1, 3]
+    assert 1 not in q and len(q) == 0
+
+
+def test_LIFOQueue():
+    q = LIFOQueue()
+    q.extend([1, 2, 2, 3])
+    assert len(q) == 4 and 2 in q and 4 not in q
+    assert [q.pop() for _ in range(2)] == [3, 2]
+    assert 2 in q and 3 not in q
+    assert [q.pop() for _ in range(2)] == [2, 1]
+    assert 2 not in q and len(q) == 0
+
+
 if __name__ == '__main__':
     pytest.main()
@@ -4,6 +4,7 @@ import bisect
 import collections
 import collections.abc
 import functools
+import heapq
 import operator
 import os.path
 import random
@@ -507,7 +508,7 @@ class defaultkeydict(collections.defaultdict):
 
 
 # ______________________________________________________________________________
-# Queues: Stack, FIFOQueue, PriorityQueue
+# Queues: Stack, LIFOQueue, FIFOQueue, PriorityQueue
 
 # TODO: Possibly use queue.Queue, queue.PriorityQueue
 # TODO: Priority queues may not belong here -- see treatment in search.py
@@ -517,6 +518,7 @@ class Queue:
 
     """Queue is an abstract class/interface. There are three types:
         Stack(): A Last In First Out Queue.
+        LIFOQueue(): A Last In First Out Queue with constant-time membership.
         FIFOQueue(): A First In First Out Queue.
         PriorityQueue(order, f): Queue in sorted order (default min-first).
     Each type supports the following methods and functions:
@@ -543,31 +545,66 @@ def Stack():
 
 class FIFOQueue(Queue):
 
-    """A First-In-First-Out Queue."""
+    """A First-In-First-Out Queue.
+    Counts the items it holds, so `item in q` takes constant time. Items must
+    be hashable; search nodes hash by state."""
 
     def __init__(self):
         self.A = []
         self.start = 0
+        self.counts = collections.Counter()
 
     def append(self, item):
         self.A.append(item)
+        self.counts[item] += 1
 
     def __len__(self):
         return len(self.A) - self.start
 
-    def extend(self, items):
-        self.A.extend(items)
-
     def pop(self):
         e = self.A[self.start]
         self.start += 1
         if self.start > 5 and self.start > len(self.A) / 2:
             self.A = self.A[self.start:]
             self.start = 0
+        _discount(self.counts, e)
+        return e
+
+    def __contains__(self, item):
+        return item in self.counts
+
+
+class LIFOQueue(Queue):
+
+    """A Last-In-First-Out Queue, like Stack(), that counts the items it holds
+    so that `item in q` takes constant time. Items must be hashable."""
+
+    def __init__(self):
+        self.A = []
+        self.counts = collections.Counter()
+
+    def append(self, item):
+        self.A.append(item)
+        self.counts[item] += 1
+
+    def __len__(self):
+        return len(self.A)
+
+    def pop(self):
+        e = self.A.pop()
+        _discount(self.counts, e)
         return e
 
     def __contains__(self, item):
-        return item in self.A[self.start:]
+        return item in self.counts
+
+
+def _discount(counts, item):
+    """Remove one occurrence of item from a Counter, dropping it at zero."""
+    if counts[item] == 1:
+        del counts[item]
+    else:
+        counts[item] -= 1
 
 
 class PriorityQueue(Queue):
@@ -575,37 +612,67 @@ class PriorityQueue(Queue):
     """A queue in which the minimum (or maximum) element (as determined by f and
     order) is returned first. If order is min, the item with minimum f(x) is
     returned first; if order is max, then it is the item with maximum f(x).
-    Also supports dict-like lookup."""
+    Also supports dict-like lookup.
+    Items are kept in a binary heap, with a dict from each item to its heap
+    entry for constant-time membership, lookup and deletion. Items that
+    compare equal (e.g. search nodes with the same state) share a slot.
+    Deleted entries stay in the heap, marked as removed, until they reach
+    the top. Ties on f(x) are broken by comparing the items, so items come
+    out in the same order as from a sorted list."""
 
     def __init__(self, order=min, f=lambda x: x):
         self.A = []
+        self.entries = {}
         self.order = order
         self.f = f
 
     def append(self, item):
-        bisect.insort(self.A, (self.f(item), item))
+        if item in self.entries:
+            del self[item]
+        key = (self.f(item), item)
+        entry = [key if self.order == min else _Reversed(key), item, True]
+        self.entries[item] = entry
+        heapq.heappush(self.A, entry)
 
     def __len__(self):
-        return len(self.A)
+        return len(self.entries)
 
     def pop(self):
-        if self.order == min:
-            return self.A.pop(0)[1]
-        else:
-            return self.A.pop()[1]
+        while self.A:
+            _, item, live = heapq.heappop(self.A)
+            if live:
+                del self.entries[item]
+                return item
+        raise IndexError('pop from empty PriorityQueue')
 
     def __contains__(self, item):
-        return any(item == pair[1] for pair in self.A)
+        return item in self.entries
 
     def __getitem__(self, key):
-        for _, item in self.A:
-            if item == key:
-                return item
+        entry = self.entries.get(key)
+        if entry is not None:
+            return entry[1]
 
     def __delitem__(self, key):
-        for i, (value, item) in enumerate(self.A):
-            if item == key:
-                self.A.pop(i)
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            entry[2] = False
+
+
+class _Reversed:
+
+    """Wrap a sort key so that heapq, a min-heap, returns the largest first."""
+
+    __slots__ = ('key',)
+
+    def __init__(self, key):
+        self.key = key
+
+    def __lt__(self, other):
+        return other.key < self.key
+
+    def __eq__(self, other):
+        return self.key == other.key
 
 # ______________________________________________________________________________
 # Useful Shorthands
@@ -1,3 +1,6 @@
+from collections import namedtuple
+from operator import itemgetter
+
 from aimacode.logic import associate
 from aimacode.utils import expr
 
@@ -42,8 +45,9 @@ def encode_state(fs: FluentState, fluent_map: list) -> str:
     :return: str eg. "TFFTFT" string of mapped positive and negative fluents
     """
     state_tf = []
+    pos = set(fs.pos)
     for fluent in fluent_map:
-        if fluent in fs.pos:
+        if fluent in pos:
             state_tf.append('T')
         else:
             state_tf.append('F')
@@ -66,3 +70,142 @@ def decode_state(state: str, fluent_map: list) -> FluentState:
         else:
             fs.neg.append(fluent_map[idx])
     return fs
+
+
+# str.translate tables between T/F state strings and binary digit strings
+_TF_TO_BITS = str.maketrans('TF', '10')
+_BITS_TO_TF = str.maketrans('10', 'TF')
+
+ActionMasks = namedtuple('ActionMasks', ['precond_pos', 'precond_neg', 'effect_add', 'effect_rem'])
+
+
+def fluent_bits(fluent_map: list) -> dict:
+    """ map every fluent to its bit in a state bitset
+
+    The fluent at index i of the map is bit (len(fluent_map) - 1 - i), so
+    that the bitset of a T/F string is its value as a binary number.
+
+    :param fluent_map: ordered list of possible fluents for the problem
+    :return: dict of fluent -> int with a single bit set
+    """
+    size = len(fluent_map)
+    return {fluent: 1 << (size - 1 - idx) for idx, fluent in enumerate(fluent_map)}
+
+
+def fluent_mask(fluents: list, bits: dict) -> int:
+    """ combine the bits of fluents into a mask
+
+    :param fluents: list of fluents
+    :param bits: dict of fluent -> bit from fluent_bits
+    :return: int with the bit of every fluent set
+    """
+    mask = 0
+    for fluent in fluents:
+        mask |= bits[fluent]
+    return mask
+
+
+def action_masks(action, bits: dict) -> ActionMasks:
+    """ precompute the bitset masks of an action's preconditions and effects
+
+    :param action: Action object
+    :param bits: dict of fluent -> bit from fluent_bits
+    :return: ActionMasks of the positive and negative preconditions and the
+        added and removed fluents
+    """
+    return ActionMasks(fluent_mask(action.precond_pos, bits), fluent_mask(action.precond_neg, bits),
+                       fluent_mask(action.effect_add, bits), fluent_mask(action.effect_rem, bits))
+
+
+def state_to_bits(state: str) -> int:
+    """ convert a T/F state string to a bitset
+
+    :param state: str eg. "TFFTFT" string of mapped positive and negative fluents
+    :return: int with the bits of the positive fluents set (see fluent_bits)
+    """
+    return int(state.translate(_TF_TO_BITS), 2)
+
+
+def bits_to_state(bits: int, size: int) -> str:
+    """ convert a bitset back to a T/F state string
+
+    :param bits: int bitset of the positive fluents
+    :param size: number of fluents in the problem
+    :return: str eg. "TFFTFT" string of mapped positive and negative fluents
+    """
+    return format(bits, '0{}b'.format(size)).translate(_BITS_TO_TF)
+
+
+def count_bits(bits: int) -> int:
+    """ number of bits set in a bitset (e.g. of unsatisfied goal fluents) """
+    return bin(bits).count('1')
+
+
+class SuccessorGenerator():
+    """ index of ground actions for finding the actions applicable in a state
+
+    The actions are stored in a trie over their preconditions (in the spirit
+    of the successor generator of Fast Downward): every node holds the
+    actions whose preconditions are all tested on the path to it, and one
+    child per next precondition, keyed by the fluent's bit. A lookup only
+    descends into the children whose precondition holds in the state, found
+    from the set bits of `state & mask`, so its cost grows with the number
+    of true fluents and of partially applicable actions, not with the
+    number of ground actions.
+    """
+
+    def __init__(self, actions: list, masks: list):
+        """
+        :param actions: list of Action objects
+        :param masks: list of the ActionMasks of each action (see action_masks)
+        """
+        self.root = self._build([(idx, action, m.precond_pos, m.precond_neg)
+                                 for idx, (action, m) in enumerate(zip(actions, masks))])
+
+    @classmethod
+    def _build(cls, entries):
+        """ build the node for actions with the given remaining preconditions
+
+        :param entries: list of (index, action, positive mask, negative mask)
+        :return: tuple of the (index, action) pairs without remaining
+            preconditions, and the mask and children of the positive and of
+            the negative preconditions tested next
+        """
+        immediate = []
+        pos_groups, neg_groups = {}, {}
+        for idx, action, pos, neg in entries:
+            if pos:
+                bit = 1 << (pos.bit_length() - 1)
+                pos_groups.setdefault(bit, []).append((idx, action, pos ^ bit, neg))
+            elif neg:
+                bit = 1 << (neg.bit_length() - 1)
+                neg_groups.setdefault(bit, []).append((idx, action, pos, neg ^ bit))
+            else:
+                immediate.append((idx, action))
+        pos_children = {bit: cls._build(group) for bit, group in pos_groups.items()}
+        neg_children = {bit: cls._build(group) for bit, group in neg_groups.items()}
+        return (immediate, sum(pos_children), pos_children, sum(neg_children), neg_children)
+
+    def applicable(self, bits: int) -> list:
+        """ return the actions applicable in a state, in the order they were given
+
+        :param bits: int bitset of the positive fluents of the state
+        :return: list of Action objects
+        """
+        found = []
+        stack = [self.root]
+        while stack:
+            immediate, pos_mask, pos_children, neg_mask, neg_children = stack.pop()
+            found.extend(immediate)
+            matches = bits & pos_mask
+            while matches:
+                bit = matches & -matches
+                stack.append(pos_children[bit])
+                matches ^= bit
+            matches = neg_mask & ~bits
+            while matches:
+                bit = matches & -matches
+                stack.append(neg_children[bit])
+                matches ^= bit
+        found.sort(key=itemgetter(0))
+        return [action for _, action in found]
@@ -1,13 +1,15 @@
-from aimacode.logic import PropKB
+import random
+
 from aimacode.planning import Action
 from aimacode.search import (
     Node, Problem,
 )
 from aimacode.utils import expr
 from lp_utils import (
-    FluentState, encode_state, decode_state,
+    FluentState, encode_state, fluent_bits, fluent_mask, action_masks,
+    state_to_bits, bits_to_state, count_bits, SuccessorGenerator,
 )
-from my_planning_graph import PlanningGraph
+from my_planning_graph import RelaxedPlanningGraph
 
 
 class AirCargoProblem(Problem):
@@ -32,6 +34,26 @@ class AirCargoProblem(Problem):
         self.planes = planes
         self.airports = airports
         self.actions_list = self.get_actions()
+        # states are T/F strings outside of the problem, and bitsets of the
+        # positive fluents inside it (see lp_utils.fluent_bits)
+        self.fluent_bits = fluent_bits(self.state_map)
+        self.action_masks = {action: action_masks(action, self.fluent_bits)
+                             for action in self.actions_list}
+        self.successor_generator = SuccessorGenerator(self.actions_list,
+                                                      [self.action_masks[a] for a in self.actions_list])
+        self.goal_mask = fluent_mask(goal, self.fluent_bits)
+        self.planning_graph = None  # built on the first call to h_pg_levelsum
+
+    def masks(self, action: Action):
+        """ Return the precondition and effect masks of an action, which
+        are computed once per action.
+
+        :param action: Action object
+        :return: lp_utils.ActionMasks
+        """
+        if action not in self.action_masks:
+            self.action_masks[action] = action_masks(action, self.fluent_bits)
+        return self.action_masks[action]
 
     def get_actions(self):
         '''
@@ -131,24 +153,7 @@ class AirCargoProblem(Problem):
             e.g. 'FTTTFF'
         :return: list of Action objects
         """
-        # TODO implement
-        possible_actions = []
-        # KB is a knowledge base to which you can tell and ask sentences.
-        # PropKB is a KB subclass. It is a KB for propositional logic. Inefficient, with no indexing.
-        kb = PropKB() 
-        # tell is a kb method - add the sentence's clauses to the KB
-        kb.tell(decode_state(state, self.state_map).pos_sentence()) 
-        for action in self.actions_list: # iterate all actions and check state for prconditions
-            is_possible = True
-            for clause in action.precond_pos: # check positive
-                if clause not in kb.clauses:
-                    is_possible = False
-            for clause in action.precond_neg: # check negative
-                if clause in kb.clauses:
-                    is_possible = False
-            if is_possible:
-                possible_actions.append(action)
-        return possible_actions
+        return self.successor_generator.applicable(state_to_bits(state))
 
     def result(self, state: str, action: Action):
         """ Return the state that results from executing the given
@@ -159,24 +164,9 @@ class AirCargoProblem(Problem):
         :param action: Action applied
         :return: resulting state after action
         """
-        # TODO implement
-        new_state = FluentState([], [])
-        
-        old_state = decode_state(state, self.state_map)    
-        for fluent in old_state.pos: # add positive from old state if not in remove
-            if fluent not in action.effect_rem:
-                new_state.pos.append(fluent)
-        for fluent in action.effect_add: # add from action if not in new state
-            if fluent not in new_state.pos:
-                new_state.pos.append(fluent)
-        for fluent in old_state.neg: # add negative to negative from old state if not in add
-            if fluent not in action.effect_add:
-                new_state.neg.append(fluent)
-        for fluent in action.effect_rem: # add to negative from old state remove if not in a new neg
-            if fluent not in new_state.neg:
-                new_state.neg.append(fluent)
-        
-        return encode_state(new_state, self.state_map)
+        masks = self.masks(action)
+        bits = state_to_bits(state) & ~masks.effect_rem | masks.effect_add
+        return bits_to_state(bits, len(self.state_map))
 
     def goal_test(self, state: str) -> bool:
         """ Test the state to see if goal is reached
@@ -184,12 +174,7 @@ class AirCargoProblem(Problem):
         :param state: str representing state
         :return: bool
         """
-        kb = PropKB()
-        kb.tell(decode_state(state, self.state_map).pos_sentence())
-        for clause in self.goal:
-            if clause not in kb.clauses:
-                return False
-        return True
+        return state_to_bits(state) & self.goal_mask == self.goal_mask
 
     def h_1(self, node: Node):
         # note that this is not a true heuristic
@@ -203,9 +188,10 @@ class AirCargoProblem(Problem):
         out from the current state in order to satisfy each individual goal
         condition.
         '''
-        # requires implemented PlanningGraph class
-        pg = PlanningGraph(self, node.state)
-        pg_levelsum = pg.h_levelsum()
+        # the literal levels of PlanningGraph(self, node.state), without building it
+        if self.planning_graph is None:
+            self.planning_graph = RelaxedPlanningGraph(self)
+        pg_levelsum = self.planning_graph.h_levelsum(node.state)
         return pg_levelsum
 
     def h_ignore_preconditions(self, node: Node):
@@ -220,16 +206,8 @@ class AirCargoProblem(Problem):
         # this almost implies that the number of steps required  to solve 
         # the relaxed problem is the number of unsarisfied goals
         
-        # plan is to create a list of all positive fluents in the state
-        # then count each goal if it is not in the list of positive fluents
-        
-        kb = PropKB() 
-        kb.tell(decode_state(node.state, self.state_map).pos_sentence()) 
-        count = 0
-        for goal in self.goal:
-            if goal not in kb.clauses: 
-                count += 1
-        return count
+        # count the goal fluents that are not set in the state
+        return count_bits(self.goal_mask & ~state_to_bits(node.state))
 
 
 def air_cargo_p1() -> AirCargoProblem:
@@ -346,3 +324,23 @@ def air_cargo_p3() -> AirCargoProblem:
             ]
     return AirCargoProblem(cargos, planes, airports, init, goal)
 
+
+def air_cargo_generated(num_cargos, num_planes, num_airports, seed=0) -> AirCargoProblem:
+    """ Air cargo problem of any size, with the cargos and planes at random
+    airports and every cargo to be flown to another random airport. """
+    rng = random.Random(seed)
+    cargos = ['C{}'.format(i + 1) for i in range(num_cargos)]
+    planes = ['P{}'.format(i + 1) for i in range(num_planes)]
+    airports = ['A{}'.format(i + 1) for i in range(num_airports)]
+    start = {thing: rng.choice(airports) for thing in cargos + planes}
+    pos = [expr('At({}, {})'.format(thing, start[thing])) for thing in cargos + planes]
+    neg = []
+    for cargo in cargos:
+        neg.extend(expr('At({}, {})'.format(cargo, a)) for a in airports if a != start[cargo])
+        neg.extend(expr('In({}, {})'.format(cargo, p)) for p in planes)
+    for plane in planes:
+        neg.extend(expr('At({}, {})'.format(plane, a)) for a in airports if a != start[plane])
+    init = FluentState(pos, neg)
+    goal = [expr('At({}, {})'.format(c, rng.choice([a for a in airports if a != start[c]])))
+            for c in cargos]
+    return AirCargoProblem(cargos, planes, airports, init, goal)
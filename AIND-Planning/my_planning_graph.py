@@ -557,3 +557,115 @@ class PlanningGraph():
                     if len(goals_tmp) == 0: return level_sum
                     
         return level_sum
+
+
+class RelaxedPlanningGraph():
+    '''
+    The literal levels of a PlanningGraph, computed for many states of the same
+    problem without building the graph.
+
+    The level at which a literal first appears in a PlanningGraph does not
+    depend on mutexes: an action joins an A-level as soon as all of its
+    preconditions are in the S-level, and no-ops carry every literal forward.
+    The actions and literals of the problem are therefore numbered once, and
+    the levels of a state are found by a relaxed-reachability sweep over
+    integer arrays, which gives the same h_levelsum() as
+    `PlanningGraph(problem, state).h_levelsum()`.
+    '''
+
+    def __init__(self, problem: Problem):
+        '''
+        :param problem: PlanningProblem (or subclass such as AirCargoProblem or HaveCakeProblem)
+        Instance variables calculated:
+            literal_index: dict mapping (symbol, is_pos) of every literal to its number; the positive
+                and negative literals of fluent i of the state map are numbered i and n + i
+            consumers: list of the numbers of the actions that have each literal as a precondition
+            effects: list of the numbers of the literals that each action adds
+            precond_counts: list of the number of distinct preconditions of each action
+            goals: list of the numbers of the goal literals
+        '''
+        self.problem = problem
+        self.size = len(problem.state_map)
+        self.literal_index = {}
+        for is_pos in (True, False):
+            for fluent in problem.state_map:
+                self.literal(fluent, is_pos)
+        self.effects = []
+        self.precond_counts = []
+        prenodes = []
+        for action in problem.actions_list:
+            pre = {self.literal(p, True) for p in action.precond_pos} | \
+                  {self.literal(p, False) for p in action.precond_neg}
+            eff = {self.literal(e, True) for e in action.effect_add} | \
+                  {self.literal(e, False) for e in action.effect_rem}
+            prenodes.append(pre)
+            self.precond_counts.append(len(pre))
+            self.effects.append(sorted(eff))
+        self.consumers = [[] for _ in self.literal_index]
+        for a, pre in enumerate(prenodes):
+            for lit in pre:
+                self.consumers[lit].append(a)
+        self.free_actions = [a for a, count in enumerate(self.precond_counts) if count == 0]
+        self.goals = []
+        for goal in problem.goal:
+            if goal.op == '~':
+                self.goals.append(self.literal(goal.args[0], False))
+            else:
+                self.goals.append(self.literal(goal, True))
+
+    def literal(self, symbol, is_pos: bool) -> int:
+        ''' return the number of a literal, numbering it if it is new
+
+        :param symbol: expr
+        :param is_pos: bool
+        :return: int
+        '''
+        key = (expr(symbol), is_pos)
+        if key not in self.literal_index:
+            self.literal_index[key] = len(self.literal_index)
+        return self.literal_index[key]
+
+    def literal_levels(self, state: str, stop_literals=()) -> list:
+        ''' level of the first S-level of the planning graph of a state containing each literal
+
+        :param state: str (will be in form TFTTFF... representing fluent states)
+        :param stop_literals: iterable of int, literal numbers after whose levels are all known the sweep may stop
+        :return: list of int, -1 for literals that the planning graph never reaches
+        '''
+        n = self.size
+        levels = [-1] * len(self.literal_index)
+        frontier = [i if value == 'T' else n + i for i, value in enumerate(state)]
+        for lit in frontier:
+            levels[lit] = 0
+        pending = {lit for lit in stop_literals if levels[lit] < 0}
+        counts = self.precond_counts[:]
+        consumers, effects = self.consumers, self.effects
+        ready = list(self.free_actions)
+        level = 0
+        while frontier and (pending or not stop_literals):
+            # actions whose last precondition appears at this level join the A-level
+            for lit in frontier:
+                for a in consumers[lit]:
+                    counts[a] -= 1
+                    if not counts[a]:
+                        ready.append(a)
+            level += 1
+            frontier = []
+            for a in ready:
+                for lit in effects[a]:
+                    if levels[lit] < 0:
+                        levels[lit] = level
+                        frontier.append(lit)
+                        pending.discard(lit)
+            ready = []
+        return levels
+
+    def h_levelsum(self, state: str) -> int:
+        '''The sum of the level costs of the individual goals in the planning graph of a state,
+        where goals that are never reached cost nothing, like PlanningGraph.h_levelsum()
+
+        :param state: str (will be in form TFTTFF... representing fluent states)
+        :return: int
+        '''
+        levels = self.literal_levels(state, self.goals)
+        return sum(levels[goal] for goal in self.goals if levels[goal] > 0)
@@ -1,4 +1,5 @@
 import os
+import random
 import sys
 parent = os.path.dirname(os.path.realpath(__file__))
 sys.path.append(os.path.join(os.path.dirname(parent), "aimacode"))
@@ -6,9 +7,12 @@ from aimacode.planning import Action
 from aimacode.utils import expr
 from aimacode.search import Node
 import unittest
-from lp_utils import decode_state
+from lp_utils import (
+    FluentState, decode_state, encode_state, state_to_bits, bits_to_state,
+    ActionMasks, SuccessorGenerator,
+)
 from my_air_cargo_problems import (
-    air_cargo_p1, air_cargo_p2, air_cargo_p3,
+    air_cargo_p1, air_cargo_p2, air_cargo_p3, air_cargo_generated,
 )
 
 class TestAirCargoProb1(unittest.TestCase):
@@ -80,5 +84,40 @@ class TestAirCargoMethods(unittest.TestCase):
         n = Node(self.p1.initial)
         self.assertEqual(self.p1.h_ignore_preconditions(n),2)
 
+    def test_state_bits(self):
+        bits = state_to_bits(self.p1.initial)
+        self.assertEqual(bits_to_state(bits, len(self.p1.state_map)), self.p1.initial)
+        for fluent, state in zip(self.p1.state_map, self.p1.initial):
+            self.assertEqual(bool(bits & self.p1.fluent_bits[fluent]), state == 'T')
+        goal = FluentState(self.p1.goal, [f for f in self.p1.state_map if f not in self.p1.goal])
+        self.assertTrue(self.p1.goal_test(encode_state(goal, self.p1.state_map)))
+        self.assertFalse(self.p1.goal_test(self.p1.initial))
+
+
+class TestSuccessorGenerator(unittest.TestCase):
+
+    def test_generated_problem(self):
+        p = air_cargo_generated(6, 3, 5)
+        self.assertEqual(len(p.actions_list), 2 * 6 * 3 * 5 + 3 * 5 * 4)
+        rng = random.Random(0)
+        state = p.initial
+        for _ in range(50):
+            bits = state_to_bits(state)
+            expected = [a for a in p.actions_list
+                        if all(bits & p.fluent_bits[f] for f in a.precond_pos)
+                        and not any(bits & p.fluent_bits[f] for f in a.precond_neg)]
+            self.assertEqual(p.actions(state), expected)
+            state = p.result(state, rng.choice(expected))
+
+    def test_negative_preconditions(self):
+        actions = ['a', 'b', 'c', 'd']
+        masks = [ActionMasks(0b011, 0b100, 0, 0), ActionMasks(0b001, 0, 0, 0),
+                 ActionMasks(0, 0b110, 0, 0), ActionMasks(0, 0, 0, 0)]
+        generator = SuccessorGenerator(actions, masks)
+        self.assertEqual(generator.applicable(0b011), ['a', 'b', 'd'])
+        self.assertEqual(generator.applicable(0b111), ['b', 'd'])
+        self.assertEqual(generator.applicable(0b001), ['b', 'c', 'd'])
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -8,7 +8,7 @@ from aimacode.utils import expr
 from aimacode.planning import Action
 from example_have_cake import have_cake
 from my_planning_graph import (
-    PlanningGraph, PgNode_a, PgNode_s, mutexify
+    PlanningGraph, PgNode_a, PgNode_s, mutexify, RelaxedPlanningGraph
 )
 
 
@@ -123,6 +123,11 @@ class TestPlanningGraphHeuristics(unittest.TestCase):
     def test_levelsum(self):
         self.assertEqual(self.pg.h_levelsum(), 1)
 
+    def test_relaxed_levelsum(self):
+        rpg = RelaxedPlanningGraph(self.p)
+        for state in ("TF", "FF", "FT", "TT"):
+            self.assertEqual(rpg.h_levelsum(state), PlanningGraph(self.p, state).h_levelsum(), state)
+
 
 if __name__ == '__main__':
     unittest.main()